@@ -0,0 +1,9 @@
+"""
+Benchmarks of grooveply on generated data.
+
+    python -m benchmarks --sizes 1000 10000 100000
+    python -m benchmarks.compare <old>.json <new>.json
+
+The other modules are standalone benchmarks of single parts,
+run them with `python -m benchmarks.<name> --help` for the options.
+"""
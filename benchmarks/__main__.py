@@ -0,0 +1,87 @@
+"""
+Runs the benchmark suite for every size and writes the results as JSON.
+
+Every size runs in its own process with a new database, so that the
+connections and caches of one size do not affect the next one.
+
+    python -m benchmarks --sizes 1000 10000 100000
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+import pendulum
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git(*args: str) -> str:
+    result = subprocess.run(["git", *args], capture_output=True, text=True)
+    return result.stdout.strip()
+
+
+def run_size(applications: int, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "results.json")
+        env = {
+            **os.environ,
+            "GROOVEPLY_DB": os.path.join(tmp_dir, "bench.db"),
+            # Keeps the scheduler from changing the data while it is measured
+            "GROOVEPLY_AUTOMATION_INTERVAL": "86400",
+        }
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.suite",
+                "--applications", str(applications),
+                "--seed", str(args.seed),
+                "--min-time", str(args.min_time),
+                "--max-runs", str(args.max_runs),
+                "--output", output,
+            ],
+            env=env,
+            check=True,
+        )
+        with open(output) as f:
+            return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to run every case")
+    parser.add_argument("--max-runs", type=int, default=100)
+    parser.add_argument("--output", help="Defaults to benchmarks/results/<commit>.json")
+    args = parser.parse_args()
+
+    commit = git("rev-parse", "--short", "HEAD") or "unknown"
+    report = {
+        "commit": commit,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": str(pendulum.now("UTC")),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": {},
+    }
+    for size in args.sizes:
+        report["results"][str(size)] = run_size(size, args)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Compares two results files of `python -m benchmarks`.
+
+Prints the median times of both and their ratio for every case and size
+present in both files, marking the ones that changed more than the threshold.
+
+    python -m benchmarks.compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+
+import argparse
+import json
+import sys
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change to mark")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"{old['commit']} -> {new['commit']}" + (" (dirty)" if new["dirty"] else ""))
+    for size, new_results in new["results"].items():
+        old_results = old["results"].get(size)
+        if old_results is None:
+            continue
+        print()
+        print(f"{size + ' applications':<50} {'old ms':>10} {'new ms':>10} {'ratio':>7}")
+        for name, result in new_results.items():
+            if name not in old_results:
+                continue
+            before, after = old_results[name]["median_ms"], result["median_ms"]
+            ratio = after / before if before else float("inf")
+            mark = ""
+            if ratio > 1 + args.threshold:
+                mark = "  slower"
+            elif ratio < 1 - args.threshold:
+                mark = "  faster"
+            print(f"{name:<50} {before:>10.2f} {after:>10.2f} {ratio:>7.2f}{mark}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
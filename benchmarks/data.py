@@ -0,0 +1,130 @@
+"""
+Deterministic synthetic data for the benchmarks.
+
+The same number of applications and seed always give the same rows,
+with dates relative to `now`. Applications are spread over the last two
+years, most of them recent, over employers of which some get many
+applications, and went through the statuses the way they do in real use:
+many are rejected or go stale, few become active or get closed.
+"""
+
+import json
+import os
+import random
+import tempfile
+from typing import Optional
+
+import pendulum
+from pendulum import DateTime
+
+from grooveply.apis.application import ApplicationStatusAPI
+from grooveply.apis.automation import AutomationAPI
+from grooveply.apis.goal import GoalAPI
+from grooveply.scripts.import_data import import_data
+from grooveply.settings import TZ
+
+# Current status: (weight, statuses the application went through after APPLIED)
+STATUSES = {
+    "TO APPLY": (6, []),
+    "APPLIED": (34, []),
+    "ACTIVE": (8, ["ACTIVE"]),
+    "STALE": (18, ["STALE"]),
+    "REJECT": (28, ["REJECT"]),
+    "CLOSED": (6, ["ACTIVE", "CLOSED"]),
+}
+
+WORDS = [
+    "Acme", "Beta", "Corp", "Data", "Globex", "Hooli", "Initech", "Labs", "Macro", "Nova",
+    "Pixel", "Quant", "Soft", "Stark", "Tech", "Umbrella", "Vertex", "Wave", "Xeno", "Zen",
+]
+CITIES = [
+    "Amsterdam", "Barcelona", "Belgrade", "Berlin", "Bucharest", "Budapest", "Copenhagen",
+    "Dublin", "Helsinki", "Lisbon", "London", "Madrid", "Milan", "Munich", "Oslo", "Paris",
+    "Prague", "Riga", "Stockholm", "Tallinn", "Vienna", "Vilnius", "Warsaw", "Zurich", "Remote",
+]
+JOB_BOARDS = ["LinkedIn", "Indeed", "Glassdoor", "Hacker News", "Company site", "Referral"]
+POSITIONS = [
+    "Backend Engineer", "Data Engineer", "Frontend Developer", "ML Engineer",
+    "Platform Engineer", "Python Developer", "Site Reliability Engineer", "Team Lead",
+]
+NOTES = [
+    "Sent a follow-up", "Recruiter call", "Interview scheduled", "Technical interview",
+    "Take-home task sent", "Asked about the salary range", "Interview with the team",
+]
+
+
+def employer_name(index: int) -> str:
+    return f"{WORDS[index % len(WORDS)]} {WORDS[index // len(WORDS) % len(WORDS)]} {index}"
+
+
+def generate(
+    directory: str, applications: int, seed: int = 0, now: Optional[DateTime] = None
+) -> tuple[str, str]:
+    """
+    Writes applications and their updates as JSON lines files in the format
+    of grooveply.scripts.import_data and returns their paths
+    """
+    now = now or pendulum.today(tz=TZ)
+    rnd = random.Random(seed)
+    employers = max(1, applications // 4)
+    statuses = list(STATUSES)
+    weights = [STATUSES[status][0] for status in statuses]
+
+    apps_path = os.path.join(directory, "applications.ndjson")
+    updates_path = os.path.join(directory, "updates.ndjson")
+    with open(apps_path, "w") as apps, open(updates_path, "w") as updates:
+        for i in range(applications):
+            created = now.subtract(seconds=int(min(730, rnd.expovariate(1 / 90)) * 86400))
+            status = rnd.choices(statuses, weights)[0]
+
+            history = [(created, "Created", "user")]
+            previous, at = "APPLIED", created
+            for next_status in STATUSES[status][1]:
+                at = at.add(seconds=int(rnd.uniform(0.1, 1) * (now - at).total_seconds()))
+                triggerer = "automation" if next_status == "STALE" else "user"
+                history.append((at, f"Changed status {previous} -> {next_status}", triggerer))
+                previous = next_status
+            status_updated = at
+            for _ in range(rnd.choice([0, 0, 1, 1, 2, 3])):
+                note_at = created.add(seconds=int(rnd.random() * (now - created).total_seconds()))
+                history.append((note_at, rnd.choice(NOTES), "user"))
+
+            row = {
+                "id": i,
+                "employer": employer_name(int(employers * rnd.random() ** 2)),
+                "status": status,
+                "location": rnd.choice(CITIES) if rnd.random() < 0.9 else None,
+                "job_board": rnd.choice(JOB_BOARDS) if rnd.random() < 0.8 else None,
+                "description": f"{rnd.choice(POSITIONS)}, {rnd.randrange(1, 10)} years",
+                "url": f"https://jobs.example.com/{i}",
+                "notes": rnd.choice(NOTES) if rnd.random() < 0.2 else None,
+                "created_at": str(created),
+                "status_updated_at": str(status_updated),
+            }
+            apps.write(json.dumps(row) + "\n")
+
+            for at, description, triggerer in sorted(history):
+                update = {
+                    "application_id": i,
+                    "description": description,
+                    "created_at": str(at),
+                    "triggerer_type": triggerer,
+                    "triggerer_id": 1,
+                }
+                updates.write(json.dumps(update) + "\n")
+    return apps_path, updates_path
+
+
+def populate(applications: int, seed: int = 0, now: Optional[DateTime] = None):
+    """Fills the database of the settings with generated data, goals and automations"""
+    with tempfile.TemporaryDirectory() as directory:
+        import_data(*generate(directory, applications, seed, now))
+
+    status = ApplicationStatusAPI.get_id
+    AutomationAPI.create(status("APPLIED"), status("STALE"), 30, "days")
+    AutomationAPI.create(status("ACTIVE"), status("STALE"), 60, "days")
+
+    start = (now or pendulum.today(tz=TZ)).subtract(years=1).to_date_string()
+    GoalAPI.create(20, 1, "months", start, None)
+    GoalAPI.create(5, 7, "days", start, None)
+    GoalAPI.create(150, 1, "years", start, None)
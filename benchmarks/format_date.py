@@ -0,0 +1,116 @@
+"""
+Equivalence check and micro-benchmark of the date formatting.
+
+Formats generated dates around several fixed "now"s with both DateFormatter
+and the plain pendulum implementation it replaces, exits with a non-zero
+code on the first difference, then times both on a column of dates.
+
+    python -m benchmarks.format_date --dates 20000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import pendulum
+
+from grooveply.settings import TZ
+from grooveply.utils import DateFormatter
+
+NOWS = [
+    "2024-03-02T12:00:00+03:00",
+    "2024-02-29T23:59:59+03:00",
+    "2024-08-31T00:00:01+03:00",
+    "2024-12-31T21:30:00+03:00",
+    "2025-06-15T03:00:00+03:00",
+]
+# Offsets in minutes, None for naive dates
+OFFSETS = [None, 0, 180, -300, 330]
+
+
+def reference(date_str: str, now: pendulum.DateTime) -> str:
+    # The implementation of format_date before DateFormatter, with pendulum.now(tz=TZ) as `now`
+    date = pendulum.parse(date_str)
+    if date.diff(now).months >= 6:
+        fmt = "DD MMM Y"
+    elif date.diff(now).days < 7:
+        fmt = "dddd"
+    else:
+        fmt = "DD MMM"
+    return date.format(fmt)
+
+
+def generate(now: pendulum.DateTime, count: int, rnd: random.Random) -> list[str]:
+    dates = []
+    for _ in range(count):
+        # Mostly recent dates like the real data, some up to several years away
+        days = rnd.expovariate(1 / 60) if rnd.random() < 0.8 else rnd.uniform(0, 2000)
+        date = now.in_tz("UTC").subtract(seconds=int(days * 86400))
+        if rnd.random() < 0.1:
+            date = date.add(seconds=int(rnd.uniform(0, 30 * 86400)))
+        offset = rnd.choice(OFFSETS)
+        if offset is not None:
+            date = date.in_tz(pendulum.FixedTimezone(offset * 60))
+            dates.append(date.isoformat())
+        else:
+            dates.append(date.format("YYYY-MM-DDTHH:mm:ss.SSSSSS"))
+    return dates
+
+
+def check(count: int) -> int:
+    rnd = random.Random(0)
+    for now_str in NOWS:
+        now = pendulum.parse(now_str).in_tz(TZ)
+        dates = generate(now, count, rnd)
+        expected = [reference(date, now) for date in dates]
+        actual = DateFormatter(now).format_all(dates)
+
+        for date, want, got in zip(dates, expected, actual):
+            if want != got:
+                print(f"MISMATCH now={now_str} date={date}: {got!r} != {want!r}")
+                return 1
+        print(f"now={now_str}: {count} dates match")
+    return 0
+
+
+def bench(count: int):
+    now = pendulum.now(tz=TZ)
+    dates = generate(now, count, random.Random(1))
+
+    start = time.perf_counter()
+    for date in dates:
+        reference(date, pendulum.now(tz=TZ))
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    DateFormatter().format_all(dates)
+    new = time.perf_counter() - start
+
+    # The same column again, as when a page is rendered twice within a second
+    formatter = DateFormatter()
+    formatter.format_all(dates[:50])
+    start = time.perf_counter()
+    for _ in range(count // 50):
+        formatter.format_all(dates[:50])
+    cached = time.perf_counter() - start
+
+    print(f"{'implementation':<20} {'us/date':>8}")
+    print(f"{'pendulum':<20} {old / count * 1e6:>8.2f}")
+    print(f"{'DateFormatter':<20} {new / count * 1e6:>8.2f}")
+    print(f"{'DateFormatter cache':<20} {cached / (count // 50 * 50) * 1e6:>8.2f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dates", type=int, default=20000)
+    args = parser.parse_args()
+
+    if check(args.dates):
+        return 1
+    bench(args.dates)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Import time budget of the entry points.
+
+Imports each entry point in a fresh interpreter with `python -X importtime`,
+takes the best of several runs and exits with a non-zero code if one of them
+is over its budget or touches the database while being imported.
+tests/test_import_time.py enforces the budgets of the cli and the server.
+
+    python -m benchmarks.import_time --runs 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+# (name, module, budget in ms)
+ENTRY_POINTS = [
+    ("package", "grooveply", 50),
+    ("cli", "grooveply.cli", 50),
+    ("importer", "grooveply.scripts.import_data", 400),
+    ("server", "grooveply.main", 2500),
+]
+
+
+def import_times(code: str, env: dict) -> list[tuple[int, str, int]]:
+    """Returns (depth, module, cumulative us) of every module imported by `code`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((depth, name.strip(), int(cumulative)))
+    return times
+
+
+def measure(module: str, runs: int, env: dict) -> tuple[float, list[tuple[str, int]]]:
+    """
+    Returns the best total import time of `module` in ms and the modules
+    it imports directly with their times in us, without the ones
+    the interpreter imports on startup anyway
+    """
+    startup = {name for _, name, _ in import_times("pass", env)}
+    best, best_times = float("inf"), []
+    for _ in range(runs):
+        total, children, imported = 0, [], []
+        # Modules are listed after the modules they import
+        for depth, name, us in import_times(f"import {module}", env):
+            if depth == 1:
+                children.append((name, us))
+            elif depth == 0:
+                if name not in startup:
+                    total += us
+                    imported.extend(children)
+                children = []
+        if total / 1000 < best:
+            best, best_times = total / 1000, imported
+    return best, best_times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to show")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_name = os.path.join(tmp_dir, "import.db")
+        env = {**os.environ, "GROOVEPLY_DB": db_name}
+        src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+
+        print(f"{'entry point':<12} {'module':<32} {'ms':>8} {'budget':>8}")
+        for name, module, budget in ENTRY_POINTS:
+            total, times = measure(module, args.runs, env)
+            over = total > budget
+            print(
+                f"{name:<12} {module:<32} {total:>8.1f} {budget:>8}"
+                + ("  OVER BUDGET" if over else "")
+            )
+            for imported, us in sorted(times, key=lambda t: -t[1])[: args.top]:
+                print(f"{'':<12}   {imported:<30} {us / 1000:>8.1f}")
+
+            if os.path.exists(db_name):
+                print(f"{'':<12}   importing {module} created the database")
+                os.remove(db_name)
+                over = True
+            failed = failed or over
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
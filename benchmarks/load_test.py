@@ -0,0 +1,144 @@
+"""
+Load test of typeahead and page requests under concurrency.
+
+Starts the app on a throwaway database seeded with generated applications,
+or uses a running server with --url, then sends a mix of requests from
+several threads and prints latency percentiles for each kind of request.
+
+    python -m benchmarks.load_test --concurrency 32 --requests 5000
+"""
+
+import argparse
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+# Must be set before grooveply is imported since the settings are read on import
+TMP_DIR = tempfile.TemporaryDirectory()
+os.environ["GROOVEPLY_DB"] = os.path.join(TMP_DIR.name, "load.db")
+os.environ.setdefault("GROOVEPLY_AUTOMATION_INTERVAL", "3600")
+
+PREFIXES = ["a", "ac", "be", "co", "gl", "in", "ma", "so", "te", "x"]
+
+MIX = [
+    ("employer typeahead", lambda: f"/api/employer/search?q={random.choice(PREFIXES)}", 4),
+    ("location typeahead", lambda: f"/api/location/search?q={random.choice(PREFIXES)}", 2),
+    ("main page", lambda: "/api/", 1),
+    ("applications", lambda: "/api/application/", 1),
+]
+
+
+def seed(applications: int):
+    from grooveply.migrations import apply_migrations
+
+    from .data import populate
+
+    apply_migrations()
+    populate(applications)
+
+
+def start_server() -> tuple[subprocess.Popen, str]:
+    """Serves the app from another process so that it does not share the GIL with the clients"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "grooveply.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    )
+    url = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            urllib.request.urlopen(url + "/api/").read()
+            return server, url
+        except OSError:
+            time.sleep(0.1)
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(url: str, concurrency: int, requests: int) -> dict[str, list[float]]:
+    names, paths, weights = zip(*MIX)
+    latencies = defaultdict(list)
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            (kind,) = random.choices(range(len(names)), weights)
+            start = time.perf_counter()
+            with urllib.request.urlopen(url + paths[kind]()) as response:
+                response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[names[kind]].append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--applications", type=int, default=5000)
+    args = parser.parse_args()
+
+    url, server = args.url, None
+    if url is None:
+        seed(args.applications)
+        server, url = start_server()
+
+    # Warms up the statement caches of the connections
+    run(url, args.concurrency, args.concurrency * 2)
+
+    start = time.perf_counter()
+    latencies = run(url, args.concurrency, args.requests)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}:"
+        f" {args.requests / elapsed:.0f} rps"
+    )
+    print(f"{'request':<20} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, values in sorted(latencies.items()):
+        print(
+            f"{name:<20} {len(values):>6}"
+            + "".join(f" {percentile(values, p) * 1000:>8.1f}" for p in (50, 95, 99, 100))
+        )
+
+    if server is not None:
+        server.terminate()
+        server.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
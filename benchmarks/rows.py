@@ -0,0 +1,161 @@
+"""
+Benchmark of building row objects for bulk reads.
+
+Seeds a throwaway database with generated data and compares,
+on the same rows, validated pydantic models against `from_row` and
+`model_construct` for the API models and the table rows of the applications
+page.
+Prints the best time of several runs and the peak memory allocated.
+
+    python -m benchmarks.rows --applications 10000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+
+# Must be set before grooveply is imported since the settings are read on import
+TMP_DIR = tempfile.TemporaryDirectory()
+os.environ["GROOVEPLY_DB"] = os.path.join(TMP_DIR.name, "rows.db")
+
+from grooveply.apis.application import ApplicationAPI, row_to_application  # noqa: E402
+from grooveply.db import close_connections, get_connection  # noqa: E402
+from grooveply.migrations import apply_migrations  # noqa: E402
+from grooveply.models import (  # noqa: E402
+    Application,
+    ApplicationStatus,
+    Employer,
+    from_row,
+)
+from grooveply.routers.application import ApplicationRow  # noqa: E402
+
+from .data import populate  # noqa: E402
+
+
+def seed(applications: int):
+    apply_migrations()
+    populate(applications)
+
+
+def validated(app: tuple) -> Application:
+    # The way rows were turned into models before `row_to_application`
+    return Application(
+        id=app[0],
+        employer=Employer(id=app[1], name=app[2]),
+        status=ApplicationStatus(name=app[3]),
+        location_name=app[4],
+        job_board_name=app[5],
+        description=app[6],
+        url=app[7],
+        notes=app[8],
+        status_updated_at=app[9],
+        created_at=app[10],
+    )
+
+
+def constructed(app: tuple) -> Application:
+    return Application.model_construct(
+        id=app[0],
+        employer=Employer.model_construct(id=app[1], name=app[2]),
+        status=ApplicationStatus.model_construct(name=app[3]),
+        location_name=app[4],
+        job_board_name=app[5],
+        description=app[6],
+        url=app[7],
+        notes=app[8],
+        status_updated_at=app[9],
+        created_at=app[10],
+    )
+
+
+def table_rows(apps: list[Application], model) -> list[ApplicationRow]:
+    return [
+        model(
+            id=app.id,
+            status=app.status.name,
+            employer_id=app.employer.id,
+            employer=app.employer.name,
+            location=app.location_name,
+            job_board=app.job_board_name,
+            description=app.description,
+            created_at=app.created_at,
+        )
+        for app in apps
+    ]
+
+
+def measure(func, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        # Starts every run from the same heap so that the garbage collector
+        # pauses caused by earlier cases are not counted
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--applications", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    seed(args.applications)
+
+    cur = get_connection().cursor()
+    cur.execute(
+        "SELECT app.id, emp.id, emp.name, status.name, loc.name, jb.name,"
+        " app.description, app.url, app.notes, app.status_updated_at, app.created_at"
+        " FROM application app"
+        " JOIN employer emp ON app.employer_id = emp.id"
+        " JOIN application_status status ON app.status_id = status.id"
+        " LEFT JOIN location loc ON app.location_id = loc.id"
+        " LEFT JOIN job_board jb ON app.job_board_id = jb.id"
+        " ORDER BY app.last_activity_ts DESC"
+    )
+    rows = cur.fetchall()
+    apps = [row_to_application(row) for row in rows]
+
+    if [validated(row).model_dump() for row in rows] != [app.model_dump() for app in apps]:
+        print("Models built by from_row differ from the validated ones")
+        return 1
+
+    cases = [
+        ("Application, validated", lambda: [validated(row) for row in rows]),
+        ("Application, from_row", lambda: [row_to_application(row) for row in rows]),
+        ("Application, model_construct", lambda: [constructed(row) for row in rows]),
+        ("ApplicationRow, validated", lambda: table_rows(apps, ApplicationRow)),
+        ("ApplicationRow, from_row", lambda: table_rows(apps, partial(from_row, ApplicationRow))),
+        (
+            "ApplicationRow, model_construct",
+            lambda: table_rows(apps, ApplicationRow.model_construct),
+        ),
+        ("ApplicationAPI.get_all", ApplicationAPI.get_all),
+    ]
+
+    print(f"{len(rows)} rows")
+    print(f"{'case':<32} {'ms':>8} {'peak KiB':>10}")
+    for name, func in cases:
+        elapsed, peak = measure(func, args.repeat)
+        print(f"{name:<32} {elapsed * 1000:>8.1f} {peak / 1024:>10.0f}")
+
+    close_connections()
+    TMP_DIR.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
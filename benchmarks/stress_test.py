@@ -0,0 +1,122 @@
+"""
+Concurrency stress test of the storage profile.
+
+Runs writer and reader processes against a throwaway database at the same
+time, like several uvicorn workers and the automation job would, and fails
+if any of them gets a "database is locked" or any other database error.
+
+    python -m benchmarks.stress_test --writers 4 --readers 4 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import traceback
+
+# Must be set before grooveply is imported since the settings are read on import,
+# the spawned workers inherit it with the environment
+if __name__ == "__main__":
+    TMP_DIR = tempfile.TemporaryDirectory()
+    os.environ["GROOVEPLY_DB"] = os.path.join(TMP_DIR.name, "stress.db")
+
+
+def writer(seed: int, seconds: float) -> tuple[int, list[str]]:
+    from grooveply.apis.application import ApplicationAPI
+    from grooveply.apis.employer import EmployerAPI
+    from grooveply.apis.location import LocationAPI
+    from grooveply.auto import update_statuses
+    from grooveply.db import register_update
+
+    deadline = time.monotonic() + seconds
+    rnd = random.Random(seed)
+    ops, errors, app_ids = 0, [], []
+    while time.monotonic() < deadline:
+        try:
+            action = rnd.random()
+            if action < 0.6 or not app_ids:
+                employer_id = EmployerAPI.create(f"Employer {rnd.randrange(200)}")
+                location_id = LocationAPI.create(f"Location {rnd.randrange(20)}")
+                app_id = ApplicationAPI.create(employer_id, 1, location_id, None, "Stress", "")
+                register_update(app_id, "Created", "user", 1)
+                app_ids.append(app_id)
+            elif action < 0.9:
+                ApplicationAPI.next_status(rnd.choice(app_ids))
+            else:
+                update_statuses()
+            ops += 1
+        except Exception:
+            errors.append(traceback.format_exc(limit=1))
+    return ops, errors
+
+
+def reader(seed: int, seconds: float) -> tuple[int, list[str]]:
+    from grooveply.apis.application import ApplicationAPI, ApplicationUpdateAPI
+    from grooveply.apis.employer import EmployerAPI
+    from grooveply.apis.goal import GoalAPI
+    from grooveply.apis.search import SearchAPI
+
+    deadline = time.monotonic() + seconds
+    rnd = random.Random(seed)
+    ops, errors = 0, []
+    while time.monotonic() < deadline:
+        try:
+            action = rnd.random()
+            if action < 0.3:
+                ApplicationAPI.get_page(50)
+            elif action < 0.6:
+                EmployerAPI.search("emp", 20)
+            elif action < 0.8:
+                ApplicationUpdateAPI.get_latest(10)
+                GoalAPI.progress_all()
+            else:
+                SearchAPI.search("stress", 20)
+            ops += 1
+        except Exception:
+            errors.append(traceback.format_exc(limit=1))
+    return ops, errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    from grooveply.apis.automation import AutomationAPI
+    from grooveply.apis.goal import GoalAPI
+    from grooveply.db import close_connections
+    from grooveply.migrations import apply_migrations
+
+    apply_migrations()
+    AutomationAPI.create(2, 3, 0, "days")
+    GoalAPI.create(10, 1, "months", "2024-01-01", None)
+    close_connections()
+
+    jobs = [(writer, i) for i in range(args.writers)]
+    jobs += [(reader, i) for i in range(args.readers)]
+
+    with multiprocessing.get_context("spawn").Pool(len(jobs)) as pool:
+        results = pool.starmap(run_job, [(func, i, args.seconds) for func, i in jobs])
+
+    failed = False
+    for (func, i), (ops, errors) in zip(jobs, results):
+        print(f"{func.__name__} {i}: {ops} operations, {len(errors)} errors")
+        for error in errors[:3]:
+            print(f"  {error.strip()}")
+        failed = failed or bool(errors)
+
+    TMP_DIR.cleanup()
+    return 1 if failed else 0
+
+
+def run_job(func, seed: int, seconds: float) -> tuple[int, list[str]]:
+    return func(seed, seconds)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
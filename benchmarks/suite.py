@@ -0,0 +1,290 @@
+"""
+Benchmarks of one database size.
+
+Fills a new database with generated data, then times every *API method,
+update_statuses, the date formatting and the main pages through FastAPI's
+TestClient. Usually run by `python -m benchmarks` once for every size.
+
+    GROOVEPLY_DB=/tmp/bench.db python -m benchmarks.suite --applications 10000
+"""
+
+import argparse
+import inspect
+import itertools
+import json
+import statistics
+import sys
+import time
+from typing import Callable, NamedTuple, Optional
+
+import pendulum
+
+from grooveply.apis import (
+    activity,
+    application,
+    automation,
+    employer,
+    goal,
+    job_board,
+    location,
+    search,
+)
+from grooveply.apis.activity import ActivityAPI
+from grooveply.apis.application import (
+    ApplicationAPI,
+    ApplicationStatusAPI,
+    ApplicationUpdateAPI,
+)
+from grooveply.apis.automation import AutomationAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.apis.goal import GoalAPI
+from grooveply.apis.job_board import JobBoardAPI
+from grooveply.apis.location import LocationAPI
+from grooveply.apis.search import SearchAPI
+from grooveply.auto import update_statuses
+from grooveply.db import get_connection
+from grooveply.migrations import apply_migrations
+from grooveply.settings import TZ
+from grooveply.utils import DateFormatter
+
+from .data import populate
+
+API_MODULES = [activity, application, automation, employer, goal, job_board, location, search]
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[..., object]
+    # Called before every run, returns the arguments of `run`
+    setup: Optional[Callable[[], tuple]] = None
+
+
+def measure(case: Case, min_time: float, max_runs: int) -> dict:
+    """Runs the case at least 3 times and until `min_time` seconds or `max_runs` runs"""
+    times = []
+    while len(times) < 3 or (sum(times) < min_time and len(times) < max_runs):
+        args = case.setup() if case.setup is not None else ()
+        start = time.perf_counter()
+        case.run(*args)
+        times.append(time.perf_counter() - start)
+    return {
+        "runs": len(times),
+        "min_ms": round(min(times) * 1000, 3),
+        "median_ms": round(statistics.median(times) * 1000, 3),
+    }
+
+
+def sample_ids() -> dict:
+    """Ids of rows in the middle of the data to run the single row methods on"""
+    cur = get_connection().cursor()
+    cur.execute("SELECT id, employer_id FROM application ORDER BY id LIMIT 1 OFFSET"
+                " (SELECT COUNT(*) / 2 FROM application)")
+    app_id, employer_id = cur.fetchone()
+    return {
+        "application": app_id,
+        "employer": employer_id,
+        "automation": AutomationAPI.get_all()[0].id,
+        "goal": GoalAPI.get_all()[0].id,
+    }
+
+
+def api_cases(ids: dict) -> list[Case]:
+    counter = itertools.count()
+    status = ApplicationStatusAPI.get_id
+    now = pendulum.now(tz=TZ)
+    year_ago = now.subtract(years=1).to_date_string()
+    today = now.to_date_string()
+    goal = GoalAPI.get(ids["goal"])
+    cursor = ApplicationAPI.get_page(50).next_cursor
+
+    def new_application() -> tuple:
+        return (ApplicationAPI.create(ids["employer"], status("APPLIED"), None, None, "", ""),)
+
+    return [
+        Case("ApplicationStatusAPI.get", lambda: ApplicationStatusAPI.get(1)),
+        Case("ApplicationStatusAPI.get_id", lambda: ApplicationStatusAPI.get_id("APPLIED")),
+        Case(
+            "ApplicationUpdateAPI.get_all",
+            lambda: ApplicationUpdateAPI.get_all(ids["application"]),
+        ),
+        Case(
+            "ApplicationUpdateAPI.get_page",
+            lambda: ApplicationUpdateAPI.get_page(ids["application"], 20),
+        ),
+        Case("ApplicationUpdateAPI.get_latest", lambda: ApplicationUpdateAPI.get_latest(10)),
+        Case(
+            "ApplicationUpdateAPI.get_latest_by_auto",
+            lambda: ApplicationUpdateAPI.get_latest_by_auto(ids["automation"], 10),
+        ),
+        Case(
+            "ApplicationAPI.create",
+            lambda: ApplicationAPI.create(ids["employer"], status("APPLIED"), None, None, "", ""),
+        ),
+        Case("ApplicationAPI.get", lambda: ApplicationAPI.get(ids["application"])),
+        Case(
+            "ApplicationAPI.update",
+            lambda: ApplicationAPI.update(ids["application"], None, None, "https://example.com"),
+        ),
+        Case("ApplicationAPI.delete", ApplicationAPI.delete, new_application),
+        Case("ApplicationAPI.get_all", ApplicationAPI.get_all),
+        Case("ApplicationAPI.get_page", lambda: ApplicationAPI.get_page(50)),
+        Case(
+            "ApplicationAPI.get_page (status)",
+            lambda: ApplicationAPI.get_page(50, status="ACTIVE"),
+        ),
+        Case("ApplicationAPI.get_page (cursor)", lambda: ApplicationAPI.get_page(50, after=cursor)),
+        Case(
+            "ApplicationAPI.count_since",
+            lambda: ApplicationAPI.count_since(now.subtract(days=7).to_date_string()),
+        ),
+        Case("ApplicationAPI.next_status", ApplicationAPI.next_status, new_application),
+        Case(
+            "ApplicationAPI.update_notes",
+            lambda: ApplicationAPI.update_notes(ids["application"], "Notes"),
+        ),
+        Case(
+            "AutomationAPI.create",
+            lambda: AutomationAPI.create(status("TO APPLY"), status("CLOSED"), 365, "days"),
+        ),
+        Case("AutomationAPI.get", lambda: AutomationAPI.get(ids["automation"])),
+        Case("AutomationAPI.get_all", AutomationAPI.get_all),
+        Case(
+            "AutomationAPI.delete",
+            AutomationAPI.delete,
+            lambda: (AutomationAPI.create(status("TO APPLY"), status("CLOSED"), 365, "days"),),
+        ),
+        Case("AutomationAPI.next_due_at", AutomationAPI.next_due_at),
+        Case("EmployerAPI.create", lambda: EmployerAPI.create(f"Benchmark {next(counter)}")),
+        Case("EmployerAPI.get_id", lambda: EmployerAPI.get_id("Benchmark 0")),
+        Case("EmployerAPI.get_page", lambda: EmployerAPI.get_page(ids["employer"])),
+        Case("EmployerAPI.get_all", EmployerAPI.get_all),
+        Case("EmployerAPI.get_total_count", EmployerAPI.get_total_count),
+        Case("EmployerAPI.search", lambda: EmployerAPI.search("ac", 20)),
+        Case("LocationAPI.create", lambda: LocationAPI.create(f"Benchmark {next(counter)}")),
+        Case("LocationAPI.get_id", lambda: LocationAPI.get_id("Berlin")),
+        Case("LocationAPI.get_all", LocationAPI.get_all),
+        Case("LocationAPI.search", lambda: LocationAPI.search("be", 20)),
+        Case("JobBoardAPI.create", lambda: JobBoardAPI.create(f"Benchmark {next(counter)}", None)),
+        Case("JobBoardAPI.get_id", lambda: JobBoardAPI.get_id("LinkedIn")),
+        Case("JobBoardAPI.get_all", JobBoardAPI.get_all),
+        Case("JobBoardAPI.search", lambda: JobBoardAPI.search("li", 20)),
+        Case("GoalAPI.create", lambda: GoalAPI.create(1, 1, "days", today, today)),
+        Case("GoalAPI.get", lambda: GoalAPI.get(ids["goal"])),
+        Case("GoalAPI.get_all", GoalAPI.get_all),
+        Case(
+            "GoalAPI.delete",
+            GoalAPI.delete,
+            lambda: (GoalAPI.create(1, 1, "days", today, today),),
+        ),
+        Case("GoalAPI.period_start", lambda: GoalAPI.period_start(goal, 3)),
+        Case("GoalAPI.period_index", lambda: GoalAPI.period_index(goal, now)),
+        Case("GoalAPI.latest_period_start", lambda: GoalAPI.latest_period_start(goal)),
+        Case("GoalAPI.history", lambda: GoalAPI.history(goal)),
+        Case("GoalAPI.progress_all", GoalAPI.progress_all),
+        Case("ActivityAPI.get_range", lambda: ActivityAPI.get_range(year_ago, today)),
+        Case("ActivityAPI.get_calendar", lambda: ActivityAPI.get_calendar(year_ago, today)),
+        Case("SearchAPI.search", lambda: SearchAPI.search("interview", 20)),
+        Case("update_statuses", update_statuses),
+    ]
+
+
+def format_cases() -> list[Case]:
+    cur = get_connection().cursor()
+    cur.execute("SELECT created_at FROM application")
+    column = [row[0] for row in cur.fetchall()]
+    page = column[:50]
+    return [
+        Case("DateFormatter.format_all (page)", lambda: DateFormatter().format_all(page)),
+        Case("DateFormatter.format_all (column)", lambda: DateFormatter().format_all(column)),
+    ]
+
+
+def page_cases(client, ids: dict) -> list[Case]:
+    def get(url: str) -> Callable[[], object]:
+        def run():
+            response = client.get(url)
+            assert response.status_code == 200, f"{url}: {response.status_code}"
+
+        return run
+
+    urls = [
+        "/api/",
+        "/api/application/",
+        "/api/application/?status=ACTIVE",
+        f"/api/application/{ids['application']}/details",
+        f"/api/application/{ids['application']}/updates",
+        f"/api/application/{ids['application']}/timeline",
+        "/api/employer/",
+        f"/api/employer/{ids['employer']}",
+        "/api/employer/search?q=ac",
+        "/api/goal/",
+        f"/api/goal/{ids['goal']}",
+        "/api/automation/",
+        f"/api/automation/{ids['automation']}",
+        "/api/job_board/",
+        "/api/location/",
+        "/api/activity/",
+        "/api/search?q=interview",
+        "/api/export/applications.csv",
+    ]
+    return [Case(f"GET {url}", get(url)) for url in urls]
+
+
+def uncovered(cases: list[Case]) -> list[str]:
+    """Methods of the *API classes that no case calls"""
+    names = {case.name.split(" ")[0] for case in cases}
+    missing = []
+    for module in API_MODULES:
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if not cls_name.endswith("API") or cls.__module__ != module.__name__:
+                continue
+            for method, _ in inspect.getmembers(cls, inspect.ismethod):
+                if not method.startswith("_") and f"{cls_name}.{method}" not in names:
+                    missing.append(f"{cls_name}.{method}")
+    return missing
+
+
+def run(applications: int, seed: int, min_time: float, max_runs: int) -> dict:
+    from fastapi.testclient import TestClient
+
+    from grooveply.main import app
+
+    apply_migrations()
+    start = time.perf_counter()
+    populate(applications, seed)
+    elapsed = time.perf_counter() - start
+    print(f"{applications} applications generated in {elapsed:.1f} s", file=sys.stderr)
+
+    results = {}
+    with TestClient(app) as client:
+        ids = sample_ids()
+        cases = api_cases(ids) + format_cases() + page_cases(client, ids)
+        for name in uncovered(cases):
+            print(f"Not benchmarked: {name}", file=sys.stderr)
+
+        for case in cases:
+            results[case.name] = measure(case, min_time, max_runs)
+            print(f"{case.name:<50} {results[case.name]['median_ms']:>10.2f} ms", file=sys.stderr)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--applications", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to run every case")
+    parser.add_argument("--max-runs", type=int, default=100)
+    parser.add_argument("--output", help="JSON file for the results, printed if not given")
+    args = parser.parse_args()
+
+    results = run(args.applications, args.seed, args.min_time, args.max_runs)
+    if args.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
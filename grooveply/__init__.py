@@ -2,4 +2,12 @@ __version__ = "0.1.0"
 __author__ = "Ilia Moiseev"
 __author_email__ = "ilia.moiseev.5@yandex.ru"
 
-from .main import main
+
+def __getattr__(name: str):
+    # Resolved on first use so that importing the package, or any module
+    # of it, does not import the app
+    if name == "main":
+        from .cli import main
+
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,45 @@
+import pendulum
+
+from ..db import get_connection
+from ..metrics import instrument
+from ..models import DailyActivity, from_row
+
+
+@instrument
+class ActivityAPI:
+    @classmethod
+    def get_range(cls, since: str, until: str) -> list[DailyActivity]:
+        """
+        Returns the activity of the days between `since` and `until`
+        inclusive, days without any activity are omitted
+        """
+        con = get_connection()
+        cur = con.cursor()
+        cur.execute(
+            "SELECT day, applications, status_changes, user_updates, automation_updates"
+            " FROM daily_activity"
+            " WHERE day BETWEEN ? AND ?"
+            " ORDER BY day",
+            (since, until),
+        )
+        return [
+            from_row(
+                DailyActivity,
+                day=row[0],
+                applications=row[1],
+                status_changes=row[2],
+                user_updates=row[3],
+                automation_updates=row[4],
+            )
+            for row in cur.fetchall()
+        ]
+
+    @classmethod
+    def get_calendar(cls, since: str, until: str) -> list[DailyActivity]:
+        """Same as `get_range` but with an entry for every day of the range"""
+        days = {day.day: day for day in cls.get_range(since, until)}
+        dates = pendulum.interval(pendulum.parse(since), pendulum.parse(until)).range("days")
+        return [
+            days.get(date.to_date_string(), DailyActivity(day=date.to_date_string()))
+            for date in dates
+        ]
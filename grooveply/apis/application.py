@@ -1,93 +1,183 @@
-import sqlite3
+import base64
+import binascii
+import json
 from typing import Optional
 
 import pendulum
 from pendulum import DateTime
 
-from ..db import register_update
+from ..cache import identity_forget, identity_get, identity_put, statuses
+from ..db import get_connection, register_update, timestamp_ms
+from ..metrics import instrument
 from ..models import (
     Application,
+    ApplicationPage,
     ApplicationStatus,
     ApplicationUpdate,
+    ApplicationUpdatePage,
     Employer,
     LatestAutomationUpdateRow,
     LatestUpdateRow,
+    from_row,
 )
-from ..settings import DB_NAME, TZ
+from ..settings import TZ
 
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
 
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(activity_ts: int, id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([activity_ts, id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """Position encoded in a page cursor, InvalidCursor if it is malformed"""
+    try:
+        activity_ts, id = map(int, json.loads(base64.urlsafe_b64decode(cursor.encode())))
+        # Larger values cannot be bound as SQLite integers
+        if not (INT64_MIN <= activity_ts <= INT64_MAX and INT64_MIN <= id <= INT64_MAX):
+            raise ValueError("Cursor out of range")
+    except (binascii.Error, ValueError, TypeError, OverflowError):
+        raise InvalidCursor(f"Invalid cursor {cursor!r}") from None
+    return activity_ts, id
+
+
+def row_to_application(app: tuple) -> Application:
+    """
+    Builds an application from a row of our own database without validating it,
+    the columns are (app.id, emp.id, emp.name, status.name, loc.name, jb.name,
+    app.description, app.url, app.notes, app.status_updated_at, app.created_at)
+    """
+    return from_row(
+        Application,
+        id=app[0],
+        employer=from_row(Employer, id=app[1], name=app[2]),
+        status=from_row(ApplicationStatus, id=None, name=app[3]),
+        location_name=app[4],
+        job_board_name=app[5],
+        description=app[6],
+        url=app[7],
+        notes=app[8],
+        status_updated_at=app[9],
+        created_at=app[10],
+    )
+
+
+def row_to_update(tup: tuple) -> ApplicationUpdate:
+    # triggerer_id is a VARCHAR column and from_row does not convert it,
+    # the queries cast it
+    return from_row(
+        ApplicationUpdate,
+        id=tup[0],
+        description=tup[1],
+        created_at=tup[2],
+        triggerer_type=tup[3],
+        triggerer_id=tup[4],
+        application_id=None,
+    )
+
+
+@instrument
 class ApplicationStatusAPI:
     @classmethod
     def get(self, id: int) -> ApplicationStatus:
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
-        cur.execute("SELECT name from application_status WHERE id = ?", (id,))
-        data = cur.fetchall()[0]
+        return ApplicationStatus(id=id, name=statuses.get_name(id))
 
-        return ApplicationStatus(id=id, name=data[0])
+    @classmethod
+    def get_id(cls, name: str) -> int:
+        return statuses.get_id(name)
 
 
+@instrument
 class ApplicationUpdateAPI:
     @classmethod
     def get_all(self, app_id: int) -> list[ApplicationUpdate]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
-            "SELECT au.id, description, au.created_at, triggerer_type, triggerer_id"
-            " FROM application_update au"
-            " JOIN application_to_update atu ON au.id = atu.update_id"
+            "SELECT au.id, description, au.created_at, triggerer_type,"
+            " CAST(triggerer_id AS INTEGER)"
+            " FROM application_to_update atu"
+            " JOIN application_update au ON au.id = atu.update_id"
             " WHERE atu.application_id = ?"
-            " ORDER BY created_at ASC",
+            " ORDER BY atu.update_created_ts ASC, atu.update_id ASC",
             (app_id,),
         )
+        return [row_to_update(tup) for tup in cur.fetchall()]
+
+    @classmethod
+    def get_page(
+        cls, app_id: int, limit: int, after: Optional[str] = None
+    ) -> ApplicationUpdatePage:
+        """
+        Returns one page of the updates of an application, newest first.
+        `after` is the cursor of the previous page and continues to older updates.
+        """
+        params = [app_id]
+        where = ""
+        if after is not None:
+            where = " AND (atu.update_created_ts, atu.update_id) < (?, ?)"
+            params.extend(decode_cursor(after))
+
+        con = get_connection()
+        cur = con.cursor()
+        # Read newest first from the timeline index, without sorting the updates
+        cur.execute(
+            "SELECT au.id, description, au.created_at, triggerer_type,"
+            " CAST(triggerer_id AS INTEGER), atu.update_created_ts"
+            " FROM application_to_update atu"
+            " JOIN application_update au ON au.id = atu.update_id"
+            " WHERE atu.application_id = ?"
+            f"{where}"
+            " ORDER BY atu.update_created_ts DESC, atu.update_id DESC"
+            " LIMIT ?",
+            (*params, limit + 1),
+        )
         data = cur.fetchall()
-        updates = []
-        for tup in data:
-            updates.append(
-                ApplicationUpdate(
-                    id=tup[0],
-                    description=tup[1],
-                    created_at=tup[2],
-                    triggerer_type=tup[3],
-                    triggerer_id=tup[4],
-                )
-            )
-        return updates
+
+        items = [row_to_update(tup) for tup in data[:limit]]
+        if len(data) <= limit:
+            return ApplicationUpdatePage(items=items)
+        last = data[limit - 1]
+        return ApplicationUpdatePage(items=items, next_cursor=encode_cursor(last[5], last[0]))
 
     @classmethod
     def get_latest(self, limit: int) -> list[LatestUpdateRow]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
+        # CROSS JOIN keeps application_update as the outer loop so that
+        # the newest updates are walked by the created_ts index
         cur.execute(
             "SELECT au.description, au.created_at, triggerer_type, triggerer_id,"
             " atu.application_id, emp.name"
             " FROM application_update au"
-            " JOIN application_to_update atu ON au.id = atu.update_id"
+            " CROSS JOIN application_to_update atu ON au.id = atu.update_id"
             " JOIN application app"
             " ON atu.application_id = app.id"
             " JOIN employer emp"
             " ON app.employer_id = emp.id"
-            " ORDER BY au.created_at DESC"
+            " ORDER BY au.created_ts DESC"
             " LIMIT ?",
             (limit,),
         )
-        data = cur.fetchall()
-        updates = []
-        for tup in data:
-            updates.append(
-                LatestUpdateRow(
-                    description=tup[0],
-                    created_at=tup[1],
-                    triggerer=f"{tup[2]} {tup[3]}",
-                    application_id=tup[4],
-                    employer=tup[5],
-                )
+        return [
+            from_row(
+                LatestUpdateRow,
+                description=tup[0],
+                created_at=tup[1],
+                triggerer=f"{tup[2]} {tup[3]}",
+                application_id=tup[4],
+                employer=tup[5],
             )
-        return updates
+            for tup in cur.fetchall()
+        ]
 
     @classmethod
     def get_latest_by_auto(self, auto_id: int, limit: int) -> list[LatestAutomationUpdateRow]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
             "SELECT atu.application_id, au.created_at"
@@ -96,22 +186,17 @@ class ApplicationUpdateAPI:
             " ON au.id = atu.update_id"
             " WHERE au.triggerer_id = ?"
             " AND au.triggerer_type = 'automation'"
-            " ORDER BY au.created_at DESC"
+            " ORDER BY au.created_ts DESC"
             " LIMIT ?",
             (auto_id, limit),
         )
-        data = cur.fetchall()
-        updates = []
-        for tup in data:
-            updates.append(
-                LatestAutomationUpdateRow(
-                    application_id=tup[0],
-                    created_at=tup[1]
-                )
-            )
-        return updates
+        return [
+            from_row(LatestAutomationUpdateRow, application_id=tup[0], created_at=tup[1])
+            for tup in cur.fetchall()
+        ]
 
 
+@instrument
 class ApplicationAPI:
     @classmethod
     def create(
@@ -124,33 +209,42 @@ class ApplicationAPI:
         url: str,
     ) -> int:
         now = pendulum.now(tz=TZ)
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
-        cur.execute(
-            "INSERT INTO application"
-            " (employer_id, status_id, location_id,"
-            " job_board_id,"
-            " description, url, status_updated_at, created_at) VALUES"
-            " (?, ?, ?, ?, ?, ?, ?, ?)"
-            " RETURNING id",
-            (
-                employer_id,
-                status_id,
-                location_id,
-                job_board_id,
-                description,
-                url,
-                str(now),
-                str(now),
-            ),
-        )
-        app_id = cur.fetchall()[0][0]
-        con.commit()
+        con = get_connection()
+        with con:
+            cur = con.cursor()
+            cur.execute(
+                "INSERT INTO application"
+                " (employer_id, status_id, location_id,"
+                " job_board_id,"
+                " description, url, status_updated_at, created_at, last_activity_at,"
+                " status_updated_ts, created_ts, last_activity_ts) VALUES"
+                " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " RETURNING id",
+                (
+                    employer_id,
+                    status_id,
+                    location_id,
+                    job_board_id,
+                    description,
+                    url,
+                    str(now),
+                    str(now),
+                    str(now),
+                    timestamp_ms(now),
+                    timestamp_ms(now),
+                    timestamp_ms(now),
+                ),
+            )
+            app_id = cur.fetchall()[0][0]
         return app_id
 
     @classmethod
     def get(self, id: int) -> Application:
-        con = sqlite3.connect(DB_NAME)
+        app = identity_get("application", id)
+        if app is not None:
+            return app
+
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
             "SELECT app.id, emp.id, emp.name, status.name, loc.name, jb.name, app.description,"
@@ -167,20 +261,8 @@ class ApplicationAPI:
             " WHERE app.id = ?",
             (id,),
         )
-        data = cur.fetchall()[0]
-
-        app = Application(
-            id=data[0],
-            employer=Employer(id=data[1], name=data[2]),
-            status=ApplicationStatus(name=data[3]),
-            location_name=data[4],
-            job_board_name=data[5],
-            description=data[6],
-            url=data[7],
-            notes=data[8],
-            status_updated_at=data[9],
-            created_at=data[10],
-        )
+        app = row_to_application(cur.fetchall()[0])
+        identity_put("application", id, app)
         return app
 
     @classmethod
@@ -191,109 +273,172 @@ class ApplicationAPI:
         status_updated_at: Optional[DateTime],
         url: Optional[str],
     ):
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
+        identity_forget("application", id)
+        con = get_connection()
+        with con:
+            cur = con.cursor()
 
-        cur.execute(
-            """
-            UPDATE application
-            SET status_id = COALESCE(?, status_id),
-            status_updated_at = COALESCE(?, status_updated_at),
-            url = COALESCE(?, url)
-            WHERE id = ?;
-            """,
-            (status_id, status_updated_at, url, id),
-        )
-        con.commit()
+            cur.execute(
+                """
+                UPDATE application
+                SET status_id = COALESCE(?, status_id),
+                status_updated_at = COALESCE(?, status_updated_at),
+                status_updated_ts = COALESCE(?, status_updated_ts),
+                url = COALESCE(?, url)
+                WHERE id = ?;
+                """,
+                (
+                    status_id,
+                    status_updated_at,
+                    timestamp_ms(status_updated_at) if status_updated_at is not None else None,
+                    url,
+                    id,
+                ),
+            )
 
     @classmethod
     def delete(self, id: int):
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
+        identity_forget("application", id)
+        con = get_connection()
+        with con:
+            cur = con.cursor()
 
-        cur.execute("DELETE FROM application WHERE id = ?", (id,))
-        con.commit()
+            cur.execute("DELETE FROM application WHERE id = ?", (id,))
 
     @classmethod
     def get_all(cls) -> list[Application]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
-            "WITH latest_updates AS ("
-            "SELECT a.id,"
-            " MAX(au.created_at) as latest_update_time FROM application a"
-            " LEFT JOIN application_to_update atu ON a.id = atu.application_id"
-            " LEFT JOIN application_update au ON atu.update_id = au.id"
-            " GROUP BY a.id"
-            ")"
             "SELECT app.id, emp.id, emp.name, status.name, loc.name, "
             " jb.name,"
             " app.description, app.url, app.notes, app.status_updated_at, app.created_at"
             " FROM application app"
-            " JOIN latest_updates lu ON app.id = lu.id"
             " JOIN employer emp ON app.employer_id = emp.id"
             " JOIN application_status status ON app.status_id = status.id"
             " LEFT JOIN location loc ON app.location_id = loc.id"
             " LEFT JOIN job_board jb ON app.job_board_id = jb.id"
-            " ORDER BY COALESCE(lu.latest_update_time, app.created_at) DESC"
+            " ORDER BY app.last_activity_ts DESC"
+        )
+        return [row_to_application(app) for app in cur.fetchall()]
+
+    @classmethod
+    def get_page(
+        cls,
+        limit: int,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> ApplicationPage:
+        """
+        Returns one page of applications ordered by the latest activity,
+        newest first.
+
+        Pages are addressed by the cursors of the previous page: `after`
+        continues to older applications, `before` goes back to newer ones.
+        """
+        if after is not None:
+            cursor, direction = decode_cursor(after), "<"
+        elif before is not None:
+            cursor, direction = decode_cursor(before), ">"
+        else:
+            cursor, direction = None, "<"
+        order = "DESC" if direction == "<" else "ASC"
+
+        conditions, params = [], []
+        if status is not None:
+            conditions.append("app.status_id = (SELECT id FROM application_status WHERE name = ?)")
+            params.append(status)
+        if cursor is not None:
+            conditions.append(f"(app.last_activity_ts, app.id) {direction} (?, ?)")
+            params.extend(cursor)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        con = get_connection()
+        cur = con.cursor()
+        cur.execute(
+            "SELECT app.id, emp.id, emp.name, status.name, loc.name, "
+            " jb.name,"
+            " app.description, app.url, app.notes, app.status_updated_at, app.created_at,"
+            " app.last_activity_ts"
+            " FROM application app"
+            " JOIN employer emp ON app.employer_id = emp.id"
+            " JOIN application_status status ON app.status_id = status.id"
+            " LEFT JOIN location loc ON app.location_id = loc.id"
+            " LEFT JOIN job_board jb ON app.job_board_id = jb.id"
+            f"{where}"
+            f" ORDER BY app.last_activity_ts {order}, app.id {order}"
+            " LIMIT ?",
+            (*params, limit + 1),
         )
         data = cur.fetchall()
 
-        results = []
-        for app in data:
-            results.append(
-                Application(
-                    id=app[0],
-                    employer=Employer(id=app[1], name=app[2]),
-                    status=ApplicationStatus(name=app[3]),
-                    location_name=app[4],
-                    job_board_name=app[5],
-                    description=app[6],
-                    url=app[7],
-                    notes=app[8],
-                    status_updated_at=app[9],
-                    created_at=app[10],
-                )
+        has_more = len(data) > limit
+        data = data[:limit]
+        if direction == ">":
+            data.reverse()
+
+        items = [row_to_application(app) for app in data]
+
+        if not data:
+            return ApplicationPage(items=items)
+
+        first = encode_cursor(data[0][11], data[0][0])
+        last = encode_cursor(data[-1][11], data[-1][0])
+        if direction == "<":
+            return ApplicationPage(
+                items=items,
+                next_cursor=last if has_more else None,
+                prev_cursor=first if cursor is not None else None,
             )
-        return results
+        return ApplicationPage(
+            items=items,
+            next_cursor=last,
+            prev_cursor=first if has_more else None,
+        )
 
     @classmethod
     def count_since(cls, date: str) -> int:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
             "SELECT COUNT(*) FROM application app"
-            " WHERE created_at > ?", (date,)
+            " WHERE created_ts > ?", (timestamp_ms(date),)
         )
         cnt = cur.fetchone()[0]
         return cnt
 
     @classmethod
     def next_status(cls, id: int):
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
+        identity_forget("application", id)
+        con = get_connection()
+        with con:
+            cur = con.cursor()
+            # The status is read and changed in one transaction holding the write lock,
+            # so that the update always describes the change that was made
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("SELECT status_id, ast.name FROM application app"
+                        " JOIN application_status ast ON app.status_id = ast.id"
+                        " WHERE app.id = ?", (id, ))
+            old_status_id, old_status_name = cur.fetchone()
 
-        cur.execute("SELECT status_id, ast.name FROM application app"
-                    " JOIN application_status ast ON app.status_id = ast.id"
-                    " WHERE app.id = ?", (id, ))
-        old_status_id, old_status_name = cur.fetchone()
+            cur.execute("SELECT id, name FROM application_status"
+                        " WHERE id > ? ORDER BY id ASC"
+                        " LIMIT 1", (old_status_id,))
+            result = cur.fetchone()
 
-        cur.execute("SELECT id, name FROM application_status"
-                    " WHERE id > ? ORDER BY id ASC"
-                    " LIMIT 1", (old_status_id,))
-        result = cur.fetchone()
-
-        if result is not None:
-            next_status_id, new_status_name = result
-
-            register_update(id, f"Changed status {old_status_name} -> {new_status_name}", "user", 1)
-            cur.execute("UPDATE application SET status_id = ?"
-                        " WHERE id = ?", (next_status_id, id))
-            con.commit()
+            if result is not None:
+                next_status_id, new_status_name = result
+                register_update(
+                    id, f"Changed status {old_status_name} -> {new_status_name}", "user", 1, cur
+                )
+                cur.execute("UPDATE application SET status_id = ?"
+                            " WHERE id = ?", (next_status_id, id))
 
     @classmethod
     def update_notes(cls, id: int, note: str):
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
-        cur.execute("UPDATE application SET notes = ? where id = ?", (note, id))
-        con.commit()
+        identity_forget("application", id)
+        con = get_connection()
+        with con:
+            cur = con.cursor()
+            cur.execute("UPDATE application SET notes = ? where id = ?", (note, id))
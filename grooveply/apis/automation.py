@@ -1,85 +1,99 @@
-import sqlite3
+from typing import Optional
 
 import pendulum
+from pendulum import DateTime
 
-from ..models import Automation, TimePeriod
-from ..settings import DB_NAME, TZ
-from .application import ApplicationStatusAPI
+from ..db import get_connection
+from ..metrics import instrument
+from ..models import ApplicationStatus, Automation, TimePeriod, from_row
+from ..settings import TZ
 
+SELECT_AUTOMATION = (
+    "SELECT auto.id, auto.if_status_is, if_status.name,"
+    " auto.change_status_to, to_status.name,"
+    " auto.after, auto.period, auto.created_at"
+    " FROM automation auto"
+    " JOIN application_status if_status ON auto.if_status_is = if_status.id"
+    " JOIN application_status to_status ON auto.change_status_to = to_status.id"
+)
 
+
+def row_to_automation(auto: tuple) -> Automation:
+    return from_row(
+        Automation,
+        id=auto[0],
+        if_status_is=from_row(ApplicationStatus, id=auto[1], name=auto[2]),
+        change_status_to=from_row(ApplicationStatus, id=auto[3], name=auto[4]),
+        after=auto[5],
+        period=auto[6],
+        created_at=auto[7],
+    )
+
+
+@instrument
 class AutomationAPI:
     @classmethod
     def create(
         self, if_status_is_id: int, change_status_to_id: int, after: int, period: TimePeriod
     ) -> int:
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
+        con = get_connection()
+        with con:
+            cur = con.cursor()
 
-        now = str(pendulum.now(tz=TZ))
-        cur.execute(
-            "INSERT INTO automation "
-            "(if_status_is, change_status_to, after, period, created_at) VALUES"
-            " (?, ?, ?, ?, ?)"
-            " RETURNING id",
-            (
-                if_status_is_id,
-                change_status_to_id,
-                after,
-                period,
-                now,
-            ),
-        )
-        auto_id = cur.fetchall()[0][0]
-        con.commit()
+            now = str(pendulum.now(tz=TZ))
+            cur.execute(
+                "INSERT INTO automation "
+                "(if_status_is, change_status_to, after, period, created_at) VALUES"
+                " (?, ?, ?, ?, ?)"
+                " RETURNING id",
+                (
+                    if_status_is_id,
+                    change_status_to_id,
+                    after,
+                    period,
+                    now,
+                ),
+            )
+            auto_id = cur.fetchall()[0][0]
         return auto_id
 
     @classmethod
     def get(self, id: int) -> Automation:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
-        cur.execute(
-            "SELECT id, if_status_is, change_status_to, after, period, created_at"
-            " FROM automation WHERE id = ?",
-            (id,),
-        )
-        auto = cur.fetchall()[0]
-        return Automation(
-            id=auto[0],
-            if_status_is=ApplicationStatusAPI.get(auto[1]),
-            change_status_to=ApplicationStatusAPI.get(auto[2]),
-            after=auto[3],
-            period=auto[4],
-            created_at=auto[5],
-        )
+        cur.execute(f"{SELECT_AUTOMATION} WHERE auto.id = ?", (id,))
+        return row_to_automation(cur.fetchall()[0])
 
     @classmethod
     def get_all(self) -> list[Automation]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
-        cur.execute(
-            "SELECT id, if_status_is, change_status_to, after, period, created_at"
-            " FROM automation"
-        )
-        data = cur.fetchall()
-
-        # TODO: make joins instead of fetching a lot of times
-        results = []
-        for auto in data:
-            results.append(
-                Automation(
-                    id=auto[0],
-                    if_status_is=ApplicationStatusAPI.get(auto[1]),
-                    change_status_to=ApplicationStatusAPI.get(auto[2]),
-                    after=auto[3],
-                    period=auto[4],
-                    created_at=auto[5],
-                )
-            )
-        return results
+        cur.execute(SELECT_AUTOMATION)
+        return [row_to_automation(auto) for auto in cur.fetchall()]
 
     @classmethod
     def delete(self, id: int):
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
+        with con:
+            cur = con.cursor()
+            cur.execute("DELETE FROM automation WHERE id = ?", (id,))
+
+    @classmethod
+    def next_due_at(cls) -> Optional[DateTime]:
+        """Returns when the earliest application will match some automation"""
+        con = get_connection()
         cur = con.cursor()
-        cur.execute("DELETE FROM automation WHERE id = ?", (id,))
-        con.commit()
+        cur.execute(
+            "SELECT after, period,"
+            " (SELECT MIN(status_updated_ts) FROM application"
+            " WHERE status_id = auto.if_status_is)"
+            " FROM automation auto"
+        )
+        data = cur.fetchall()
+
+        due = [
+            pendulum.from_timestamp(since / 1000, tz=TZ).add(**{period: after})
+            for after, period, since in data
+            if since is not None
+        ]
+        return min(due, default=None)
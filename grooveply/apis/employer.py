@@ -1,11 +1,13 @@
-import sqlite3
 from typing import List, Optional
 
 import pendulum
 from pydantic import BaseModel
 
-from ..models import EmployerPage
-from ..settings import DB_NAME, TZ
+from ..cache import employers
+from ..db import get_connection, search_names
+from ..metrics import instrument
+from ..models import EmployerPage, from_row
+from ..settings import TZ
 
 
 class Employer(BaseModel):
@@ -15,28 +17,34 @@ class Employer(BaseModel):
     latest_apply: str
 
 
+@instrument
 class EmployerAPI:
     @classmethod
     def create(cls, name: str) -> int:
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
+        con = get_connection()
+        with con:
+            cur = con.cursor()
 
-        now = str(pendulum.now(tz=TZ))
-        cur.execute(
-            "INSERT INTO employer (name, created_at) VALUES"
-            " (?, ?)"
-            " ON CONFLICT (name) DO UPDATE set name = excluded.name,"
-            " created_at = employer.created_at"
-            " RETURNING id",
-            (name, now),
-        )
-        new_id = cur.fetchall()[0][0]
-        con.commit()
+            now = str(pendulum.now(tz=TZ))
+            cur.execute(
+                "INSERT INTO employer (name, created_at) VALUES"
+                " (?, ?)"
+                " ON CONFLICT (name) DO UPDATE set name = excluded.name,"
+                " created_at = employer.created_at"
+                " RETURNING id",
+                (name, now),
+            )
+            new_id = cur.fetchall()[0][0]
+        employers.add(new_id, name)
         return new_id
 
+    @classmethod
+    def get_id(cls, name: str) -> Optional[int]:
+        return employers.get_id(name)
+
     @classmethod
     def get_page(cls, id: int) -> EmployerPage:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
             "SELECT id, name, created_at FROM employer WHERE id = ?",
@@ -73,7 +81,7 @@ class EmployerAPI:
 
     @classmethod
     def get_all(cls) -> List[Employer]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
             """
@@ -81,18 +89,20 @@ class EmployerAPI:
                 e.id,
                 e.name,
                 count(a.id) as application_count,
-                max(a.created_at) as latest_apply
+                a.created_at as latest_apply,
+                max(a.created_ts) as latest_apply_ts
             FROM employer as e
             JOIN application a
             ON a.employer_id = e.id
             GROUP BY e.id
-            ORDER BY a.created_at DESC
+            ORDER BY latest_apply_ts DESC
             """,
         )
         data = cur.fetchall()
 
         return [
-            Employer(
+            from_row(
+                Employer,
                 id=item[0],
                 name=item[1],
                 application_count=item[2],
@@ -103,7 +113,11 @@ class EmployerAPI:
 
     @classmethod
     def get_total_count(cls) -> int:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute("SELECT COUNT(id) FROM employer")
         return cur.fetchone()[0]
+
+    @classmethod
+    def search(cls, q: str, limit: int) -> list[str]:
+        return search_names("employer", q, limit)
@@ -1,36 +1,46 @@
-import sqlite3
+from bisect import bisect_right
 from typing import Optional
 
 import pendulum
 
-from ..apis.application import ApplicationAPI
-from ..models import Goal, TimePeriod
-from ..settings import DB_NAME, TZ
+from ..apis.activity import ActivityAPI
+from ..db import get_connection
+from ..metrics import instrument
+from ..models import Goal, GoalPeriod, GoalProgress, TimePeriod, from_row
+from ..settings import TZ
 
 
+def goal_end(goal: Goal) -> Optional[pendulum.DateTime]:
+    """End of the last day of the goal in TZ, None if it has no end date"""
+    if goal.end_date is None:
+        return None
+    return pendulum.parse(goal.end_date, tz=TZ).end_of("day")
+
+
+@instrument
 class GoalAPI:
     @classmethod
     def create(
         cls, value: int, each: int, period: TimePeriod, start_date: str, end_date: Optional[str]
     ) -> int:
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
+        con = get_connection()
+        with con:
+            cur = con.cursor()
 
-        now = str(pendulum.now(tz=TZ))
-        cur.execute(
-            "INSERT INTO application_goal"
-            " (value, each, period, start_date, end_date, created_at) VALUES"
-            " (?, ?, ?, ?, ?, ?)"
-            " RETURNING id",
-            (value, each, period, start_date, end_date, now),
-        )
-        new_id = cur.fetchall()[0][0]
-        con.commit()
+            now = str(pendulum.now(tz=TZ))
+            cur.execute(
+                "INSERT INTO application_goal"
+                " (value, each, period, start_date, end_date, created_at) VALUES"
+                " (?, ?, ?, ?, ?, ?)"
+                " RETURNING id",
+                (value, each, period, start_date, end_date, now),
+            )
+            new_id = cur.fetchall()[0][0]
         return new_id
 
     @classmethod
     def get(cls, id: int) -> Goal:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
             "SELECT id, value, each, period,"
@@ -52,47 +62,136 @@ class GoalAPI:
 
     @classmethod
     def get_all(cls) -> list[Goal]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute(
             "SELECT id, value, each, period,"
             " start_date, end_date, created_at"
             " FROM application_goal"
         )
-        data = cur.fetchall()
-
-        goals = []
-        for item in data:
-            goals.append(
-                Goal(
-                    id=item[0],
-                    value=item[1],
-                    each=item[2],
-                    period=item[3],
-                    start_date=item[4],
-                    end_date=item[5],
-                    created_at=item[6],
-                )
+        return [
+            from_row(
+                Goal,
+                id=item[0],
+                value=item[1],
+                each=item[2],
+                period=item[3],
+                start_date=item[4],
+                end_date=item[5],
+                created_at=item[6],
             )
-        return goals
+            for item in cur.fetchall()
+        ]
 
     @classmethod
     def delete(self, id: int):
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
-        cur.execute(
-            "DELETE FROM application_goal WHERE id = ?",
-            (id,),
-        )
-        con.commit()
+        con = get_connection()
+        with con:
+            cur = con.cursor()
+            cur.execute(
+                "DELETE FROM application_goal WHERE id = ?",
+                (id,),
+            )
+
+    @classmethod
+    def period_start(cls, goal: Goal, index: int) -> pendulum.DateTime:
+        """
+        Start of the goal's period number `index`. Periods follow the calendar,
+        each of them starts at midnight and monthly periods keep the day
+        of the month of the start date where the month has one.
+        """
+        start = pendulum.parse(goal.start_date, tz=TZ).start_of("day")
+        return start.add(**{goal.period: goal.each * index})
+
+    @classmethod
+    def period_index(cls, goal: Goal, at: pendulum.DateTime) -> int:
+        start = cls.period_start(goal, 0)
+        if at < start:
+            return 0
+
+        if goal.period == "days":
+            index = (at.date() - start.date()).days // goal.each
+        elif goal.period == "months":
+            index = ((at.year - start.year) * 12 + at.month - start.month) // goal.each
+        else:
+            index = (at.year - start.year) // goal.each
+
+        # Counting calendar units overshoots by one period at most
+        if cls.period_start(goal, index) > at:
+            index -= 1
+        return index
 
     @classmethod
     def latest_period_start(cls, goal: Goal) -> pendulum.DateTime:
         now = pendulum.now(tz=TZ)
-        start_date = pendulum.parse(goal.start_date)
+        return cls.period_start(goal, cls.period_index(goal, now))
+
+    @classmethod
+    def history(cls, goal: Goal, periods: int = 12) -> list[GoalPeriod]:
+        """
+        Returns up to `periods` latest periods of the goal, oldest first,
+        the last one is the current period or the one the goal ended in.
+        """
+        until = pendulum.now(tz=TZ)
+        end = goal_end(goal)
+        if end is not None:
+            until = min(until, end)
+
+        last = cls.period_index(goal, until)
+        indices = range(max(0, last - periods + 1), last + 2)
+        bounds = [cls.period_start(goal, index).to_date_string() for index in indices]
+
+        done = [0] * (len(bounds) - 1)
+        for day in ActivityAPI.get_range(bounds[0], bounds[-1]):
+            pos = bisect_right(bounds, day.day) - 1
+            if pos < len(done):
+                done[pos] += day.applications
+
+        return [
+            GoalPeriod(
+                start=start, end=end, done=cnt, goal=goal.value, met=cnt >= goal.value
+            )
+            for start, end, cnt in zip(bounds, bounds[1:], done)
+        ]
+
+    @classmethod
+    def progress_all(cls, include_expired: bool = False) -> list[GoalProgress]:
+        """
+        Returns the progress of every goal in the current period.
+
+        Applications are counted for all goals at once from the daily rollup,
+        reading only the days since the earliest period start. Goals past
+        their end date are skipped or, with `include_expired`, returned
+        without progress.
+        """
+        now = pendulum.now(tz=TZ)
+        progress = []
+        for goal in cls.get_all():
+            end = goal_end(goal)
+            if end is not None and end < now:
+                if include_expired:
+                    progress.append(GoalProgress(goal=goal))
+                continue
+            progress.append(
+                GoalProgress(
+                    goal=goal, period_start=cls.latest_period_start(goal).to_date_string()
+                )
+            )
+
+        starts = [item.period_start for item in progress if item.period_start is not None]
+        if not starts:
+            return progress
+
+        con = get_connection()
+        cur = con.cursor()
+        cur.execute(
+            f"SELECT {', '.join(['TOTAL(applications * (day >= ?))'] * len(starts))}"
+            " FROM daily_activity WHERE day >= ?",
+            (*starts, min(starts)),
+        )
+        counts = iter(cur.fetchone())
 
-        rem_days = (now - start_date).total_days() % pendulum.Duration(
-            **{goal.period: goal.each}
-        ).total_days()
-        latest_period_start = now - pendulum.Duration(days=rem_days)
-        return latest_period_start
+        for item in progress:
+            if item.period_start is not None:
+                item.done = int(next(counts))
+        return progress
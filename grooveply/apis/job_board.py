@@ -1,39 +1,50 @@
-import sqlite3
 from typing import Optional
 
 import pendulum
 
-from ..models import JobBoard
-from ..settings import DB_NAME, TZ
+from ..cache import job_boards
+from ..db import get_connection, search_names
+from ..metrics import instrument
+from ..models import JobBoard, from_row
+from ..settings import TZ
 
 
+@instrument
 class JobBoardAPI:
     @classmethod
     def create(cls, name: str, url: Optional[str]) -> int:
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
+        con = get_connection()
+        with con:
+            cur = con.cursor()
 
-        now = pendulum.now(tz=TZ)
-        cur.execute(
-            "INSERT INTO job_board (name, url, created_at) VALUES"
-            " (?, ?, ?)"
-            " ON CONFLICT (name) DO UPDATE set name = excluded.name"
-            " ON CONFLICT (url) DO UPDATE set url = excluded.url"
-            " RETURNING id",
-            (name, url, str(now)),
-        )
-        new_id = cur.fetchall()[0][0]
-        con.commit()
+            now = pendulum.now(tz=TZ)
+            cur.execute(
+                "INSERT INTO job_board (name, url, created_at) VALUES"
+                " (?, ?, ?)"
+                " ON CONFLICT (name) DO UPDATE set name = excluded.name"
+                " ON CONFLICT (url) DO UPDATE set url = excluded.url"
+                " RETURNING id, name",
+                (name, url, str(now)),
+            )
+            # A conflict on url returns the board that already has it
+            new_id, new_name = cur.fetchall()[0]
+        job_boards.add(new_id, new_name)
         return new_id
 
+    @classmethod
+    def get_id(cls, name: str) -> Optional[int]:
+        return job_boards.get_id(name)
+
     @classmethod
     def get_all(self) -> list[JobBoard]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute("SELECT id, name, url, created_at FROM job_board")
-        data = cur.fetchall()
+        return [
+            from_row(JobBoard, id=row[0], name=row[1], url=row[2], created_at=row[3])
+            for row in cur.fetchall()
+        ]
 
-        jbs = []
-        for row in data:
-            jbs.append(JobBoard(id=row[0], name=row[1], url=row[2], created_at=row[3]))
-        return jbs
+    @classmethod
+    def search(cls, q: str, limit: int) -> list[str]:
+        return search_names("job_board", q, limit)
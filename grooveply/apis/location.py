@@ -1,37 +1,48 @@
-import sqlite3
+from typing import Optional
 
 import pendulum
 
-from ..models import Location
-from ..settings import DB_NAME, TZ
+from ..cache import locations
+from ..db import get_connection, search_names
+from ..metrics import instrument
+from ..models import Location, from_row
+from ..settings import TZ
 
 
+@instrument
 class LocationAPI:
     @classmethod
     def create(cls, name: str) -> int:
-        con = sqlite3.connect(DB_NAME)
-        cur = con.cursor()
+        con = get_connection()
+        with con:
+            cur = con.cursor()
 
-        now = pendulum.now(tz=TZ)
-        cur.execute(
-            "INSERT INTO location (name, created_at) VALUES"
-            " (?, ?)"
-            " ON CONFLICT (name) DO UPDATE set name = excluded.name"
-            " RETURNING id",
-            (name, str(now)),
-        )
-        new_id = cur.fetchall()[0][0]
-        con.commit()
+            now = pendulum.now(tz=TZ)
+            cur.execute(
+                "INSERT INTO location (name, created_at) VALUES"
+                " (?, ?)"
+                " ON CONFLICT (name) DO UPDATE set name = excluded.name"
+                " RETURNING id",
+                (name, str(now)),
+            )
+            new_id = cur.fetchall()[0][0]
+        locations.add(new_id, name)
         return new_id
 
+    @classmethod
+    def get_id(cls, name: str) -> Optional[int]:
+        return locations.get_id(name)
+
     @classmethod
     def get_all(self) -> list[Location]:
-        con = sqlite3.connect(DB_NAME)
+        con = get_connection()
         cur = con.cursor()
         cur.execute("SELECT id, name, created_at FROM location")
-        data = cur.fetchall()
+        return [
+            from_row(Location, id=row[0], name=row[1], created_at=row[2])
+            for row in cur.fetchall()
+        ]
 
-        locs = []
-        for row in data:
-            locs.append(Location(id=row[0], name=row[1], created_at=row[2]))
-        return locs
+    @classmethod
+    def search(cls, q: str, limit: int) -> list[str]:
+        return search_names("location", q, limit)
@@ -0,0 +1,62 @@
+import re
+
+from ..db import get_connection
+from ..metrics import instrument
+from ..models import SearchResult
+
+
+# Marks of the matched terms in the snippets, control characters
+# that do not occur in the text, replaced after escaping it
+MATCH_START, MATCH_END = "\x02", "\x03"
+MARKDOWN_SPECIAL = re.compile(r"([!-/:-@\[-`{-~])")
+
+
+def snippet_markdown(snippet: str) -> str:
+    """Markdown of a snippet, the text escaped and the matched terms in bold"""
+    text = MARKDOWN_SPECIAL.sub(r"\\\1", snippet.strip())
+    return text.replace(MATCH_START, "**").replace(MATCH_END, "**")
+
+
+def match_query(q: str) -> str:
+    """
+    Turns user input into an FTS5 query matching all the words,
+    the last one as a prefix since it may still be typed
+    """
+    terms = ['"' + word.replace('"', '""') + '"' for word in q.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+@instrument
+class SearchAPI:
+    @classmethod
+    def search(cls, q: str, limit: int, offset: int = 0) -> list[SearchResult]:
+        query = match_query(q)
+        if not query:
+            return []
+
+        con = get_connection()
+        cur = con.cursor()
+        cur.execute(
+            "SELECT si.application_id, si.update_id, emp.name,"
+            " snippet(search_index, -1, ?, ?, '...', 16)"
+            " FROM search_index si"
+            " JOIN application app ON app.id = si.application_id"
+            " JOIN employer emp ON app.employer_id = emp.id"
+            " WHERE search_index MATCH ?"
+            " ORDER BY rank"
+            " LIMIT ? OFFSET ?",
+            (MATCH_START, MATCH_END, query, limit, offset),
+        )
+        data = cur.fetchall()
+
+        return [
+            SearchResult(
+                application_id=row[0],
+                update_id=row[1],
+                employer=row[2],
+                snippet=snippet_markdown(row[3]),
+            )
+            for row in data
+        ]
@@ -1,47 +1,95 @@
-import sqlite3
+import logging
 
 import pendulum
 
 from grooveply.apis.automation import AutomationAPI
-from grooveply.db import register_update
-from grooveply.settings import DB_NAME, TZ
+from grooveply.db import get_connection, timestamp_ms
+from grooveply.settings import TZ
 
+logger = logging.getLogger(__name__)
 
-def update_statuses():
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
 
-    automations = AutomationAPI.get_all()
+def update_statuses() -> dict[int, int]:
+    """
+    Applies all automations in a single transaction.
 
-    for auto in automations:
-        sql = (
-            "UPDATE application SET"
-            " status_id = ?,"
-            " status_updated_at = ?"
-            "WHERE id IN "
-            "(SELECT id FROM application"
-            f" WHERE datetime(status_updated_at, '+{auto.after} {auto.period}') <= datetime()"
-            " AND status_id = ?)"
-            " RETURNING application.id"
-        )
+    Every rule moves its due applications in one UPDATE and the matching
+    updates are inserted in bulk at the end, so the cost depends on the number
+    of rules and not on the number of changed applications.
+
+    Returns the number of applications changed by each automation.
+    """
+    automations = AutomationAPI.get_all()
+    now = pendulum.now(tz=TZ)
+    created_at = status_updated_at = str(now)
+    now_ts = timestamp_ms(now)
 
+    con = get_connection()
+    changed = {}
+    with con:
+        cur = con.cursor()
+        # Take the write lock upfront, a deferred transaction that reads first
+        # fails instead of waiting when another connection is writing
+        cur.execute("BEGIN IMMEDIATE")
         cur.execute(
-            sql,
-            (
-                auto.change_status_to.id,
-                str(pendulum.now(tz=TZ)),
-                auto.if_status_is.id,
-            ),
+            "CREATE TEMP TABLE IF NOT EXISTS automation_change("
+            "id INTEGER PRIMARY KEY NOT NULL,"
+            "application_id INTEGER NOT NULL,"
+            "automation_id INTEGER NOT NULL,"
+            "description TEXT NOT NULL"
+            ")"
         )
+        cur.execute("DELETE FROM temp.automation_change")
 
-        updated_app_ids = cur.fetchall()
-        con.commit()
+        for auto in automations:
+            # Due applications are the ones that changed status before the cutoff,
+            # a range over the (status_id, status_updated_ts) index
+            cutoff = timestamp_ms(now.subtract(**{auto.period: auto.after}))
+            cur.execute(
+                "INSERT INTO temp.automation_change (application_id, automation_id, description)"
+                " SELECT id, ?, ? FROM application"
+                " WHERE status_id = ? AND status_updated_ts <= ?",
+                (
+                    auto.id,
+                    f"Changed status {auto.if_status_is.name} -> {auto.change_status_to.name}",
+                    auto.if_status_is.id,
+                    cutoff,
+                ),
+            )
+            changed[auto.id] = cur.rowcount
+            if not cur.rowcount:
+                continue
 
-        for id_tup in updated_app_ids:
-            i = id_tup[0]
-            register_update(
-                i,
-                f"Changed status {auto.if_status_is.name} -> {auto.change_status_to.name}",
-                "automation",
-                auto.id,
+            cur.execute(
+                "UPDATE application SET"
+                " status_id = ?,"
+                " status_updated_at = ?,"
+                " status_updated_ts = ?"
+                " WHERE id IN"
+                " (SELECT application_id FROM temp.automation_change WHERE automation_id = ?)",
+                (auto.change_status_to.id, status_updated_at, now_ts, auto.id),
             )
+
+        # Update ids are assigned explicitly after the current maximum
+        # so that both inserts can be done with INSERT ... SELECT
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM application_update")
+        base_id = cur.fetchone()[0]
+
+        cur.execute(
+            "INSERT INTO application_update"
+            " (id, description, created_at, created_ts, triggerer_type, triggerer_id)"
+            " SELECT ? + id, description, ?, ?, 'automation', automation_id"
+            " FROM temp.automation_change",
+            (base_id, created_at, now_ts),
+        )
+        cur.execute(
+            "INSERT INTO application_to_update (application_id, update_id, update_created_ts)"
+            " SELECT application_id, ? + id, ? FROM temp.automation_change",
+            (base_id, now_ts),
+        )
+        cur.execute("DELETE FROM temp.automation_change")
+
+    for auto_id, count in changed.items():
+        if count:
+            logger.info("Automation %s changed %s applications", auto_id, count)
+    return changed
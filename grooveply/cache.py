@@ -0,0 +1,103 @@
+from contextvars import ContextVar, Token
+from typing import Any, Optional
+
+from .db import data_change_counter, get_connection
+
+
+class LookupCache:
+    """
+    In-process name <-> id map of a lookup table.
+
+    Entries are loaded one by one on first use and kept while
+    db.data_change_counter() stays the same, a change of the data by this
+    or another process drops them, so renamed or deleted rows are not served
+    stale. The counter is read once per request, or on every call outside one.
+    Names created here are added by the `create` methods.
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        self._counter: Optional[int] = None
+
+    def _validate(self):
+        counter = identity_get("data_change", 0)
+        if counter is None:
+            counter = data_change_counter()
+            identity_put("data_change", 0, counter)
+        if counter != self._counter:
+            self.clear()
+            self._counter = counter
+
+    def get_id(self, name: str) -> Optional[int]:
+        self._validate()
+        id = self._ids.get(name)
+        if id is None:
+            cur = get_connection().cursor()
+            cur.execute(f"SELECT id FROM {self.table} WHERE name = ?", (name,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            id = row[0]
+            self.add(id, name)
+        return id
+
+    def get_name(self, id: int) -> Optional[str]:
+        self._validate()
+        name = self._names.get(id)
+        if name is None:
+            cur = get_connection().cursor()
+            cur.execute(f"SELECT name FROM {self.table} WHERE id = ?", (id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            name = row[0]
+            self.add(id, name)
+        return name
+
+    def add(self, id: int, name: str):
+        self._ids[name] = id
+        self._names[id] = name
+
+    def clear(self):
+        self._ids.clear()
+        self._names.clear()
+
+
+statuses = LookupCache("application_status")
+employers = LookupCache("employer")
+locations = LookupCache("location")
+job_boards = LookupCache("job_board")
+
+
+_identity_map: ContextVar[Optional[dict]] = ContextVar("identity_map", default=None)
+
+
+def open_identity_map() -> Token:
+    """
+    Starts a map of the rows already fetched while handling a request,
+    so that the same row is not fetched twice while rendering it
+    """
+    return _identity_map.set({})
+
+
+def close_identity_map(token: Token):
+    _identity_map.reset(token)
+
+
+def identity_get(kind: str, id: int) -> Optional[Any]:
+    rows = _identity_map.get()
+    return rows.get((kind, int(id))) if rows is not None else None
+
+
+def identity_put(kind: str, id: int, row: Any):
+    rows = _identity_map.get()
+    if rows is not None:
+        rows[(kind, int(id))] = row
+
+
+def identity_forget(kind: str, id: int):
+    rows = _identity_map.get()
+    if rows is not None:
+        rows.pop((kind, int(id)), None)
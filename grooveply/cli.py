@@ -0,0 +1,33 @@
+import argparse
+
+
+def main():
+    """
+    Command line entry point. The app and the importer are only imported
+    for the command that needs them, so that starting either one stays fast.
+    """
+    parser = argparse.ArgumentParser(prog="grooveply")
+    commands = parser.add_subparsers(dest="command")
+
+    import_parser = commands.add_parser("import", help="Import applications from a file")
+    import_parser.add_argument("applications", help="CSV or JSON lines file with applications")
+    import_parser.add_argument("--updates", help="CSV or JSON lines file with their updates")
+    import_parser.add_argument("--chunk-size", type=int, default=5000)
+
+    commands.add_parser("migrate", help="Create the tables and apply pending migrations")
+
+    args = parser.parse_args()
+    if args.command == "import":
+        from .scripts.import_data import import_data
+
+        import_data(args.applications, args.updates, args.chunk_size)
+    elif args.command == "migrate":
+        from .migrations import apply_migrations
+
+        apply_migrations()
+    else:
+        import uvicorn
+
+        from .main import app
+
+        uvicorn.run(app)
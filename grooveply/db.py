@@ -1,12 +1,243 @@
+import asyncio
+import contextvars
+import functools
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Optional, TypeVar, Union
 
 import pendulum
+from pendulum import DateTime
 
-from .settings import DB_NAME
+from .metrics import record_query
+from .models import SlowQuery
+from .settings import (
+    DB_BUSY_TIMEOUT,
+    DB_CACHE_SIZE,
+    DB_FOREIGN_KEYS,
+    DB_JOURNAL_MODE,
+    DB_MMAP_SIZE,
+    DB_NAME,
+    DB_SYNCHRONOUS,
+    DB_THREADS,
+    METRICS,
+    SLOW_QUERY_MS,
+    STATEMENT_CACHE_SIZE,
+    TZ,
+)
+from .slow_queries import log_slow_query
+
+T = TypeVar("T")
+
+_local = threading.local()
+_lock = threading.Lock()
+_connections: list[sqlite3.Connection] = []
+_generation = 0
+_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="grooveply-db")
+_tz = pendulum.timezone(TZ)
+# Shortest query the trigram index of the names can look up
+MIN_TRIGRAM_QUERY = 3
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor adding the time of its statements and fetches to the current request
+    and logging the statements slower than SLOW_QUERY_MS, fetches included
+    """
+
+    _sql: Optional[str] = None
+    _parameters = ()
+    _many = False
+    _elapsed = 0.0
+    _slow: Optional[SlowQuery] = None
+
+    def _start(self, sql: str, parameters, many: bool = False):
+        if SLOW_QUERY_MS:
+            self._sql, self._parameters, self._many = sql, parameters, many
+            self._elapsed, self._slow = 0.0, None
+
+    def _finish(self, duration: float, executed: bool = True):
+        record_query(duration, executed)
+        if SLOW_QUERY_MS and self._sql is not None:
+            self._elapsed += duration
+            if self._slow is not None:
+                self._slow.duration_ms = self._elapsed * 1000
+            elif self._elapsed * 1000 >= SLOW_QUERY_MS:
+                self._slow = log_slow_query(
+                    self.connection, self._sql, self._parameters, self._elapsed, self._many
+                )
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._finish(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, None, many=True)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._finish(time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        # Scripts are timed for the request but not logged
+        self._sql = None
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            self._finish(time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._finish(time.perf_counter() - start, executed=False)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._finish(time.perf_counter() - start, executed=False)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._finish(time.perf_counter() - start, executed=False)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        # The shortcut of sqlite3.Connection does not go through Cursor.execute
+        return self.cursor().execute(sql, parameters)
+
+
+def connect() -> sqlite3.Connection:
+    """
+    Opens a new dedicated connection to the database with the storage profile
+    from settings applied. The caller owns it and is responsible for closing it.
+    """
+    con = sqlite3.connect(
+        DB_NAME,
+        timeout=DB_BUSY_TIMEOUT / 1000,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        factory=InstrumentedConnection if METRICS or SLOW_QUERY_MS else sqlite3.Connection,
+    )
+    # WAL lets readers and the single writer work at the same time,
+    # with it synchronous=NORMAL is still safe against corruption
+    con.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    con.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    con.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT}")
+    con.execute(f"PRAGMA cache_size = {DB_CACHE_SIZE}")
+    con.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    con.execute(f"PRAGMA foreign_keys = {'ON' if DB_FOREIGN_KEYS else 'OFF'}")
+    # Used by the triggers of daily_activity
+    con.create_function("local_date", 1, local_date, deterministic=True)
+    return con
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Returns the connection of the current thread, opening it on first use.
+
+    Connections are reused by every call made from the same thread, so their
+    statement caches stay warm between requests handled by FastAPI's threadpool.
+    """
+    con = getattr(_local, "con", None)
+    if con is None or _local.generation != _generation:
+        con = connect()
+        with _lock:
+            _connections.append(con)
+            _local.con = con
+            _local.generation = _generation
+    return con
+
+
+def close_connections():
+    """Closes every connection opened by get_connection"""
+    global _generation
+
+    with _lock:
+        for con in _connections:
+            con.close()
+        _connections.clear()
+        _generation += 1
+
+
+async def run_db(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Runs a blocking database call on the database executor without blocking
+    the event loop. The call sees the context variables of the caller.
+
+    Independent calls can run concurrently with asyncio.gather, each of them
+    on its own thread and so on its own connection.
+    """
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
+
+
+def data_change_counter() -> int:
+    """
+    Opaque version of the database contents, bumped by triggers on every change
+    of the tables the pages are made of, so it is the same in every process
+    """
+    cur = get_connection().cursor()
+    cur.execute("SELECT counter FROM data_change")
+    return cur.fetchone()[0]
+
+
+def search_names(table: str, q: str, limit: int) -> list[str]:
+    """
+    Case-insensitive typeahead over the name column of a lookup table.
+    Names starting with `q` come first and use the NOCASE index on the column,
+    names containing it elsewhere fill the rest of the limit and are looked up
+    in the trigram index of the names. The index needs at least 3 characters,
+    shorter queries only match the start of the names.
+    """
+    pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    con = get_connection()
+    cur = con.cursor()
+    cur.execute(
+        f"SELECT name FROM {table} WHERE name LIKE ? ESCAPE '\\'"
+        " ORDER BY name COLLATE NOCASE LIMIT ?",
+        (pattern, limit),
+    )
+    names = [row[0] for row in cur.fetchall()]
+
+    if len(names) < limit and len(q) >= MIN_TRIGRAM_QUERY:
+        # A phrase of the whole query, the trigram tokenizer matches it anywhere in the name
+        phrase = '"' + q.replace('"', '""') + '"'
+        cur.execute(
+            f"SELECT name FROM {table}"
+            f" WHERE id IN (SELECT rowid FROM {table}_name_index WHERE name MATCH ?)"
+            " AND NOT name LIKE ? ESCAPE '\\'"
+            " ORDER BY name COLLATE NOCASE LIMIT ?",
+            (phrase, pattern, limit - len(names)),
+        )
+        names.extend(row[0] for row in cur.fetchall())
+    return names
 
 
 def create_tables():
-    con = sqlite3.connect(DB_NAME)
+    """
+    Creates the tables of the first version of the schema in the transaction
+    of the caller, migrations.apply_migrations does it for a new database
+    """
+    con = get_connection()
     cur = con.cursor()
     cur.execute(
         "CREATE TABLE IF NOT EXISTS application("
@@ -93,9 +324,6 @@ def create_tables():
         ")"
     )
 
-    cur.execute("CREATE TABLE IF NOT EXISTS schema_history (version INTEGER NOT NULL)")
-    cur.execute("INSERT INTO schema_history (version) VALUES (0)")
-
     cur.execute(
         "CREATE TABLE IF NOT EXISTS application_goal("
         "id INTEGER PRIMARY KEY NOT NULL,"
@@ -108,25 +336,72 @@ def create_tables():
         ")"
     )
 
-    con.commit()
 
+def parse_time(value: str) -> datetime:
+    """
+    Time of a string with any offset, strings without one are taken as UTC,
+    the same way SQLite does. Raises ValueError if it is not a time.
+    """
+    try:
+        at = datetime.fromisoformat(value)
+    except ValueError:
+        at = pendulum.parse(value)
+        # Durations and intervals parse too but are not instants
+        if not isinstance(at, datetime):
+            raise ValueError(f"Not a date and time: {at!r}")
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return at
 
-def register_update(app_id: int, description: str, triggerer_type: str, triggerer_id: int):
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-    now = str(pendulum.now())
+
+def timestamp_ms(value: Union[str, DateTime]) -> int:
+    """Milliseconds since the epoch in UTC, the unit of the *_ts columns"""
+    if isinstance(value, str):
+        value = parse_time(value)
+    return round(value.timestamp() * 1000)
+
+
+def local_date(value: Optional[str]) -> Optional[str]:
+    """Date in TZ of a time string with the offset TZ had at that time, NULL if it is not one"""
+    if value is None:
+        return None
+    try:
+        return parse_time(value).astimezone(_tz).date().isoformat()
+    except ValueError:
+        return None
+
+
+def register_update(
+    app_id: int,
+    description: str,
+    triggerer_type: str,
+    triggerer_id: int,
+    cur: Optional[sqlite3.Cursor] = None,
+) -> int:
+    """
+    Adds an update to an application and returns its id. Committed right away
+    unless `cur` is given, then it is a part of the transaction of the caller,
+    who commits it together with the rest of the changes.
+    """
+    if cur is None:
+        con = get_connection()
+        with con:
+            return register_update(app_id, description, triggerer_type, triggerer_id, con.cursor())
+
+    now = pendulum.now(tz=TZ)
+    now_ts = timestamp_ms(now)
     cur.execute(
         "INSERT INTO application_update"
-        " (description, created_at, triggerer_type, triggerer_id) VALUES"
-        " (?, ?, ?, ?)"
+        " (description, created_at, created_ts, triggerer_type, triggerer_id) VALUES"
+        " (?, ?, ?, ?, ?)"
         " RETURNING id",
-        (description, now, triggerer_type, triggerer_id),
+        (description, str(now), now_ts, triggerer_type, triggerer_id),
     )
     inserted = cur.fetchall()[0][0]
 
     cur.execute(
-        "INSERT INTO application_to_update" " (application_id, update_id) VALUES (?, ?)",
-        (app_id, inserted),
+        "INSERT INTO application_to_update"
+        " (application_id, update_id, update_created_ts) VALUES (?, ?, ?)",
+        (app_id, inserted, now_ts),
     )
-
-    con.commit()
+    return inserted
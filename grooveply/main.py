@@ -1,6 +1,11 @@
-import uvicorn
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+
+import pendulum
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.routing import APIRouter
 from fastui import AnyComponent, FastUI
 from fastui import components as c
@@ -8,26 +13,134 @@ from fastui import prebuilt_html
 from fastui.components.display import DisplayLookup, DisplayMode
 from fastui.events import GoToEvent
 from pydantic import BaseModel
+from starlette.routing import Match
 
-from grooveply.apis.application import ApplicationAPI, ApplicationUpdateAPI
+from grooveply.apis.application import ApplicationUpdateAPI
 from grooveply.apis.goal import GoalAPI
-from grooveply.auto import update_statuses
-from grooveply.db import create_tables
+from grooveply.cache import close_identity_map, open_identity_map
+from grooveply.cli import main  # noqa: F401, the entry point of installs before grooveply.cli
+from grooveply.db import close_connections, data_change_counter, run_db
+from grooveply.metrics import end_request, record_request, render, start_request
 from grooveply.migrations import apply_migrations
+from grooveply.routers import FastUIRoute
+from grooveply.routers.activity import router as activity_router
+from grooveply.routers.admin import router as admin_router
 from grooveply.routers.application import router as application_router
 from grooveply.routers.automation import router as automation_router
 from grooveply.routers.employer import router as employer_router
+from grooveply.routers.export import router as export_router
 from grooveply.routers.goal import router as goal_router
 from grooveply.routers.job_board import router as job_board_router
 from grooveply.routers.location import router as location_router
-from grooveply.settings import VERSION
+from grooveply.routers.search import router as search_router
+from grooveply.scheduler import scheduler
+from grooveply.settings import METRICS, SKIP_MIGRATIONS, TZ, VERSION
 from grooveply.utils import page
 
-app = FastAPI(debug=True, version=VERSION)
 
-create_tables()
-apply_migrations()
-update_statuses()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not SKIP_MIGRATIONS:
+        apply_migrations()
+    scheduler.start()
+    yield
+    await scheduler.stop()
+    close_connections()
+
+
+# Served from the memory of the process, not the database the ETags are derived from
+NO_ETAG_PREFIXES = ("/api/_metrics", "/api/admin/")
+# Pages showing the state of the scheduler of the worker that handles the request
+SCHEDULER_PATHS = ("/api/automation/", "/api/automation/scheduler")
+
+app = FastAPI(debug=True, version=VERSION, lifespan=lifespan)
+
+
+def make_etag(request: Request) -> str:
+    """
+    Weak ETag of a GET response. Pages only depend on the database, the current
+    date and the version of the code, so every worker gives the same page
+    the same tag. The pages of the scheduler also depend on this worker's state.
+    """
+    key = (
+        VERSION,
+        data_change_counter(),
+        pendulum.today(tz=TZ).to_date_string(),
+        request.url.path,
+        request.url.query,
+    )
+    if request.url.path in SCHEDULER_PATHS:
+        key += (scheduler.status(),)
+    return f'W/"{hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()}"'
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    if (
+        request.method != "GET"
+        or not request.url.path.startswith("/api/")
+        or request.url.path.startswith(NO_ETAG_PREFIXES)
+    ):
+        return await call_next(request)
+
+    etag = await run_db(make_etag, request)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@app.middleware("http")
+async def identity_map(request: Request, call_next):
+    token = open_identity_map()
+    try:
+        return await call_next(request)
+    finally:
+        close_identity_map(token)
+
+
+def route_path(request: Request) -> str:
+    """
+    Path template of the route of the request, responses sent before routing
+    like 304 have none in the scope and are matched against the routes here
+    """
+    route = request.scope.get("route")
+    if route is None:
+        for candidate in request.app.router.routes:
+            if candidate.matches(request.scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return route.path if route is not None else ""
+
+
+# Added last to wrap the other middleware, so that the time and the queries
+# of the ETag check are counted too
+@app.middleware("http")
+async def timing(request: Request, call_next):
+    if not METRICS:
+        return await call_next(request)
+
+    stats, token = start_request()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request(token)
+    elapsed = time.perf_counter() - start
+
+    # Labelled by the path of the route to keep the number of series bounded
+    record_request(request.method, route_path(request), elapsed, stats)
+    # Streamed responses are still being sent, the header only covers the time until then
+    response.headers["Server-Timing"] = stats.server_timing(elapsed)
+    return response
 
 
 class GoalRow(BaseModel):
@@ -37,12 +150,14 @@ class GoalRow(BaseModel):
     progress: str
 
 
-router = APIRouter()
+router = APIRouter(route_class=FastUIRoute)
 
 
 @router.get("/", response_model=FastUI, response_model_exclude_none=True)
-def main_page() -> list[AnyComponent]:
-    latest_updates = ApplicationUpdateAPI.get_latest(10)
+async def main_page() -> list[AnyComponent]:
+    latest_updates, goals = await asyncio.gather(
+        run_db(ApplicationUpdateAPI.get_latest, 10), run_db(GoalAPI.progress_all)
+    )
     components = [
         c.Heading(text="Latest Updates", level=2),
     ]
@@ -66,16 +181,14 @@ def main_page() -> list[AnyComponent]:
     else:
         components.append(c.Paragraph(text="No updates yet"))
 
-    goals = GoalAPI.get_all()
-
-    starts = [GoalAPI.latest_period_start(goal) for goal in goals]
-    completions = [ApplicationAPI.count_since(str(start)) for start in starts]
-
     data = [
         GoalRow(
-            id=goal.id, done=cmp, goal=goal.value, progress=f"{int(round(cmp / goal.value*100))}%"
+            id=item.goal.id,
+            done=item.done,
+            goal=item.goal.value,
+            progress=f"{int(round(item.done / item.goal.value*100))}%",
         )
-        for goal, cmp in zip(goals, completions)
+        for item in goals
     ]
 
     if len(goals):
@@ -99,13 +212,23 @@ def main_page() -> list[AnyComponent]:
     return page("Main Page", components)
 
 
+@router.get("/_metrics")
+def metrics() -> PlainTextResponse:
+    """Histograms of this process in the Prometheus text format"""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(router, prefix="/api")
+app.include_router(activity_router, prefix="/api/activity")
+app.include_router(admin_router, prefix="/api/admin")
 app.include_router(application_router, prefix="/api/application")
 app.include_router(automation_router, prefix="/api/automation")
 app.include_router(employer_router, prefix="/api/employer")
+app.include_router(export_router, prefix="/api/export")
 app.include_router(goal_router, prefix="/api/goal")
 app.include_router(job_board_router, prefix="/api/job_board")
 app.include_router(location_router, prefix="/api/location")
+app.include_router(search_router, prefix="/api/search")
 
 
 @app.get("/{path:path}")
@@ -113,9 +236,5 @@ async def html_landing() -> HTMLResponse:
     return HTMLResponse(prebuilt_html(title="Grooveply"))
 
 
-def main():
-    uvicorn.run(app)
-
-
 if __name__ == "__main__":
     main()
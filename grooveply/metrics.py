@@ -0,0 +1,189 @@
+"""
+In-process request and database metrics.
+
+Histograms are kept in memory per process and exposed in the Prometheus
+text format, see https://prometheus.io/docs/instrumenting/exposition_formats/
+The SQL and *API time of the request being handled is collected in a
+context variable and sent back in the Server-Timing header.
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar, Token
+from typing import Callable, Optional, TypeVar
+
+from .settings import METRICS
+
+T = TypeVar("T")
+
+# Upper bounds of the histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """Cumulative histogram of a metric, one child per combination of label values"""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # Label values: [count per bucket and +Inf, sum]
+        self._children: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            child = self._children.get(labels)
+            if child is None:
+                child = self._children[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            child[0][bisect_left(self.buckets, value)] += 1
+            child[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            children = [
+                (values, list(counts), total)
+                for values, (counts, total) in sorted(self._children.items())
+            ]
+
+        for values, counts, total in children:
+            labels = ",".join(
+                f'{name}="{escape(value)}"' for name, value in zip(self.labels, values)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram(
+    "grooveply_request_duration_seconds",
+    "Time to handle a request",
+    ("method", "route"),
+    DURATION_BUCKETS,
+)
+REQUEST_SQL_DURATION = Histogram(
+    "grooveply_request_sql_duration_seconds",
+    "Time spent executing SQL and fetching rows while handling a request",
+    ("method", "route"),
+    DURATION_BUCKETS,
+)
+REQUEST_SQL_QUERIES = Histogram(
+    "grooveply_request_sql_queries",
+    "SQL statements executed while handling a request",
+    ("method", "route"),
+    COUNT_BUCKETS,
+)
+API_CALL_DURATION = Histogram(
+    "grooveply_api_call_duration_seconds",
+    "Time of the calls of the *API methods",
+    ("method",),
+    DURATION_BUCKETS,
+)
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_SQL_DURATION, REQUEST_SQL_QUERIES, API_CALL_DURATION]
+
+
+def render() -> str:
+    return "\n".join(line for histogram in HISTOGRAMS for line in histogram.render()) + "\n"
+
+
+class RequestStats:
+    """
+    Totals of one request. Database calls of a request can run on several
+    executor threads at once, so the totals are updated under a lock.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.api_time = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, duration: float, executed: bool):
+        with self._lock:
+            self.queries += executed
+            self.sql_time += duration
+
+    def add_api_call(self, duration: float):
+        with self._lock:
+            self.api_time += duration
+
+    def server_timing(self, total: float) -> str:
+        # The time in the *API methods includes the SQL time, the rest of the total
+        # is spent routing, rendering the components and serializing the response
+        return (
+            f"app;dur={total * 1000:.3f}, api;dur={self.api_time * 1000:.3f},"
+            f' sql;dur={self.sql_time * 1000:.3f};desc="queries: {self.queries}"'
+        )
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+# Nesting depth of *API calls on the current thread, only the outermost call
+# is added to the request so that the time of nested calls is not counted twice
+_api_depth = threading.local()
+
+
+def start_request() -> tuple[RequestStats, Token]:
+    stats = RequestStats()
+    return stats, _request_stats.set(stats)
+
+
+def end_request(token: Token):
+    _request_stats.reset(token)
+
+
+def record_query(duration: float, executed: bool = True):
+    """
+    Adds the time of a statement to the request being handled, if any.
+    Fetching the rows of a statement is recorded with `executed=False`.
+    """
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add_query(duration, executed)
+
+
+def record_request(method: str, route: str, duration: float, stats: RequestStats):
+    REQUEST_DURATION.observe((method, route), duration)
+    REQUEST_SQL_DURATION.observe((method, route), stats.sql_time)
+    REQUEST_SQL_QUERIES.observe((method, route), stats.queries)
+
+
+def timed(name: str, func: Callable[..., T]) -> Callable[..., T]:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs) -> T:
+        depth = getattr(_api_depth, "value", 0)
+        _api_depth.value = depth + 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _api_depth.value = depth
+            API_CALL_DURATION.observe((name,), elapsed)
+            stats = _request_stats.get()
+            if stats is not None and depth == 0:
+                stats.add_api_call(elapsed)
+
+    return wrapper
+
+
+def instrument(cls: type) -> type:
+    """Class decorator recording the duration of every public classmethod of an *API class"""
+    if not METRICS:
+        return cls
+    for name, attr in list(vars(cls).items()):
+        if isinstance(attr, classmethod) and not name.startswith("_"):
+            setattr(cls, name, classmethod(timed(f"{cls.__name__}.{name}", attr.__func__)))
+    return cls
@@ -1,24 +1,53 @@
+"""
+Schema migrations.
+
+The version of the schema is kept in PRAGMA user_version. Each migration runs
+in its own transaction that holds the write lock and bumps the version in it,
+so a failed migration leaves the database at the previous version and processes
+starting at the same time run every migration once. Migrations get the cursor
+of that transaction and must not commit.
+"""
+
 import sqlite3
+import time
+from typing import Callable, NamedTuple, Optional, TypeVar, Union
 
 import pendulum
 
-from .db import DB_NAME
-from .settings import TZ
+from .db import create_tables, get_connection
+from .settings import DB_FOREIGN_KEYS, TZ
 
+# Seconds to wait for the migration of another process
+LOCK_TIMEOUT = 600
+BACKFILL_BATCH_SIZE = 5000
+
+T = TypeVar("T")
 
-def get_current_schema_version() -> int:
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-    cur.execute("SELECT version FROM schema_history ORDER BY version DESC LIMIT 1")
-    return int(cur.fetchone()[0])
 
+class OnlineMigration(NamedTuple):
+    """
+    Migration of a large table that does not hold the write lock for long.
 
-def migration_1():
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
+    `schema` runs atomically like any other migration and has to keep
+    the rows written from then on up to date, with triggers for example.
+    `backfill` then updates at most `limit` of the old rows and returns how many
+    it updated, it is called in short transactions until it returns 0,
+    so it has to pick the rows that are still left itself.
+    The version is bumped once the backfill is done, an interrupted one
+    is continued by the next start.
+    """
 
-    cur.execute("PRAGMA foreign_keys=off")
-    cur.execute("BEGIN TRANSACTION")
+    schema: Callable[[sqlite3.Cursor], None]
+    backfill: Callable[[sqlite3.Cursor, int], int]
+
+
+def get_current_schema_version() -> int:
+    cur = get_connection().cursor()
+    cur.execute("PRAGMA user_version")
+    return cur.fetchone()[0]
+
+
+def migration_1(cur: sqlite3.Cursor):
     cur.execute("ALTER TABLE application_to_update RENAME TO application_to_update_old")
 
     cur.execute(
@@ -35,29 +64,779 @@ def migration_1():
 
     cur.execute("INSERT INTO application_to_update SELECT * FROM application_to_update_old")
     cur.execute("DROP TABLE application_to_update_old")
-    cur.execute("END TRANSACTION")
-    cur.execute("PRAGMA foreign_keys=on")
-    cur.execute("INSERT INTO schema_history VALUES (?)", (1,))
 
     cur.execute(
         "UPDATE employer SET created_at = ? WHERE created_at is NULL", (str(pendulum.now(tz=TZ)),)
     )
-    con.commit()
 
 
-def migration_2():
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
+def migration_2(cur: sqlite3.Cursor):
     cur.execute("ALTER TABLE application ADD COLUMN notes TEXT")
 
-    cur.execute("INSERT INTO schema_history VALUES (?)", (2,))
-    con.commit()
 
+def migration_3(cur: sqlite3.Cursor):
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_to_update_application"
+        " ON application_to_update (application_id, update_id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_to_update_update"
+        " ON application_to_update (update_id, application_id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_update_created_at"
+        " ON application_update (created_at)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_update_triggerer"
+        " ON application_update (triggerer_type, triggerer_id, created_at)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_employer_id"
+        " ON application (employer_id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_created_at"
+        " ON application (created_at)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_status"
+        " ON application (status_id, status_updated_at)"
+    )
+
+
+def migration_4(cur: sqlite3.Cursor):
+    cur.execute("ALTER TABLE application ADD COLUMN last_activity_at TEXT")
+    cur.execute(
+        "UPDATE application SET last_activity_at = COALESCE("
+        "(SELECT MAX(au.created_at) FROM application_to_update atu"
+        " JOIN application_update au ON atu.update_id = au.id"
+        " WHERE atu.application_id = application.id),"
+        " created_at)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_last_activity"
+        " ON application (last_activity_at, id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_status_last_activity"
+        " ON application (status_id, last_activity_at, id)"
+    )
+
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_create"
+        " AFTER INSERT ON application"
+        " WHEN NEW.last_activity_at IS NULL"
+        " BEGIN"
+        " UPDATE application SET last_activity_at = NEW.created_at WHERE id = NEW.id;"
+        " END"
+    )
+
+    # Recomputed from the history of a single application, which is
+    # an index lookup, so that it always matches the backfill above
+    recompute = (
+        " SET last_activity_at = COALESCE("
+        "(SELECT MAX(au.created_at) FROM application_to_update atu"
+        " JOIN application_update au ON atu.update_id = au.id"
+        " WHERE atu.application_id = application.id),"
+        " created_at)"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_link"
+        " AFTER INSERT ON application_to_update"
+        " BEGIN"
+        f" UPDATE application {recompute} WHERE id = NEW.application_id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_unlink"
+        " AFTER DELETE ON application_to_update"
+        " BEGIN"
+        f" UPDATE application {recompute} WHERE id = OLD.application_id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_update_delete"
+        " AFTER DELETE ON application_update"
+        " BEGIN"
+        f" UPDATE application {recompute}"
+        " WHERE id IN (SELECT application_id FROM application_to_update WHERE update_id = OLD.id);"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_update_edit"
+        " AFTER UPDATE OF created_at ON application_update"
+        " BEGIN"
+        f" UPDATE application {recompute}"
+        " WHERE id IN (SELECT application_id FROM application_to_update WHERE update_id = NEW.id);"
+        " END"
+    )
+
+
+def migration_5(cur: sqlite3.Cursor):
+    for table in ("employer", "location", "job_board"):
+        cur.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_name_nocase"
+            f" ON {table} (name COLLATE NOCASE)"
+        )
+
+
+def migration_6(cur: sqlite3.Cursor):
+    # Applications are stored under their negated id and updates under
+    # their own id, so every document is addressed by rowid
+    cur.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "application_id UNINDEXED,"
+        " update_id UNINDEXED,"
+        " employer,"
+        " body,"
+        " tokenize = 'unicode61 remove_diacritics 2'"
+        ")"
+    )
+
+    application_doc = (
+        " SELECT -app.id, app.id, NULL, emp.name,"
+        " COALESCE(app.description, '') || char(10) || COALESCE(app.notes, '')"
+        " FROM application app JOIN employer emp ON app.employer_id = emp.id"
+    )
+    update_doc = (
+        " SELECT au.id, atu.application_id, au.id, NULL, au.description"
+        " FROM application_update au JOIN application_to_update atu ON au.id = atu.update_id"
+    )
+    insert = "INSERT INTO search_index (rowid, application_id, update_id, employer, body)"
+
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS search_index_application_insert"
+        " AFTER INSERT ON application"
+        f" BEGIN {insert} {application_doc} WHERE app.id = NEW.id; END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS search_index_application_edit"
+        " AFTER UPDATE OF description, notes, employer_id ON application"
+        " BEGIN"
+        " DELETE FROM search_index WHERE rowid = -OLD.id;"
+        f" {insert} {application_doc} WHERE app.id = NEW.id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS search_index_application_delete"
+        " AFTER DELETE ON application"
+        " BEGIN"
+        " DELETE FROM search_index WHERE rowid = -OLD.id"
+        " OR rowid IN (SELECT update_id FROM application_to_update"
+        " WHERE application_id = OLD.id);"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS search_index_employer_rename"
+        " AFTER UPDATE OF name ON employer"
+        " WHEN OLD.name != NEW.name"
+        " BEGIN"
+        " UPDATE search_index SET employer = NEW.name"
+        " WHERE rowid IN (SELECT -id FROM application WHERE employer_id = NEW.id);"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS search_index_update_link"
+        " AFTER INSERT ON application_to_update"
+        f" BEGIN {insert} {update_doc} WHERE atu.id = NEW.id; END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS search_index_update_unlink"
+        " AFTER DELETE ON application_to_update"
+        " BEGIN DELETE FROM search_index WHERE rowid = OLD.update_id; END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS search_index_update_edit"
+        " AFTER UPDATE OF description ON application_update"
+        " BEGIN UPDATE search_index SET body = NEW.description WHERE rowid = NEW.id; END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS search_index_update_delete"
+        " AFTER DELETE ON application_update"
+        " BEGIN DELETE FROM search_index WHERE rowid = OLD.id; END"
+    )
+
+    cur.execute("DELETE FROM search_index")
+    cur.execute(f"{insert} {application_doc}")
+    cur.execute(f"{insert} {update_doc}")
+
+
+def local_day(value: str) -> str:
+    # The UTC offset of TZ is fixed at the moment the triggers are created
+    minutes = int(pendulum.now(tz=TZ).utcoffset().total_seconds() // 60)
+    return f"date({value}, '{minutes:+d} minutes')"
+
+
+def add_activity(day: str, **counts: str) -> str:
+    """Trigger statement adding the counts to the row of the day"""
+    return (
+        f"INSERT INTO daily_activity (day, {', '.join(counts)})"
+        f" VALUES ({day}, {', '.join(counts.values())})"
+        " ON CONFLICT (day) DO UPDATE SET "
+        + ", ".join(f"{col} = {col} + excluded.{col}" for col in counts)
+        + ";"
+    )
+
+
+def migration_7(cur: sqlite3.Cursor):
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS daily_activity("
+        "day TEXT PRIMARY KEY NOT NULL,"
+        "applications INTEGER NOT NULL DEFAULT 0,"
+        "status_changes INTEGER NOT NULL DEFAULT 0,"
+        "user_updates INTEGER NOT NULL DEFAULT 0,"
+        "automation_updates INTEGER NOT NULL DEFAULT 0"
+        ") WITHOUT ROWID"
+    )
+
+    def add_updates(row: str, sign: str) -> str:
+        return add_activity(
+            local_day(f"{row}.created_at"),
+            user_updates=f"{sign}({row}.triggerer_type = 'user')",
+            automation_updates=f"{sign}({row}.triggerer_type = 'automation')",
+        )
+
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS daily_activity_application_insert"
+        " AFTER INSERT ON application"
+        f" BEGIN {add_activity(local_day('NEW.created_at'), applications='1')} END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS daily_activity_application_delete"
+        " AFTER DELETE ON application"
+        f" BEGIN {add_activity(local_day('OLD.created_at'), applications='-1')} END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS daily_activity_application_edit"
+        " AFTER UPDATE OF created_at ON application"
+        " WHEN NEW.created_at IS NOT OLD.created_at"
+        " BEGIN"
+        f" {add_activity(local_day('OLD.created_at'), applications='-1')}"
+        f" {add_activity(local_day('NEW.created_at'), applications='1')}"
+        " END"
+    )
+    # next_status does not touch status_updated_at, such changes happen now
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS daily_activity_status_change"
+        " AFTER UPDATE OF status_id ON application"
+        " WHEN NEW.status_id IS NOT OLD.status_id"
+        " BEGIN"
+        " "
+        + add_activity(
+            local_day(
+                "CASE WHEN NEW.status_updated_at IS NOT OLD.status_updated_at"
+                " THEN NEW.status_updated_at ELSE 'now' END"
+            ),
+            status_changes="1",
+        )
+        + " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS daily_activity_update_insert"
+        " AFTER INSERT ON application_update"
+        f" BEGIN {add_updates('NEW', '')} END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS daily_activity_update_delete"
+        " AFTER DELETE ON application_update"
+        f" BEGIN {add_updates('OLD', '-')} END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS daily_activity_update_edit"
+        " AFTER UPDATE OF created_at, triggerer_type ON application_update"
+        f" BEGIN {add_updates('OLD', '-')} {add_updates('NEW', '')} END"
+    )
+
+    # Every status change is recorded as an update, which keeps
+    # the whole history of changes and not only the latest one
+    cur.execute("DELETE FROM daily_activity")
+    cur.execute(
+        "INSERT INTO daily_activity"
+        " (day, applications, status_changes, user_updates, automation_updates)"
+        " SELECT day, SUM(applications), SUM(status_changes),"
+        " SUM(user_updates), SUM(automation_updates) FROM ("
+        f" SELECT {local_day('created_at')} AS day, 1 AS applications, 0 AS status_changes,"
+        " 0 AS user_updates, 0 AS automation_updates FROM application"
+        f" UNION ALL SELECT {local_day('created_at')}, 0,"
+        " description LIKE 'Changed status %',"
+        " triggerer_type = 'user', triggerer_type = 'automation'"
+        " FROM application_update"
+        ") GROUP BY day"
+    )
+
+
+def epoch_ms(value: str) -> str:
+    # Milliseconds since the epoch in UTC of a time string with any offset
+    return f"CAST(round((julianday({value}) - 2440587.5) * 86400000) AS INTEGER)"
+
+
+def migration_8(cur: sqlite3.Cursor):
+    cur.execute("ALTER TABLE application ADD COLUMN created_ts INTEGER")
+    cur.execute("ALTER TABLE application ADD COLUMN status_updated_ts INTEGER")
+    cur.execute("ALTER TABLE application ADD COLUMN last_activity_ts INTEGER")
+    cur.execute("ALTER TABLE application_update ADD COLUMN created_ts INTEGER")
+
+    cur.execute(f"UPDATE application_update SET created_ts = {epoch_ms('created_at')}")
+    cur.execute(
+        "UPDATE application SET"
+        f" created_ts = {epoch_ms('created_at')},"
+        f" status_updated_ts = {epoch_ms('status_updated_at')}"
+    )
+
+    # The latest of the creation and the updates, compared as instants
+    # and not as text, which depends on the offset each one was written with
+    recompute = (
+        " SET (last_activity_ts, last_activity_at) = ("
+        "SELECT ts, at FROM ("
+        "SELECT au.created_ts AS ts, au.created_at AS at FROM application_to_update atu"
+        " JOIN application_update au ON atu.update_id = au.id"
+        " WHERE atu.application_id = application.id"
+        " UNION ALL SELECT application.created_ts, application.created_at"
+        ") ORDER BY ts DESC LIMIT 1)"
+    )
+    cur.execute(f"UPDATE application {recompute}")
+
+    for name in (
+        "application_last_activity_on_create",
+        "application_last_activity_on_link",
+        "application_last_activity_on_unlink",
+        "application_last_activity_on_update_delete",
+        "application_last_activity_on_update_edit",
+    ):
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    # Writers may fill the epoch columns themselves, which saves the extra UPDATE
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_ts_on_create"
+        " AFTER INSERT ON application"
+        " WHEN NEW.created_ts IS NULL OR NEW.status_updated_ts IS NULL"
+        " OR NEW.last_activity_ts IS NULL OR NEW.last_activity_at IS NULL"
+        " BEGIN"
+        " UPDATE application SET"
+        f" created_ts = COALESCE(NEW.created_ts, {epoch_ms('NEW.created_at')}),"
+        " status_updated_ts = COALESCE("
+        f"NEW.status_updated_ts, {epoch_ms('NEW.status_updated_at')}),"
+        " last_activity_at = COALESCE(NEW.last_activity_at, NEW.created_at),"
+        " last_activity_ts = COALESCE("
+        f"NEW.last_activity_ts, NEW.created_ts, {epoch_ms('NEW.created_at')})"
+        " WHERE id = NEW.id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_ts_on_edit"
+        " AFTER UPDATE OF created_at, status_updated_at ON application"
+        " WHEN (NEW.created_at IS NOT OLD.created_at AND NEW.created_ts IS OLD.created_ts)"
+        " OR (NEW.status_updated_at IS NOT OLD.status_updated_at"
+        " AND NEW.status_updated_ts IS OLD.status_updated_ts)"
+        " BEGIN"
+        " UPDATE application SET"
+        f" created_ts = {epoch_ms('NEW.created_at')},"
+        f" status_updated_ts = {epoch_ms('NEW.status_updated_at')}"
+        " WHERE id = NEW.id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_update_ts_on_create"
+        " AFTER INSERT ON application_update"
+        " WHEN NEW.created_ts IS NULL"
+        " BEGIN"
+        f" UPDATE application_update SET created_ts = {epoch_ms('NEW.created_at')}"
+        " WHERE id = NEW.id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_update_ts_on_edit"
+        " AFTER UPDATE OF created_at ON application_update"
+        " WHEN NEW.created_at IS NOT OLD.created_at AND NEW.created_ts IS OLD.created_ts"
+        " BEGIN"
+        f" UPDATE application_update SET created_ts = {epoch_ms('NEW.created_at')}"
+        " WHERE id = NEW.id;"
+        " END"
+    )
+
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_link"
+        " AFTER INSERT ON application_to_update"
+        " BEGIN"
+        f" UPDATE application {recompute} WHERE id = NEW.application_id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_unlink"
+        " AFTER DELETE ON application_to_update"
+        " BEGIN"
+        f" UPDATE application {recompute} WHERE id = OLD.application_id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_update_delete"
+        " AFTER DELETE ON application_update"
+        " BEGIN"
+        f" UPDATE application {recompute}"
+        " WHERE id IN (SELECT application_id FROM application_to_update WHERE update_id = OLD.id);"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_last_activity_on_update_edit"
+        " AFTER UPDATE OF created_ts ON application_update"
+        " BEGIN"
+        f" UPDATE application {recompute}"
+        " WHERE id IN (SELECT application_id FROM application_to_update WHERE update_id = NEW.id);"
+        " END"
+    )
+
+    for name in (
+        "idx_application_update_created_at",
+        "idx_application_update_triggerer",
+        "idx_application_created_at",
+        "idx_application_status",
+        "idx_application_last_activity",
+        "idx_application_status_last_activity",
+    ):
+        cur.execute(f"DROP INDEX IF EXISTS {name}")
+
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_update_created_ts"
+        " ON application_update (created_ts)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_update_triggerer_ts"
+        " ON application_update (triggerer_type, triggerer_id, created_ts)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_created_ts ON application (created_ts)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_status_updated_ts"
+        " ON application (status_id, status_updated_ts)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_last_activity_ts"
+        " ON application (last_activity_ts, id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_status_last_activity_ts"
+        " ON application (status_id, last_activity_ts, id)"
+    )
+
+
+def migration_9_schema(cur: sqlite3.Cursor):
+    # The creation time of the update next to its link, so that the timeline
+    # of an application is read newest first from one index
+    cur.execute("ALTER TABLE application_to_update ADD COLUMN update_created_ts INTEGER")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_application_to_update_timeline"
+        " ON application_to_update (application_id, update_created_ts, update_id)"
+    )
+
+    # Writers may fill the column themselves, which saves the extra UPDATE
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_to_update_ts_on_link"
+        " AFTER INSERT ON application_to_update"
+        " WHEN NEW.update_created_ts IS NULL"
+        " BEGIN"
+        " UPDATE application_to_update SET update_created_ts ="
+        " (SELECT created_ts FROM application_update WHERE id = NEW.update_id)"
+        " WHERE id = NEW.id;"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS application_to_update_ts_on_update_edit"
+        " AFTER UPDATE OF created_ts ON application_update"
+        " BEGIN"
+        " UPDATE application_to_update SET update_created_ts = NEW.created_ts"
+        " WHERE update_id = NEW.id;"
+        " END"
+    )
+
+
+def migration_9_backfill(cur: sqlite3.Cursor, limit: int) -> int:
+    # Links without an update or with an update without created_ts stay NULL,
+    # they are skipped so that the backfill ends
+    cur.execute(
+        "UPDATE application_to_update SET update_created_ts = au.created_ts"
+        " FROM application_update au"
+        " WHERE application_to_update.id IN ("
+        "SELECT atu.id FROM application_to_update atu"
+        " JOIN application_update au ON au.id = atu.update_id"
+        " WHERE atu.update_created_ts IS NULL AND au.created_ts IS NOT NULL"
+        " LIMIT ?)"
+        " AND au.id = application_to_update.update_id",
+        (limit,),
+    )
+    return cur.rowcount
+
+
+def migration_10(cur: sqlite3.Cursor):
+    # Ids of the rows in the files they were imported from,
+    # so that importing a file again skips the rows it already added
+    for table in ("application", "application_update"):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN import_id TEXT")
+        cur.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_import_id"
+            f" ON {table} (import_id) WHERE import_id IS NOT NULL"
+        )
+
+
+def migration_11(cur: sqlite3.Cursor):
+    # Days are computed by the local_date function of db.connect with the offset
+    # of TZ at the time of each row, instead of the offset at the time of migration 7.
+    # Status changes are counted from their updates, like in the backfill of
+    # migration 7, so that imported history is counted the same way.
+    for name in (
+        "daily_activity_application_insert",
+        "daily_activity_application_delete",
+        "daily_activity_application_edit",
+        "daily_activity_status_change",
+        "daily_activity_update_insert",
+        "daily_activity_update_delete",
+        "daily_activity_update_edit",
+    ):
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    status_change = "description LIKE 'Changed status %'"
+
+    def add_updates(row: str, sign: str) -> str:
+        return add_activity(
+            f"local_date({row}.created_at)",
+            status_changes=f"{sign}({row}.{status_change})",
+            user_updates=f"{sign}({row}.triggerer_type = 'user')",
+            automation_updates=f"{sign}({row}.triggerer_type = 'automation')",
+        )
+
+    cur.execute(
+        "CREATE TRIGGER daily_activity_application_insert"
+        " AFTER INSERT ON application"
+        f" BEGIN {add_activity('local_date(NEW.created_at)', applications='1')} END"
+    )
+    cur.execute(
+        "CREATE TRIGGER daily_activity_application_delete"
+        " AFTER DELETE ON application"
+        f" BEGIN {add_activity('local_date(OLD.created_at)', applications='-1')} END"
+    )
+    cur.execute(
+        "CREATE TRIGGER daily_activity_application_edit"
+        " AFTER UPDATE OF created_at ON application"
+        " WHEN NEW.created_at IS NOT OLD.created_at"
+        " BEGIN"
+        f" {add_activity('local_date(OLD.created_at)', applications='-1')}"
+        f" {add_activity('local_date(NEW.created_at)', applications='1')}"
+        " END"
+    )
+    cur.execute(
+        "CREATE TRIGGER daily_activity_update_insert"
+        " AFTER INSERT ON application_update"
+        f" BEGIN {add_updates('NEW', '')} END"
+    )
+    cur.execute(
+        "CREATE TRIGGER daily_activity_update_delete"
+        " AFTER DELETE ON application_update"
+        f" BEGIN {add_updates('OLD', '-')} END"
+    )
+    cur.execute(
+        "CREATE TRIGGER daily_activity_update_edit"
+        " AFTER UPDATE OF created_at, triggerer_type, description ON application_update"
+        f" BEGIN {add_updates('OLD', '-')} {add_updates('NEW', '')} END"
+    )
+
+    cur.execute("DELETE FROM daily_activity")
+    cur.execute(
+        "INSERT INTO daily_activity"
+        " (day, applications, status_changes, user_updates, automation_updates)"
+        " SELECT day, SUM(applications), SUM(status_changes),"
+        " SUM(user_updates), SUM(automation_updates) FROM ("
+        " SELECT local_date(created_at) AS day, 1 AS applications, 0 AS status_changes,"
+        " 0 AS user_updates, 0 AS automation_updates FROM application"
+        f" UNION ALL SELECT local_date(created_at), 0, {status_change},"
+        " triggerer_type = 'user', triggerer_type = 'automation'"
+        " FROM application_update"
+        ") WHERE day IS NOT NULL GROUP BY day"
+    )
+
+
+def migration_12(cur: sqlite3.Cursor):
+    # Counter of the changes of the data the pages are made of, the same
+    # for every process unlike PRAGMA data_version, the ETags are derived from it
+    cur.execute(
+        "CREATE TABLE IF NOT EXISTS data_change("
+        "id INTEGER PRIMARY KEY NOT NULL CHECK (id = 0),"
+        "counter INTEGER NOT NULL"
+        ")"
+    )
+    cur.execute("INSERT INTO data_change VALUES (0, 0) ON CONFLICT (id) DO NOTHING")
+    for table in (
+        "application",
+        "application_goal",
+        "application_status",
+        "application_to_update",
+        "application_update",
+        "automation",
+        "employer",
+        "job_board",
+        "location",
+    ):
+        for event in ("insert", "update", "delete"):
+            cur.execute(
+                f"CREATE TRIGGER IF NOT EXISTS data_change_{table}_{event}"
+                f" AFTER {event.upper()} ON {table}"
+                " BEGIN UPDATE data_change SET counter = counter + 1; END"
+            )
+
+
+def migration_13(cur: sqlite3.Cursor):
+    # Trigram index of the names of the lookup tables, so that the typeahead
+    # finds a name containing the query without reading the whole table
+    for table in ("employer", "location", "job_board"):
+        index = f"{table}_name_index"
+        cur.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+            f"name, content = '{table}', content_rowid = 'id', tokenize = 'trigram'"
+            ")"
+        )
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table}"
+            f" BEGIN INSERT INTO {index} (rowid, name) VALUES (NEW.id, NEW.name); END"
+        )
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {index}_rename AFTER UPDATE OF name ON {table}"
+            " BEGIN"
+            f" INSERT INTO {index} ({index}, rowid, name) VALUES ('delete', OLD.id, OLD.name);"
+            f" INSERT INTO {index} (rowid, name) VALUES (NEW.id, NEW.name);"
+            " END"
+        )
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table}"
+            " BEGIN"
+            f" INSERT INTO {index} ({index}, rowid, name) VALUES ('delete', OLD.id, OLD.name);"
+            " END"
+        )
+        cur.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+
+
+MIGRATIONS: dict[int, Union[Callable[[sqlite3.Cursor], None], OnlineMigration]] = {
+    1: migration_1,
+    2: migration_2,
+    3: migration_3,
+    4: migration_4,
+    5: migration_5,
+    6: migration_6,
+    7: migration_7,
+    8: migration_8,
+    9: OnlineMigration(migration_9_schema, migration_9_backfill),
+    10: migration_10,
+    11: migration_11,
+    12: migration_12,
+    13: migration_13,
+}
+
+
+def begin_exclusive(con: sqlite3.Connection):
+    """Starts a transaction holding the write lock, waiting for other migrating processes"""
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            con.execute("BEGIN EXCLUSIVE")
+            return
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or time.monotonic() > deadline:
+                raise
 
-MIGRATIONS = {1: migration_1, 2: migration_2}
+
+def locked_schema_version(cur: sqlite3.Cursor) -> int:
+    """
+    Returns the version inside of a migration transaction. Databases created
+    before user_version was used have their version moved from schema_history.
+    """
+    cur.execute("PRAGMA user_version")
+    version = cur.fetchone()[0]
+    if version == 0:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_history'")
+        if cur.fetchone() is not None:
+            cur.execute("SELECT MAX(version) FROM schema_history")
+            version = cur.fetchone()[0] or 0
+            cur.execute("DROP TABLE schema_history")
+            cur.execute(f"PRAGMA user_version = {version}")
+    return version
+
+
+def migrate_step(con: sqlite3.Connection, step: Callable[[sqlite3.Cursor, int], T]) -> T:
+    """
+    Calls `step` with a cursor and the current version in a transaction
+    holding the write lock, the transaction is rolled back if it fails
+    """
+    begin_exclusive(con)
+    try:
+        cur = con.cursor()
+        result = step(cur, locked_schema_version(cur))
+        con.commit()
+    except BaseException:
+        con.rollback()
+        raise
+    return result
+
+
+def apply_next_migration(cur: sqlite3.Cursor, current: int) -> Optional[int]:
+    """Applies the migration after `current` and returns its version, None if there is none"""
+    if current >= max(MIGRATIONS):
+        return None
+    if current == 0:
+        create_tables()
+
+    version = current + 1
+    migration = MIGRATIONS[version]
+    if not isinstance(migration, OnlineMigration):
+        migration(cur)
+        cur.execute(f"PRAGMA user_version = {version}")
+        return version
+
+    # The schema part is applied once, the backfill may be continued
+    # by another process or after a restart
+    cur.execute("CREATE TABLE IF NOT EXISTS schema_backfill (version INTEGER PRIMARY KEY NOT NULL)")
+    cur.execute("SELECT 1 FROM schema_backfill WHERE version = ?", (version,))
+    if cur.fetchone() is None:
+        migration.schema(cur)
+        cur.execute("INSERT INTO schema_backfill VALUES (?)", (version,))
+    return version
+
+
+def backfill(con: sqlite3.Connection, version: int, migration: OnlineMigration):
+    # Every batch is a short transaction of its own,
+    # other processes can write between them
+    updated = True
+    while updated:
+        begin_exclusive(con)
+        try:
+            updated = migration.backfill(con.cursor(), BACKFILL_BATCH_SIZE)
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+
+    def finish(cur: sqlite3.Cursor, current: int):
+        if current < version:
+            cur.execute("DELETE FROM schema_backfill WHERE version = ?", (version,))
+            cur.execute(f"PRAGMA user_version = {version}")
+
+    migrate_step(con, finish)
 
 
 def apply_migrations():
-    ver = get_current_schema_version()
-    for num in [ver_num for ver_num in MIGRATIONS if ver_num > ver]:
-        MIGRATIONS[num]()
+    """
+    Brings the schema up to the latest version,
+    an up to date database only costs reading PRAGMA user_version
+    """
+    if get_current_schema_version() >= max(MIGRATIONS):
+        return
+
+    con = get_connection()
+    # Rebuilding a table is only safe with foreign keys off,
+    # which cannot be changed inside of a transaction
+    con.execute("PRAGMA foreign_keys = OFF")
+    try:
+        while (version := migrate_step(con, apply_next_migration)) is not None:
+            migration = MIGRATIONS[version]
+            if isinstance(migration, OnlineMigration):
+                backfill(con, version, migration)
+    finally:
+        con.execute(f"PRAGMA foreign_keys = {'ON' if DB_FOREIGN_KEYS else 'OFF'}")
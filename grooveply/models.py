@@ -1,7 +1,9 @@
-from typing import Literal, Optional
+from typing import Literal, Optional, TypeVar
 
 from pydantic import BaseModel
 
+Model = TypeVar("Model", bound=BaseModel)
+
 ApplicationStatusName = Literal[
     "TO APPLY", "APPLIED", "ACTIVE", "STALE", "REJECT", "CLOSED"
 ]
@@ -9,6 +11,26 @@ ApplicationStatusName = Literal[
 TimePeriod = Literal["years", "months", "days"]
 
 
+def from_row(model: type[Model], **fields) -> Model:
+    """
+    Builds a model from the values of a row of our own database without
+    validating them, for the lists read in bulk.
+
+    Values have to be of the field types already, the queries cast the
+    columns that are stored differently. Every field has to be given,
+    defaults are not applied. Unlike `model_construct`, which is slower
+    than validation for these small models, only the instance attributes
+    are set. tests/test_models.py checks the result against validation.
+    """
+    assert fields.keys() == model.model_fields.keys(), f"{model.__name__}: {list(fields)}"
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", fields)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(fields))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
+
+
 class ApplicationStatus(BaseModel):
     id: Optional[int] = None
     name: ApplicationStatusName = "APPLIED"
@@ -33,6 +55,28 @@ class Goal(BaseModel):
     created_at: str
 
 
+class GoalProgress(BaseModel):
+    goal: Goal
+    period_start: Optional[str] = None
+    done: Optional[int] = None
+
+
+class GoalPeriod(BaseModel):
+    start: str
+    end: str
+    done: int
+    goal: int
+    met: bool
+
+
+class DailyActivity(BaseModel):
+    day: str
+    applications: int = 0
+    status_changes: int = 0
+    user_updates: int = 0
+    automation_updates: int = 0
+
+
 class LatestUpdateRow(BaseModel):
     triggerer: str
     application_id: int
@@ -84,6 +128,25 @@ class Application(BaseModel):
     created_at: str
 
 
+class ApplicationPage(BaseModel):
+    items: list[Application]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class ApplicationUpdatePage(BaseModel):
+    items: list[ApplicationUpdate]
+    next_cursor: Optional[str] = None
+
+
+class SearchResult(BaseModel):
+    application_id: int
+    update_id: Optional[int] = None
+    employer: str
+    # Markdown, the user text escaped and the matched terms in bold
+    snippet: str
+
+
 class Automation(BaseModel):
     id: Optional[int] = None
     if_status_is: Optional[ApplicationStatus] = None
@@ -91,3 +154,22 @@ class Automation(BaseModel):
     after: Optional[int] = None
     period: Optional[TimePeriod] = None
     created_at: Optional[str] = None
+
+
+class SlowQuery(BaseModel):
+    at: str
+    duration_ms: float
+    sql: str
+    # Types of the parameters, the values are not kept
+    parameters: str
+    plan: list[str]
+    full_scans: list[str]
+
+
+class SchedulerStatus(BaseModel):
+    running: bool
+    leader: bool
+    interval: float
+    last_run_at: Optional[str] = None
+    next_run_at: Optional[str] = None
+    last_error: Optional[str] = None
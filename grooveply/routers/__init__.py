@@ -0,0 +1,35 @@
+import functools
+from typing import Any
+
+from fastapi.datastructures import Default
+from fastapi.routing import APIRoute
+from fastapi.utils import create_response_field
+from fastui import FastUI
+from starlette.routing import request_response
+
+
+@functools.cache
+def fastui_response_field():
+    return create_response_field(name="Response_FastUI", type_=FastUI, mode="serialization")
+
+
+class FastUIRoute(APIRoute):
+    """
+    Route sharing one response field between all the FastUI pages.
+
+    FastAPI builds the serializer of the response model for every route and
+    again when its router is included, for the union of all the FastUI
+    components that is most of the import time of the app.
+    The attributes replaced here are internals of APIRoute, tests/test_routes.py
+    fails if an upgrade of FastAPI changes them.
+    """
+
+    def __init__(self, path: str, endpoint, *, response_model: Any = Default(None), **kwargs):
+        if response_model is not FastUI:
+            super().__init__(path, endpoint, response_model=response_model, **kwargs)
+            return
+
+        super().__init__(path, endpoint, response_model=None, **kwargs)
+        self.response_model = FastUI
+        self.response_field = self.secure_cloned_response_field = fastui_response_field()
+        self.app = request_response(self.get_route_handler())
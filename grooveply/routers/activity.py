@@ -0,0 +1,76 @@
+from typing import Annotated, Literal
+
+import pendulum
+from fastapi import Query
+from fastapi.routing import APIRouter
+from fastui import AnyComponent, FastUI
+from fastui import components as c
+from fastui.events import GoToEvent
+
+from ..apis.activity import ActivityAPI
+from ..models import DailyActivity
+from ..settings import TZ
+from ..utils import page
+from . import FastUIRoute
+
+Metric = Literal["applications", "status_changes", "user_updates", "automation_updates"]
+
+LEVELS = "·░▒▓█"
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+router = APIRouter(route_class=FastUIRoute)
+
+
+def heatmap(days: list[DailyActivity], metric: Metric) -> str:
+    """Renders the days as a grid of weeks, one line per weekday"""
+    top = max((getattr(day, metric) for day in days), default=0)
+    first = pendulum.parse(days[0].day).day_of_week - 1 if days else 0
+    # Pads the first week so that every column starts on Monday
+    cells = [" "] * first
+    for day in days:
+        count = getattr(day, metric)
+        cells.append(LEVELS[-(-count * (len(LEVELS) - 1) // top)] if count > 0 else LEVELS[0])
+
+    lines = [f"{name} {''.join(cells[i::7])}" for i, name in enumerate(WEEKDAYS)]
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+@router.get("/heatmap", response_model=list[DailyActivity])
+def heatmap_data(days: Annotated[int, Query(gt=0, le=3660)] = 365) -> list[DailyActivity]:
+    today = pendulum.today(tz=TZ)
+    return ActivityAPI.get_calendar(
+        today.subtract(days=days - 1).to_date_string(), today.to_date_string()
+    )
+
+
+@router.get("/", response_model=FastUI, response_model_exclude_none=True)
+def activity(
+    metric: Metric = "applications", weeks: Annotated[int, Query(gt=0, le=520)] = 53
+) -> list[AnyComponent]:
+    today = pendulum.today(tz=TZ)
+    since = today.start_of("week").subtract(weeks=weeks - 1)
+    days = ActivityAPI.get_calendar(since.to_date_string(), today.to_date_string())
+
+    total = sum(getattr(day, metric) for day in days)
+    return page(
+        "Activity",
+        [
+            c.Heading(text="Activity"),
+            c.Div(
+                components=[
+                    c.Link(
+                        components=[
+                            c.Button(
+                                text=name.replace("_", " ").capitalize(),
+                                named_style="primary" if name == metric else "secondary",
+                            )
+                        ],
+                        on_click=GoToEvent(url="/activity/", query={"metric": name}),
+                    )
+                    for name in Metric.__args__
+                ]
+            ),
+            c.Paragraph(text=f"{total} {metric.replace('_', ' ')} since {since.to_date_string()}"),
+            c.Markdown(text=heatmap(days, metric)),
+        ],
+    )
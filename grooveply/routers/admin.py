@@ -0,0 +1,68 @@
+from fastapi.routing import APIRouter
+from fastui import AnyComponent, FastUI
+from fastui import components as c
+from fastui.events import GoToEvent
+
+from ..models import SlowQuery
+from ..settings import SLOW_QUERY_LOG_SIZE, SLOW_QUERY_MS
+from ..slow_queries import clear, get_entries
+from ..utils import page
+from . import FastUIRoute
+
+router = APIRouter(route_class=FastUIRoute)
+
+
+@router.get("/slow-queries", response_model=FastUI, response_model_exclude_none=True)
+def slow_queries() -> list[AnyComponent]:
+    if not SLOW_QUERY_MS:
+        return page(
+            "Slow Queries",
+            [
+                c.Heading(text="Slow Queries", level=2),
+                c.Paragraph(
+                    text="The slow query log is off,"
+                    " set GROOVEPLY_SLOW_QUERY_MS to a threshold in ms to turn it on"
+                ),
+            ],
+        )
+
+    entries = get_entries()
+    components = [
+        c.Heading(text="Slow Queries", level=2),
+        c.Paragraph(
+            text=f"Statements slower than {SLOW_QUERY_MS:g} ms handled by this worker,"
+            f" the latest {SLOW_QUERY_LOG_SIZE} are kept"
+        ),
+        c.Form(
+            form_fields=[],
+            submit_url="/api/admin/slow-queries/clear",
+            footer=[c.Button(text="Clear", named_style="secondary", html_type="submit")],
+        ),
+    ]
+    if not entries:
+        components.append(c.Paragraph(text="No slow queries yet"))
+
+    for entry in entries:
+        title = f"{entry.duration_ms:.1f} ms at {entry.at}"
+        if entry.full_scans:
+            title += f", full scan of {', '.join(entry.full_scans)}"
+        components += [
+            c.Heading(text=title, level=4),
+            c.Code(text=entry.sql, language="sql"),
+            c.Paragraph(text=f"Parameters: {entry.parameters}"),
+        ]
+        if entry.plan:
+            components.append(c.Code(text="\n".join(entry.plan)))
+
+    return page("Slow Queries", components)
+
+
+@router.get("/slow-queries/entries", response_model=list[SlowQuery])
+def slow_query_entries() -> list[SlowQuery]:
+    return get_entries()
+
+
+@router.post("/slow-queries/clear", response_model=FastUI, response_model_exclude_none=True)
+def clear_slow_queries():
+    clear()
+    return [c.FireEvent(event=GoToEvent(url="/admin/slow-queries"))]
@@ -1,7 +1,8 @@
-import sqlite3
 from typing import Annotated, Optional
+from urllib.parse import quote
 
 import pendulum
+from fastapi import HTTPException, Query
 from fastapi.routing import APIRouter
 from fastui import AnyComponent, FastUI
 from fastui import components as c
@@ -11,17 +12,24 @@ from fastui.events import BackEvent, GoToEvent, PageEvent
 from fastui.forms import Textarea, fastui_form
 from pydantic import BaseModel, Field, create_model
 
-from ..apis.application import ApplicationAPI, ApplicationUpdateAPI
+from ..apis.application import (
+    ApplicationAPI,
+    ApplicationStatusAPI,
+    ApplicationUpdateAPI,
+    InvalidCursor,
+)
 from ..apis.employer import EmployerAPI
+from ..apis.job_board import JobBoardAPI
 from ..apis.location import LocationAPI
 from ..db import register_update
-from ..models import ApplicationStatusName
-from ..settings import DB_NAME, TZ
-from ..utils import crop_text, format_date, page
+from ..models import ApplicationStatusName, from_row
+from ..settings import APPLICATIONS_PAGE_SIZE, TZ, UPDATES_PAGE_SIZE
+from ..utils import DateFormatter, crop_text, format_date, page
+from . import FastUIRoute
 
 
 class ApplicationForm(BaseModel):
-    employer_name: str
+    employer_name: str = Field(json_schema_extra={"search_url": "/api/employer/search"})
     app_status_name: ApplicationStatusName = "APPLIED"
     description: Annotated[str | None, Textarea(rows=5)] = Field(None)
     url: Optional[str] = None
@@ -36,6 +44,14 @@ class ApplicationForm(BaseModel):
     )
 
 
+def form_error(field: str, message: str) -> HTTPException:
+    """Error shown next to a field of a submitted form, in the format of fastui_form"""
+    return HTTPException(
+        status_code=422,
+        detail={"form": [{"type": "value_error", "loc": [field], "msg": message}]},
+    )
+
+
 class ApplicationUpdateForm(BaseModel):
     app_status_name: ApplicationStatusName
     url: str = None
@@ -60,33 +76,32 @@ class UpdateForm(BaseModel):
     description: Annotated[str | None, Textarea(rows=5)]
 
 
-router = APIRouter()
+router = APIRouter(route_class=FastUIRoute)
 
 
 @router.post("/create", response_model=FastUI, response_model_exclude_none=True)
 def application_create(form: Annotated[ApplicationForm, fastui_form(ApplicationForm)]):
-    # Creating even if exists, retrieving id anyway
-    employer_id = EmployerAPI.create(form.employer_name)
-
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-
-    cur.execute("SELECT id FROM application_status" " WHERE name = ?", (form.app_status_name,))
-    status_id = cur.fetchall()[0][0]
+    # Names picked from the search must exist, nothing is created before they are checked
+    location_id = None
+    if form.location and not form.new_location:
+        location_id = LocationAPI.get_id(form.location)
+        if location_id is None:
+            raise form_error("location", "Unknown location, enter it in Create location")
+
+    job_board_id = None
+    if form.job_board is not None:
+        job_board_id = JobBoardAPI.get_id(form.job_board)
+        if job_board_id is None:
+            raise form_error("job_board", "Unknown job board")
 
     if form.new_location:
         location_id = LocationAPI.create(form.new_location)
-    elif form.location:
-        cur.execute("SELECT id FROM location WHERE name = ?", (form.location,))
-        location_id = cur.fetchall()[0][0]
-    else:
-        location_id = None
 
-    if form.job_board is not None:
-        cur.execute("SELECT id FROM job_board WHERE name = ?", (form.job_board,))
-        job_board_id = cur.fetchall()[0][0]
-    else:
-        job_board_id = None
+    # Employers are typed in freely, a new name creates one
+    employer_id = EmployerAPI.get_id(form.employer_name)
+    if employer_id is None:
+        employer_id = EmployerAPI.create(form.employer_name)
+    status_id = ApplicationStatusAPI.get_id(form.app_status_name)
 
     new_id = ApplicationAPI.create(
         employer_id, status_id, location_id, job_board_id, form.description, form.url
@@ -101,22 +116,10 @@ def application_create(form: Annotated[ApplicationForm, fastui_form(ApplicationF
 def application_update(
     id, form: Annotated[ApplicationUpdateForm, fastui_form(ApplicationUpdateForm)]
 ):
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-
-    cur.execute("SELECT id FROM application_status" " WHERE name = ?", (form.app_status_name,))
-    new_status_id = cur.fetchall()[0][0]
-
-    cur.execute(
-        "SELECT status_id, aps.name from application app"
-        " JOIN application_status aps"
-        " ON app.status_id = aps.id"
-        " WHERE app.id = ?",
-        (id,),
-    )
-    old_status_id, old_status_name = cur.fetchall()[0]
+    new_status_id = ApplicationStatusAPI.get_id(form.app_status_name)
+    old_status_name = ApplicationAPI.get(id).status.name
 
-    if new_status_id != old_status_id:
+    if form.app_status_name != old_status_name:
         status_updated_at = str(pendulum.now(tz=TZ))
         register_update(
             id, f"Changed status {old_status_name} -> {form.app_status_name}", "user", 1
@@ -343,41 +346,66 @@ def create_update_form(id):
 def application_updates(id) -> list[AnyComponent]:
     app = ApplicationAPI.get(id)
 
-    components = [
-        *application_header(id, app.employer.name),
-        c.Heading(text="Notes", level=2),
-        c.Markdown(text=app.notes if app.notes else "No notes"),
-        c.Link(
-            components=[c.Button(text="Edit")],
-            on_click=GoToEvent(url=f"/application/update-notes-form/{id}"),
-        ),
-        c.Heading(text="Updates", level=2),
-    ]
+    # The timeline is loaded separately so that long histories
+    # do not delay the notes
+    return page(
+        "Application",
+        [
+            *application_header(id, app.employer.name),
+            c.Heading(text="Notes", level=2),
+            c.Markdown(text=app.notes if app.notes else "No notes"),
+            c.Link(
+                components=[c.Button(text="Edit")],
+                on_click=GoToEvent(url=f"/application/update-notes-form/{id}"),
+            ),
+            c.Heading(text="Updates", level=2),
+            c.Link(
+                components=[c.Button(text="New Update")],
+                on_click=GoToEvent(url="create-update-form"),
+            ),
+            c.ServerLoad(
+                path=f"/application/{id}/timeline",
+                components=[c.Spinner(text="Loading updates")],
+            ),
+        ],
+    )
 
-    updates = ApplicationUpdateAPI.get_all(app.id)
-    if len(updates):
-        for upd in updates:
-            components.extend(
-                [
-                    c.Paragraph(
-                        text=f"{upd.created_at} |"
-                        f" {upd.triggerer_type.capitalize()}"
-                        f" ({upd.triggerer_id:0>2d})"
-                    ),
-                    c.Paragraph(text=upd.description),
-                ]
-            )
-    else:
-        components.append(c.Paragraph(text="No updates"))
 
-    components.append(
-        c.Link(
-            components=[c.Button(text="New Update")],
-            on_click=GoToEvent(url="create-update-form"),
+@router.get("/{id}/timeline", response_model=FastUI, response_model_exclude_none=True)
+def application_timeline(id: int, after: str | None = None) -> list[AnyComponent]:
+    """One page of the updates, newest first, ending with the control loading the next one"""
+    try:
+        updates = ApplicationUpdateAPI.get_page(id, UPDATES_PAGE_SIZE, after=after)
+    except InvalidCursor:
+        raise HTTPException(status_code=422, detail="Invalid cursor") from None
+    if not updates.items and after is None:
+        return [c.Paragraph(text="No updates")]
+
+    components = []
+    for upd in updates.items:
+        components.extend(
+            [
+                c.Paragraph(
+                    text=f"{upd.created_at} |"
+                    f" {upd.triggerer_type.capitalize()}"
+                    f" ({upd.triggerer_id:0>2d})"
+                ),
+                c.Paragraph(text=upd.description),
+            ]
         )
-    )
 
-    return page("Application", components)
+    if updates.next_cursor is not None:
+        load_more = PageEvent(name=f"load-updates-{updates.next_cursor}")
+        components.append(
+            c.ServerLoad(
+                path=f"/application/{id}/timeline?after={quote(updates.next_cursor)}",
+                load_trigger=load_more,
+                components=[
+                    c.Button(text="Load more", named_style="secondary", on_click=load_more)
+                ],
+            )
+        )
+    return components
 
 
 class FilterForm(BaseModel):
@@ -385,12 +413,22 @@ class FilterForm(BaseModel):
 
 
 @router.get("/", response_model=FastUI, response_model_exclude_none=True)
-def applications(status: str | None = None) -> list[AnyComponent]:
-    apps = ApplicationAPI()
-    data = apps.get_all()
-
+def applications(
+    status: str | None = None,
+    after: str | None = None,
+    before: str | None = None,
+    size: Annotated[int, Query(gt=0, le=500)] = APPLICATIONS_PAGE_SIZE,
+) -> list[AnyComponent]:
+    try:
+        app_page = ApplicationAPI.get_page(size, after=after, before=before, status=status)
+    except InvalidCursor:
+        raise HTTPException(status_code=422, detail="Invalid cursor") from None
+
+    # One `now` for the whole page, created for this request
+    created_at = DateFormatter().format_all(app.created_at for app in app_page.items)
     data = [
-        ApplicationRow(
+        from_row(
+            ApplicationRow,
             id=app.id,
             status=app.status.name,
             employer_id=app.employer.id,
@@ -398,12 +436,10 @@ def applications(status: str | None = None) -> list[AnyComponent]:
             location=app.location_name,
             job_board=app.job_board_name,
             description=crop_text(app.description, 75),
-            created_at=format_date(app.created_at),
+            created_at=created,
         )
-        for app in data
+        for app, created in zip(app_page.items, created_at)
     ]
-    if status:
-        data = [app for app in data if app.status == status]
 
     components = [
         c.Link(
@@ -437,4 +473,27 @@ def applications(status: str | None = None) -> list[AnyComponent]:
             ),
         ]
 
+    query = {"status": status, "size": size}
+    links = []
+    if app_page.prev_cursor is not None:
+        links.append(
+            c.Link(
+                components=[c.Button(text="Newer", named_style="secondary")],
+                on_click=GoToEvent(
+                    url="/application/", query={**query, "before": app_page.prev_cursor}
+                ),
+            )
+        )
+    if app_page.next_cursor is not None:
+        links.append(
+            c.Link(
+                components=[c.Button(text="Older", named_style="secondary")],
+                on_click=GoToEvent(
+                    url="/application/", query={**query, "after": app_page.next_cursor}
+                ),
+            )
+        )
+    if links:
+        components.append(c.Div(components=links))
+
     return page("Applications", components)
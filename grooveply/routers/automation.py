@@ -1,4 +1,3 @@
-import sqlite3
 from typing import Annotated
 
 from fastapi.routing import APIRouter
@@ -9,11 +8,12 @@ from fastui.events import BackEvent, GoToEvent, PageEvent
 from fastui.forms import fastui_form
 from pydantic import BaseModel
 
-from ..apis.application import ApplicationUpdateAPI
+from ..apis.application import ApplicationStatusAPI, ApplicationUpdateAPI
 from ..apis.automation import AutomationAPI
-from ..models import ApplicationStatusName, TimePeriod
-from ..settings import DB_NAME
+from ..models import ApplicationStatusName, SchedulerStatus, TimePeriod, from_row
+from ..scheduler import scheduler
 from ..utils import page
+from . import FastUIRoute
 
 
 class AutomationRow(BaseModel):
@@ -32,20 +32,17 @@ class AutomationForm(BaseModel):
     period: TimePeriod = "days"
 
 
-router = APIRouter()
+router = APIRouter(route_class=FastUIRoute)
 
 
 @router.post("/create", response_model=FastUI, response_model_exclude_none=True)
 def create(form: Annotated[AutomationForm, fastui_form(AutomationForm)]):
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-    cur.execute("SELECT id from application_status WHERE name = ?", (form.if_status_is,))
-    if_status_is_id = cur.fetchall()[0][0]
-
-    cur.execute("SELECT id from application_status WHERE name = ?", (form.change_status_to,))
-    change_status_to_id = cur.fetchall()[0][0]
-
-    AutomationAPI.create(if_status_is_id, change_status_to_id, form.after, form.period)
+    AutomationAPI.create(
+        ApplicationStatusAPI.get_id(form.if_status_is),
+        ApplicationStatusAPI.get_id(form.change_status_to),
+        form.after,
+        form.period,
+    )
     return [c.FireEvent(event=GoToEvent(url="/automation/"))]
 
 
@@ -70,7 +67,8 @@ def automations() -> list[AnyComponent]:
     data = autos.get_all()
 
     data = [
-        AutomationRow(
+        from_row(
+            AutomationRow,
             id=auto.id,
             if_status_is=auto.if_status_is.name,
             change_status_to=auto.change_status_to.name,
@@ -81,11 +79,23 @@ def automations() -> list[AnyComponent]:
         for auto in data
     ]
 
+    status = scheduler.status()
+    if not status.leader:
+        scheduler_text = "Automations are applied by another worker"
+    else:
+        scheduler_text = (
+            f"Last run: {status.last_run_at or 'never'},"
+            f" next run: {status.next_run_at or 'not scheduled'}"
+        )
+        if status.last_error:
+            scheduler_text += f", last error: {status.last_error}"
+
     components = [
         c.Link(
             components=[c.Button(text="New")],
             on_click=GoToEvent(url="create-form"),
         ),
+        c.Paragraph(text=scheduler_text),
     ]
 
     if len(data):
@@ -106,6 +116,11 @@ def automations() -> list[AnyComponent]:
     return page("Automations", components)
 
 
+@router.get("/scheduler", response_model=SchedulerStatus)
+def scheduler_status() -> SchedulerStatus:
+    return scheduler.status()
+
+
 @router.get("/{id}", response_model=FastUI, response_model_exclude_none=True)
 def automation(id) -> list[AnyComponent]:
     auto = AutomationAPI.get(id)
@@ -1,18 +1,22 @@
-import sqlite3
 from typing import Optional
 
+from fastapi import Request
 from fastapi.routing import APIRouter
 from fastui import AnyComponent, FastUI
 from fastui import components as c
 from fastui.components.display import DisplayLookup, DisplayMode
 from fastui.events import GoToEvent
+from fastui.forms import SelectSearchResponse
 from pydantic import BaseModel
 
 from ..apis.employer import EmployerAPI
-from ..settings import DB_NAME
+from ..db import get_connection, run_db
+from ..models import from_row
+from ..settings import SEARCH_LIMIT
 from ..utils import crop_text, page
+from . import FastUIRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastUIRoute)
 
 
 class ApplicationRow(BaseModel):
@@ -47,6 +51,16 @@ def employers() -> list[AnyComponent]:
     return page("Employers", components)
 
 
+@router.get("/search", response_model=SelectSearchResponse)
+async def search_view(request: Request, q: str) -> SelectSearchResponse:
+    names = await run_db(EmployerAPI.search, q, SEARCH_LIMIT)
+    options = [{"value": name, "label": name} for name in names]
+    # Typing a name that does not exist yet creates the employer on submit
+    if q and q.lower() not in {name.lower() for name in names}:
+        options.insert(0, {"value": q, "label": f"{q} (new)"})
+    return SelectSearchResponse(options=options)
+
+
 @router.get("/{id}", response_model=FastUI, response_model_exclude_none=True)
 def employer_page(id) -> list[AnyComponent]:
     employer_page = EmployerAPI.get_page(id)
@@ -58,7 +72,7 @@ def employer_page(id) -> list[AnyComponent]:
         c.Paragraph(text=f"Total locations: {employer_page.total_locations}"),
     ]
 
-    con = sqlite3.connect(DB_NAME)
+    con = get_connection()
     cur = con.cursor()
 
     cur.execute(
@@ -84,7 +98,8 @@ def employer_page(id) -> list[AnyComponent]:
     data = cur.fetchall()
 
     data = [
-        ApplicationRow(
+        from_row(
+            ApplicationRow,
             id=item[0],
             status=item[1],
             location=item[2],
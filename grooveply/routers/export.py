@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+from typing import Iterator, Literal, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRouter
+
+from ..db import connect, timestamp_ms
+from . import FastUIRoute
+
+ExportFormat = Literal["csv", "ndjson"]
+
+BATCH_SIZE = 1000
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+router = APIRouter(route_class=FastUIRoute)
+
+
+def stream_rows(sql: str, params: tuple, fmt: ExportFormat) -> Iterator[str]:
+    # The response is produced from several threadpool threads,
+    # so it gets its own connection instead of a per-thread one
+    con = connect()
+    try:
+        cur = con.cursor()
+        cur.execute(sql, params)
+        columns = [col[0] for col in cur.description]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == "csv":
+            writer.writerow(columns)
+
+        while rows := cur.fetchmany(BATCH_SIZE):
+            if fmt == "csv":
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(columns, row))))
+                    buffer.write("\n")
+
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    finally:
+        con.close()
+
+
+def since_filter(
+    alias: str, table: str, column: str, since: Optional[str]
+) -> tuple[str, tuple]:
+    """
+    WHERE clause keeping the rows of `table` with `column` at or after `since`,
+    none without it. The ids are picked from the index on the column,
+    the rows are still read in the order of the ids without sorting them.
+    """
+    if since is None:
+        return "", ()
+    try:
+        ts = timestamp_ms(since)
+    except ValueError:
+        raise HTTPException(
+            status_code=422, detail="Invalid since, expected a date or a time in ISO 8601"
+        ) from None
+    return f" WHERE {alias}.id IN (SELECT id FROM {table} WHERE {column} >= ?)", (ts,)
+
+
+def export_response(name: str, sql: str, params: tuple, fmt: ExportFormat) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(sql, params, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/applications.{fmt}")
+def export_applications(fmt: ExportFormat, since: Optional[str] = None) -> StreamingResponse:
+    where, params = since_filter("app", "application", "last_activity_ts", since)
+    return export_response(
+        "applications",
+        "SELECT app.id, emp.name AS employer, status.name AS status,"
+        " loc.name AS location, jb.name AS job_board,"
+        " app.description, app.url, app.notes,"
+        " app.status_updated_at, app.created_at, app.last_activity_at"
+        " FROM application app"
+        " JOIN employer emp ON app.employer_id = emp.id"
+        " JOIN application_status status ON app.status_id = status.id"
+        " LEFT JOIN location loc ON app.location_id = loc.id"
+        " LEFT JOIN job_board jb ON app.job_board_id = jb.id"
+        f"{where}"
+        " ORDER BY app.id",
+        params,
+        fmt,
+    )
+
+
+@router.get("/updates.{fmt}")
+def export_updates(fmt: ExportFormat, since: Optional[str] = None) -> StreamingResponse:
+    where, params = since_filter("au", "application_update", "created_ts", since)
+    return export_response(
+        "updates",
+        "SELECT au.id, atu.application_id, au.description, au.created_at,"
+        " au.triggerer_type, au.triggerer_id"
+        " FROM application_update au"
+        " JOIN application_to_update atu ON au.id = atu.update_id"
+        f"{where}"
+        " ORDER BY au.id",
+        params,
+        fmt,
+    )
@@ -2,6 +2,7 @@ from datetime import date
 from typing import Annotated, Optional
 
 import pendulum
+from fastapi import Query
 from fastapi.routing import APIRouter
 from fastui import AnyComponent, FastUI
 from fastui import components as c
@@ -10,13 +11,24 @@ from fastui.events import BackEvent, GoToEvent, PageEvent
 from fastui.forms import fastui_form
 from pydantic import BaseModel, Field
 
-from ..apis.application import ApplicationAPI
 from ..apis.goal import GoalAPI
-from ..models import TimePeriod
+from ..models import GoalPeriod, TimePeriod
 from ..settings import TZ
 from ..utils import format_date, page
+from . import FastUIRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastUIRoute)
+
+
+class GoalListRow(BaseModel):
+    id: int
+    value: int
+    each: int
+    period: TimePeriod
+    start_date: str
+    end_date: Optional[str]
+    done: Optional[int]
+    progress: Optional[str]
 
 
 # TODO: check start_date < end_date
@@ -57,7 +69,18 @@ def create_form() -> list[AnyComponent]:
 
 @router.get("/", response_model=FastUI, response_model_exclude_none=True)
 def goals() -> list[AnyComponent]:
-    goals = GoalAPI.get_all()
+    goals = [
+        GoalListRow(
+            **item.goal.model_dump(include=set(GoalListRow.model_fields)),
+            done=item.done,
+            progress=(
+                f"{int(round(item.done / item.goal.value * 100))}%"
+                if item.done is not None
+                else None
+            ),
+        )
+        for item in GoalAPI.progress_all(include_expired=True)
+    ]
     return page(
         "Application Goals",
         [
@@ -76,6 +99,8 @@ def goals() -> list[AnyComponent]:
                         DisplayLookup(field="period"),
                         DisplayLookup(field="start_date"),
                         DisplayLookup(field="end_date"),
+                        DisplayLookup(field="done"),
+                        DisplayLookup(field="progress"),
                     ],
                 )
                 if len(goals)
@@ -85,27 +110,50 @@ def goals() -> list[AnyComponent]:
     )
 
 
+@router.get("/{id}/history", response_model=list[GoalPeriod])
+def history(id: int, periods: Annotated[int, Query(gt=0, le=120)] = 12) -> list[GoalPeriod]:
+    return GoalAPI.history(GoalAPI.get(id), periods)
+
+
 @router.get("/{id}", response_model=FastUI, response_model_exclude_none=True)
 def goal_page(id) -> list[AnyComponent]:
     goal = GoalAPI.get(id)
+    history = GoalAPI.history(goal)
     components = []
 
     if goal.end_date is not None and pendulum.parse(goal.end_date) < pendulum.now(tz=TZ):
         components.append(c.Paragraph(text=f"This goal is expired since {goal.end_date}"))
     else:
-        latest_period_start = GoalAPI.latest_period_start(goal)
-        cnt = ApplicationAPI.count_since(str(latest_period_start))
+        current = history[-1]
+        percent = int(round(current.done / goal.value * 100))
         components.extend(
             [
-                c.Heading(text=f"Goal {goal.id} is {int(round(cnt / goal.value * 100))}% complete"),
+                c.Heading(text=f"Goal {goal.id} is {percent}% complete"),
                 c.Paragraph(text=f"Apply {goal.value} times in {goal.each} {goal.period}"),
                 c.Paragraph(text=f"Started: {goal.start_date}"),
-                c.Paragraph(text=f"{cnt}/{goal.value} since {latest_period_start}:"),
+                c.Paragraph(text=f"{current.done}/{goal.value} since {current.start}:"),
             ]
         )
         if goal.end_date is not None:
             components.append(c.Paragraph(text=f"Will end: {format_date(goal.end_date)}"))
 
+    components.extend(
+        [
+            c.Heading(text="History", level=3),
+            c.Table(
+                data=list(reversed(history)),
+                data_model=GoalPeriod,
+                columns=[
+                    DisplayLookup(field="start"),
+                    DisplayLookup(field="end"),
+                    DisplayLookup(field="done"),
+                    DisplayLookup(field="goal"),
+                    DisplayLookup(field="met"),
+                ],
+            ),
+        ]
+    )
+
     components.append(
         c.Link(
             components=[
@@ -10,7 +10,10 @@ from fastui.forms import SelectSearchResponse, fastui_form
 from pydantic import BaseModel
 
 from ..apis.job_board import JobBoardAPI
+from ..db import run_db
+from ..settings import SEARCH_LIMIT
 from ..utils import page
+from . import FastUIRoute
 
 
 class JobBoardForm(BaseModel):
@@ -18,7 +21,7 @@ class JobBoardForm(BaseModel):
     url: Optional[str]
 
 
-router = APIRouter()
+router = APIRouter(route_class=FastUIRoute)
 
 
 @router.post("/create", response_model=FastUI, response_model_exclude_none=True)
@@ -71,7 +74,5 @@ def table() -> list[AnyComponent]:
 
 @router.get("/search", response_model=SelectSearchResponse)
 async def search_view(request: Request, q: str) -> SelectSearchResponse:
-    job_boards = JobBoardAPI.get_all()
-    return SelectSearchResponse(
-        options=[{"value": item.name, "label": item.name} for item in job_boards]
-    )
+    names = await run_db(JobBoardAPI.search, q, SEARCH_LIMIT)
+    return SelectSearchResponse(options=[{"value": name, "label": name} for name in names])
@@ -10,14 +10,17 @@ from fastui.forms import SelectSearchResponse, fastui_form
 from pydantic import BaseModel
 
 from ..apis.location import LocationAPI
+from ..db import run_db
+from ..settings import SEARCH_LIMIT
 from ..utils import page
+from . import FastUIRoute
 
 
 class LocationForm(BaseModel):
     name: str
 
 
-router = APIRouter()
+router = APIRouter(route_class=FastUIRoute)
 
 
 @router.post("/create", response_model=FastUI, response_model_exclude_none=True)
@@ -69,7 +72,5 @@ def applications() -> list[AnyComponent]:
 
 @router.get("/search", response_model=SelectSearchResponse)
 async def search_view(request: Request, q: str) -> SelectSearchResponse:
-    locations = LocationAPI.get_all()
-    return SelectSearchResponse(
-        options=[{"value": loc.name, "label": loc.name} for loc in locations]
-    )
+    names = await run_db(LocationAPI.search, q, SEARCH_LIMIT)
+    return SelectSearchResponse(options=[{"value": name, "label": name} for name in names])
@@ -0,0 +1,81 @@
+from typing import Annotated, Optional
+
+from fastapi import Query
+from fastapi.routing import APIRouter
+from fastui import AnyComponent, FastUI
+from fastui import components as c
+from fastui.events import GoToEvent
+from pydantic import BaseModel, Field
+
+from ..apis.search import SearchAPI
+from ..settings import SEARCH_PAGE_SIZE
+from ..utils import page
+from . import FastUIRoute
+
+
+class SearchForm(BaseModel):
+    q: str = Field(title="Search applications and updates")
+
+
+router = APIRouter(route_class=FastUIRoute)
+
+
+@router.get("", response_model=FastUI, response_model_exclude_none=True)
+def search(
+    q: Optional[str] = None, page_number: Annotated[int, Query(alias="page", gt=0)] = 1
+) -> list[AnyComponent]:
+    components = [
+        c.ModelForm(
+            model=SearchForm,
+            initial={"q": q} if q else None,
+            submit_url="/search",
+            method="GOTO",
+            display_mode="inline",
+        ),
+    ]
+    if not q:
+        return page("Search", components)
+
+    results = SearchAPI.search(
+        q, SEARCH_PAGE_SIZE + 1, offset=(page_number - 1) * SEARCH_PAGE_SIZE
+    )
+    has_more = len(results) > SEARCH_PAGE_SIZE
+
+    if not results:
+        components.append(c.Paragraph(text="Nothing found"))
+
+    for result in results[:SEARCH_PAGE_SIZE]:
+        if result.update_id is None:
+            url = f"/application/{result.application_id}/details"
+        else:
+            url = f"/application/{result.application_id}/updates"
+
+        components.extend(
+            [
+                c.Link(
+                    components=[c.Heading(text=result.employer, level=4)],
+                    on_click=GoToEvent(url=url),
+                ),
+                c.Markdown(text=result.snippet),
+            ]
+        )
+
+    links = []
+    if page_number > 1:
+        links.append(
+            c.Link(
+                components=[c.Button(text="Previous", named_style="secondary")],
+                on_click=GoToEvent(url="/search", query={"q": q, "page": page_number - 1}),
+            )
+        )
+    if has_more:
+        links.append(
+            c.Link(
+                components=[c.Button(text="Next", named_style="secondary")],
+                on_click=GoToEvent(url="/search", query={"q": q, "page": page_number + 1}),
+            )
+        )
+    if links:
+        components.append(c.Div(components=links))
+
+    return page("Search", components)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import pendulum
+from pendulum import DateTime
+
+from .apis.automation import AutomationAPI
+from .auto import update_statuses
+from .db import run_db
+from .models import SchedulerStatus
+from .settings import AUTOMATION_INTERVAL, DB_NAME, TZ
+
+try:
+    import fcntl
+except ImportError:  # Windows, where only one worker is expected
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderLock:
+    """
+    Non-blocking exclusive lock on a file next to the database.
+    Only one process holds it at a time, so only one of several
+    uvicorn workers runs the automations.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        if fcntl is None:
+            self._file = True
+            return True
+
+        file = open(self.path, "a")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return False
+
+        self._file = file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        self._file = None
+
+
+class AutomationScheduler:
+    """
+    Applies automations periodically in the background.
+
+    Runs right after startup and then every `interval` seconds or earlier
+    when the next application becomes due. Workers that do not hold
+    the leader lock keep trying to take it over on the same schedule.
+    """
+
+    def __init__(self, interval: float, lock_path: str):
+        self.interval = interval
+        self.lock = LeaderLock(lock_path)
+        self.last_run_at: Optional[DateTime] = None
+        self.next_run_at: Optional[DateTime] = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.lock.release()
+
+    def status(self) -> SchedulerStatus:
+        return SchedulerStatus(
+            running=self._task is not None and not self._task.done(),
+            leader=self.lock.held,
+            interval=self.interval,
+            last_run_at=str(self.last_run_at) if self.last_run_at else None,
+            next_run_at=str(self.next_run_at) if self.next_run_at else None,
+            last_error=self.last_error,
+        )
+
+    async def _loop(self):
+        while True:
+            delay = self.interval
+            if self._acquire_lock():
+                await self.run_once()
+                delay = await run_db(self._seconds_until_due)
+
+            self.next_run_at = pendulum.now(tz=TZ).add(seconds=delay)
+            await asyncio.sleep(delay)
+
+    def _acquire_lock(self) -> bool:
+        try:
+            return self.lock.acquire()
+        except OSError as e:
+            # The lock file cannot be opened, tried again on the next run
+            logger.exception("Failed to take the leader lock")
+            self.last_error = repr(e)
+            return False
+
+    async def run_once(self):
+        try:
+            await run_db(update_statuses)
+            self.last_error = None
+        except Exception as e:
+            logger.exception("Failed to apply automations")
+            self.last_error = repr(e)
+        self.last_run_at = pendulum.now(tz=TZ)
+
+    def _seconds_until_due(self) -> float:
+        try:
+            due = AutomationAPI.next_due_at()
+        except Exception:
+            logger.exception("Failed to compute the next automation due time")
+            return self.interval
+
+        if due is None:
+            return self.interval
+        # One second past the due time, the automation query uses `<=`
+        seconds = (due - pendulum.now(tz=TZ)).total_seconds() + 1
+        return min(self.interval, max(seconds, 1))
+
+
+scheduler = AutomationScheduler(AUTOMATION_INTERVAL, os.path.splitext(DB_NAME)[0] + ".lock")
@@ -0,0 +1,165 @@
+"""
+Checks that the queries issued by the API layer are served by indexes.
+
+Builds a throwaway database, calls the API methods against it while tracing
+every executed statement and prints EXPLAIN QUERY PLAN for each of them.
+Exits with a non-zero code if a query that is not meant to list a whole table
+does a full scan of one of the large tables.
+
+    python grooveply/scripts/check_query_plans.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+
+# Must be set before grooveply is imported since the settings are read on import
+TMP_DIR = tempfile.TemporaryDirectory()
+os.environ["GROOVEPLY_DB"] = os.path.join(TMP_DIR.name, "check.db")
+
+from grooveply.apis.activity import ActivityAPI  # noqa: E402
+from grooveply.apis.application import (  # noqa: E402
+    ApplicationAPI,
+    ApplicationUpdateAPI,
+    encode_cursor,
+)
+from grooveply.apis.automation import AutomationAPI  # noqa: E402
+from grooveply.apis.employer import EmployerAPI  # noqa: E402
+from grooveply.apis.goal import GoalAPI  # noqa: E402
+from grooveply.apis.job_board import JobBoardAPI  # noqa: E402
+from grooveply.apis.location import LocationAPI  # noqa: E402
+from grooveply.auto import update_statuses  # noqa: E402
+from grooveply.db import close_connections, get_connection, register_update  # noqa: E402
+from grooveply.migrations import apply_migrations  # noqa: E402
+
+LARGE_TABLES = {
+    "application",
+    "application_update",
+    "application_to_update",
+    "employer",
+    "daily_activity",
+}
+
+TABLE_REF = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+SQL_WORDS = {"on", "where", "join", "left", "inner", "group", "order", "limit", "set", "using"}
+
+
+def table_aliases(sql: str) -> dict[str, str]:
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_WORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(sql: str, plan: list[str]) -> list[str]:
+    aliases = table_aliases(sql)
+    scanned = []
+    for detail in plan:
+        match = re.match(r"SCAN (\w+)$", detail)
+        if match and aliases.get(match.group(1), match.group(1)) in LARGE_TABLES:
+            scanned.append(aliases.get(match.group(1), match.group(1)))
+    return scanned
+
+
+def main() -> int:
+    apply_migrations()
+
+    employer_id = EmployerAPI.create("Employer")
+    location_id = LocationAPI.create("Location")
+    job_board_id = JobBoardAPI.create("Job Board", None)
+    app_id = ApplicationAPI.create(employer_id, 1, location_id, job_board_id, "", "")
+    register_update(app_id, "Created", "user", 1)
+    auto_id = AutomationAPI.create(1, 3, 14, "days")
+    GoalAPI.create(10, 1, "months", "2024-01-01", None)
+
+    # (name, call, lists the whole table by design)
+    checks = [
+        ("ApplicationAPI.get", lambda: ApplicationAPI.get(app_id), False),
+        ("ApplicationAPI.get_all", ApplicationAPI.get_all, True),
+        ("ApplicationAPI.get_page", lambda: ApplicationAPI.get_page(50), False),
+        (
+            "ApplicationAPI.get_page (status)",
+            lambda: ApplicationAPI.get_page(50, status="APPLIED"),
+            False,
+        ),
+        (
+            "ApplicationAPI.get_page (cursor)",
+            lambda: ApplicationAPI.get_page(
+                50, after=ApplicationAPI.get_page(1).next_cursor or encode_cursor(0, 0)
+            ),
+            False,
+        ),
+        ("ApplicationAPI.count_since", lambda: ApplicationAPI.count_since("2024-01-01"), False),
+        ("ApplicationAPI.next_status", lambda: ApplicationAPI.next_status(app_id), False),
+        ("ApplicationUpdateAPI.get_all", lambda: ApplicationUpdateAPI.get_all(app_id), False),
+        (
+            "ApplicationUpdateAPI.get_page",
+            lambda: ApplicationUpdateAPI.get_page(app_id, 20, after=encode_cursor(0, 1)),
+            False,
+        ),
+        ("ApplicationUpdateAPI.get_latest", lambda: ApplicationUpdateAPI.get_latest(10), False),
+        (
+            "ApplicationUpdateAPI.get_latest_by_auto",
+            lambda: ApplicationUpdateAPI.get_latest_by_auto(auto_id, 10),
+            False,
+        ),
+        ("AutomationAPI.get_all", AutomationAPI.get_all, True),
+        ("EmployerAPI.get_page", lambda: EmployerAPI.get_page(employer_id), False),
+        ("EmployerAPI.get_all", EmployerAPI.get_all, True),
+        ("EmployerAPI.get_total_count", EmployerAPI.get_total_count, True),
+        ("EmployerAPI.search", lambda: EmployerAPI.search("emp", 20), False),
+        ("LocationAPI.search", lambda: LocationAPI.search("loc", 20), False),
+        ("JobBoardAPI.search", lambda: JobBoardAPI.search("job", 20), False),
+        ("GoalAPI.get_all", GoalAPI.get_all, True),
+        ("GoalAPI.progress_all", GoalAPI.progress_all, False),
+        ("GoalAPI.history", lambda: GoalAPI.history(GoalAPI.get_all()[0]), False),
+        (
+            "ActivityAPI.get_range",
+            lambda: ActivityAPI.get_range("2024-01-01", "2024-12-31"),
+            False,
+        ),
+        ("LocationAPI.get_all", LocationAPI.get_all, True),
+        ("JobBoardAPI.get_all", JobBoardAPI.get_all, True),
+        ("update_statuses", update_statuses, False),
+    ]
+
+    con = get_connection()
+    failed = []
+    for name, call, lists_table in checks:
+        statements = []
+        con.set_trace_callback(statements.append)
+        call()
+        con.set_trace_callback(None)
+
+        print(name)
+        for sql in statements:
+            if not re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)", sql, re.IGNORECASE):
+                continue
+
+            cur = con.cursor()
+            cur.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = [row[3] for row in cur.fetchall()]
+            scans = full_scans(sql, plan)
+
+            print(f"  {' '.join(sql.split())}")
+            for detail in plan:
+                print(f"    {detail}")
+            if scans and not lists_table:
+                failed.append((name, scans))
+
+    close_connections()
+    TMP_DIR.cleanup()
+
+    if failed:
+        print()
+        for name, scans in failed:
+            print(f"FULL SCAN in {name}: {', '.join(scans)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,306 @@
+"""
+Bulk import of applications and their updates.
+
+    grooveply import applications.csv --updates updates.csv
+
+Inputs are read as CSV or, for .json/.jsonl/.ndjson files, as one JSON object
+per line, and streamed in chunks so memory does not depend on the file size.
+
+Application fields: id, employer, status, description, url, notes, location,
+job_board, created_at, status_updated_at. Only employer is required, id is
+the identifier used by the updates file to refer to the application.
+
+Update fields: id, application_id, description, created_at, triggerer_type,
+triggerer_id. Only application_id and description are required.
+
+Rows that cannot be imported are reported with their line and skipped.
+The ids are kept with the imported rows and rows with an id imported before
+are skipped, so a failed or repeated import can be run again. Updates without
+an id are told apart by their application and line in the file.
+"""
+
+import csv
+import json
 import os
+import sqlite3
 import sys
+import time
+from itertools import islice
+from typing import Iterator, Optional
+
+import pendulum
+
+from ..db import get_connection, timestamp_ms
+from ..migrations import apply_migrations
+from ..settings import TZ
+
+CHUNK_SIZE = 5000
+
+
+class InvalidRow(ValueError):
+    """A row that cannot be imported, reported with its line and skipped"""
+
+
+def read_rows(path: str) -> Iterator[tuple[int, dict]]:
+    """Yields the rows with the numbers of the lines they end on"""
+    if os.path.splitext(path)[1] in (".json", ".jsonl", ".ndjson"):
+        with open(path) as f:
+            for line, text in enumerate(f, 1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except json.JSONDecodeError as e:
+                    report(path, line, f"invalid JSON, {e}")
+                    continue
+                if not isinstance(row, dict):
+                    report(path, line, "not a JSON object")
+                    continue
+                yield line, row
+    else:
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, {
+                    key: value if value != "" else None for key, value in row.items()
+                }
+
+
+def chunked(rows: Iterator[tuple[int, dict]], size: int) -> Iterator[list[tuple[int, dict]]]:
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def report(path: str, line: int, message: str):
+    print(f"{path}:{line}: {message}, skipped", file=sys.stderr)
+
+
+def time_field(row: dict, field: str, default: str) -> tuple[str, int]:
+    """The time of the field or the default and its timestamp"""
+    value = row.get(field) or default
+    try:
+        if not isinstance(value, str):
+            raise ValueError(value)
+        return value, timestamp_ms(value)
+    except ValueError:
+        raise InvalidRow(f"invalid {field} {value!r}") from None
+
+
+def import_id(row: dict) -> Optional[str]:
+    return str(row["id"]) if row.get("id") is not None else None
+
+
+def imported_ids(cur: sqlite3.Cursor, table: str, ids: list[str]) -> dict[str, int]:
+    """The rows of the table that were imported with one of the ids"""
+    cur.execute(
+        f"SELECT import_id, id FROM {table}"
+        " WHERE import_id IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),),
+    )
+    return dict(cur.fetchall())
+
+
+class NameMap:
+    """In-memory name -> id map of a lookup table, creating missing names"""
+
+    def __init__(self, table: str, now: str):
+        self.table = table
+        self.now = now
+        cur = get_connection().cursor()
+        cur.execute(f"SELECT name, id FROM {table}")
+        self.ids = dict(cur.fetchall())
+
+    def get(self, name: Optional[str]) -> Optional[int]:
+        if name is None:
+            return None
+
+        id = self.ids.get(name)
+        if id is None:
+            cur = get_connection().cursor()
+            cur.execute(
+                f"INSERT INTO {self.table} (name, created_at) VALUES (?, ?) RETURNING id",
+                (name, self.now),
+            )
+            id = self.ids[name] = cur.fetchone()[0]
+        return id
+
+
+class Progress:
+    def __init__(self, what: str):
+        self.what = what
+        self.count = 0
+        self.skipped = 0
+        self.start = time.perf_counter()
+
+    def add(self, count: int, skipped: int = 0):
+        self.count += count
+        self.skipped += skipped
+        elapsed = time.perf_counter() - self.start
+        print(
+            f"{self.what}: {self.count} rows, {self.count / elapsed:.0f} rows/s"
+            + (f", {self.skipped} skipped" if self.skipped else ""),
+            file=sys.stderr,
+        )
+
+
+def import_applications(path: str, chunk_size: int = CHUNK_SIZE) -> dict[str, int]:
+    """
+    Imports applications from the file, returns the map from
+    their ids in the file to the ids in the database
+    """
+    now = str(pendulum.now(tz=TZ))
+    con = get_connection()
+    cur = con.cursor()
+    cur.execute("SELECT name, id FROM application_status")
+    statuses = dict(cur.fetchall())
+
+    employers = NameMap("employer", now)
+    locations = NameMap("location", now)
+    job_boards = NameMap("job_board", now)
+
+    app_ids = {}
+    progress = Progress("Applications")
+    for chunk in chunked(read_rows(path), chunk_size):
+        with con:
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM application")
+            next_id = cur.fetchone()[0] + 1
+            imported = imported_ids(
+                cur, "application", [id for _, row in chunk if (id := import_id(row))]
+            )
+
+            rows = []
+            skipped = 0
+            for line, row in chunk:
+                key = import_id(row)
+                try:
+                    if key in app_ids:
+                        raise InvalidRow(f"id {key} is repeated")
+                    if key in imported:
+                        app_ids[key] = imported[key]
+                        skipped += 1
+                        continue
+                    if not row.get("employer"):
+                        raise InvalidRow("no employer")
+                    status = row.get("status") or "APPLIED"
+                    if status not in statuses:
+                        raise InvalidRow(f"unknown status {status!r}")
+                    created_at, created_ts = time_field(row, "created_at", now)
+                    status_updated_at, status_updated_ts = time_field(
+                        row, "status_updated_at", created_at
+                    )
+                except InvalidRow as e:
+                    report(path, line, str(e))
+                    skipped += 1
+                    continue
+
+                rows.append(
+                    (
+                        next_id,
+                        employers.get(str(row["employer"])),
+                        statuses[status],
+                        locations.get(row.get("location")),
+                        job_boards.get(row.get("job_board")),
+                        row.get("description"),
+                        row.get("url"),
+                        row.get("notes"),
+                        status_updated_at,
+                        created_at,
+                        created_at,
+                        status_updated_ts,
+                        created_ts,
+                        created_ts,
+                        key,
+                    )
+                )
+                if key is not None:
+                    app_ids[key] = next_id
+                next_id += 1
+
+            cur.executemany(
+                "INSERT INTO application"
+                " (id, employer_id, status_id, location_id, job_board_id,"
+                " description, url, notes, status_updated_at, created_at, last_activity_at,"
+                " status_updated_ts, created_ts, last_activity_ts, import_id) VALUES"
+                " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        progress.add(len(rows), skipped)
+    return app_ids
+
+
+def import_updates(path: str, app_ids: dict[str, int], chunk_size: int = CHUNK_SIZE):
+    now = str(pendulum.now(tz=TZ))
+    con = get_connection()
+    cur = con.cursor()
 
-import pandas as pd
-from tqdm import tqdm
+    progress = Progress("Updates")
+    for chunk in chunked(read_rows(path), chunk_size):
+        # Updates without an id are keyed by their application and line
+        keys = [
+            import_id(row) or f"{row.get('application_id')}:{line}" for line, row in chunk
+        ]
+        with con:
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM application_update")
+            next_id = cur.fetchone()[0] + 1
+            imported = imported_ids(cur, "application_update", keys)
 
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from db import create_tables
-from models import Application, ApplicationStatus, Employer
+            updates, links = [], []
+            added = set()
+            skipped = 0
+            for (line, row), key in zip(chunk, keys):
+                try:
+                    if key in added:
+                        raise InvalidRow(f"id {key} is repeated")
+                    if key in imported:
+                        skipped += 1
+                        continue
+                    if not row.get("description"):
+                        raise InvalidRow("no description")
+                    app_id = app_ids.get(str(row.get("application_id")))
+                    if app_id is None:
+                        raise InvalidRow(f"unknown application_id {row.get('application_id')!r}")
+                    created_at, created_ts = time_field(row, "created_at", now)
+                except InvalidRow as e:
+                    report(path, line, str(e))
+                    skipped += 1
+                    continue
 
-from grooveply.apis.application import ApplicationAPI
+                updates.append(
+                    (
+                        next_id,
+                        row["description"],
+                        created_at,
+                        created_ts,
+                        row.get("triggerer_type") or "user",
+                        row.get("triggerer_id") or 1,
+                        key,
+                    )
+                )
+                links.append((app_id, next_id, created_ts))
+                added.add(key)
+                next_id += 1
 
-INPUT = "example.csv"
+            cur.executemany(
+                "INSERT INTO application_update"
+                " (id, description, created_at, created_ts, triggerer_type, triggerer_id,"
+                " import_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                updates,
+            )
+            cur.executemany(
+                "INSERT INTO application_to_update"
+                " (application_id, update_id, update_created_ts) VALUES (?, ?, ?)",
+                links,
+            )
+        progress.add(len(updates), skipped)
 
-if __name__ == "__main__":
-    create_tables()
 
-    df = pd.read_csv(INPUT)
+def import_data(
+    applications_path: str, updates_path: Optional[str] = None, chunk_size: int = CHUNK_SIZE
+):
+    apply_migrations()
 
-    # TODO:
-    # for data in tqdm(df.itertuples(), total=len(df)):
-    #     ApplicationAPI.create(
-            
-    #     )
+    app_ids = import_applications(applications_path, chunk_size)
+    if updates_path is not None:
+        import_updates(updates_path, app_ids, chunk_size)
@@ -2,5 +2,47 @@ import os
 
 VERSION = "0.1.0"
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_NAME = os.path.join(BASE_DIR, "grooveply.db")
+DB_NAME = os.environ.get("GROOVEPLY_DB", os.path.join(BASE_DIR, "grooveply.db"))
 TZ = "Europe/Moscow"
+STATEMENT_CACHE_SIZE = 256
+
+# Storage profile applied to every connection, see https://sqlite.org/pragma.html
+DB_JOURNAL_MODE = os.environ.get("GROOVEPLY_DB_JOURNAL_MODE", "wal").lower()
+DB_SYNCHRONOUS = os.environ.get("GROOVEPLY_DB_SYNCHRONOUS", "normal").lower()
+DB_BUSY_TIMEOUT = int(os.environ.get("GROOVEPLY_DB_BUSY_TIMEOUT", 5000))  # ms
+DB_CACHE_SIZE = int(os.environ.get("GROOVEPLY_DB_CACHE_SIZE", -16384))  # KiB if negative
+DB_MMAP_SIZE = int(os.environ.get("GROOVEPLY_DB_MMAP_SIZE", 256 * 1024 * 1024))  # bytes
+DB_FOREIGN_KEYS = os.environ.get("GROOVEPLY_DB_FOREIGN_KEYS", "1") == "1"
+
+# The modes are put in the PRAGMA statements as they are, so only known ones are accepted
+JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+SYNCHRONOUS_MODES = ("off", "normal", "full", "extra")
+if DB_JOURNAL_MODE not in JOURNAL_MODES:
+    raise ValueError(
+        f"GROOVEPLY_DB_JOURNAL_MODE must be one of {', '.join(JOURNAL_MODES)},"
+        f" got {DB_JOURNAL_MODE!r}"
+    )
+if DB_SYNCHRONOUS not in SYNCHRONOUS_MODES:
+    raise ValueError(
+        f"GROOVEPLY_DB_SYNCHRONOUS must be one of {', '.join(SYNCHRONOUS_MODES)},"
+        f" got {DB_SYNCHRONOUS!r}"
+    )
+
+DB_THREADS = int(os.environ.get("GROOVEPLY_DB_THREADS", 8))
+# Set when the schema is migrated separately, e.g. before starting several workers
+SKIP_MIGRATIONS = os.environ.get("GROOVEPLY_SKIP_MIGRATIONS", "0") == "1"
+# Request and SQL timings, exposed at /api/_metrics and in the Server-Timing header
+METRICS = os.environ.get("GROOVEPLY_METRICS", "1") == "1"
+# Statements slower than this are logged with their query plan, 0 turns the log off
+SLOW_QUERY_MS = float(os.environ.get("GROOVEPLY_SLOW_QUERY_MS", 0))
+SLOW_QUERY_LOG_SIZE = 200
+APPLICATIONS_PAGE_SIZE = 50
+UPDATES_PAGE_SIZE = 20
+AUTOMATION_INTERVAL = float(os.environ.get("GROOVEPLY_AUTOMATION_INTERVAL", 600))
+if not AUTOMATION_INTERVAL > 0:
+    raise ValueError(
+        f"GROOVEPLY_AUTOMATION_INTERVAL must be a positive number of seconds,"
+        f" got {AUTOMATION_INTERVAL:g}"
+    )
+SEARCH_LIMIT = 20
+SEARCH_PAGE_SIZE = 20
@@ -0,0 +1,123 @@
+"""
+Opt-in log of the statements slower than SLOW_QUERY_MS.
+
+The latest entries are kept in memory per process with the query plan
+of the statement, so that the missing indexes show up on real data.
+Parameter values are not kept, only their types.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+from collections import deque
+from typing import Any, Optional
+
+import pendulum
+
+from .models import SlowQuery
+from .settings import SLOW_QUERY_LOG_SIZE, TZ
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = re.compile(r"\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b", re.IGNORECASE)
+PLAN_CACHE_SIZE = 256
+
+_entries: deque[SlowQuery] = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_plans: dict[str, list[str]] = {}
+_lock = threading.Lock()
+
+
+def parameter_shape(parameters: Any, many: bool = False) -> str:
+    if many:
+        return "executemany"
+    if isinstance(parameters, dict):
+        fields = (f"{key}: {type_name(value)}" for key, value in parameters.items())
+        return "{" + ", ".join(fields) + "}"
+    return "(" + ", ".join(type_name(value) for value in parameters) + ")"
+
+
+def type_name(value: Any) -> str:
+    return "NULL" if value is None else type(value).__name__
+
+
+def explain(con: sqlite3.Connection, sql: str, parameters: Any) -> list[str]:
+    """
+    EXPLAIN QUERY PLAN of the statement, cached by the SQL text since
+    the plans of the same statement with other parameters rarely differ
+    """
+    plan = _plans.get(sql)
+    if plan is not None:
+        return plan
+    if not EXPLAINABLE.match(sql):
+        return []
+
+    # A plain cursor, so that the statement itself is not timed
+    cur = sqlite3.Cursor(con)
+    try:
+        cur.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+        plan = [row[3] for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        return [f"EXPLAIN QUERY PLAN failed: {e}"]
+    finally:
+        cur.close()
+
+    with _lock:
+        if len(_plans) >= PLAN_CACHE_SIZE:
+            _plans.clear()
+        _plans[sql] = plan
+    return plan
+
+
+def full_scans(plan: list[str]) -> list[str]:
+    """Tables and subqueries read from the first row to the last"""
+    return [
+        detail[len("SCAN "):]
+        for detail in plan
+        if detail.startswith("SCAN ") and detail != "SCAN CONSTANT ROW"
+    ]
+
+
+def log_slow_query(
+    con: sqlite3.Connection,
+    sql: str,
+    parameters: Any,
+    duration: float,
+    many: bool = False,
+) -> SlowQuery:
+    """
+    Adds an entry for a statement that took `duration` seconds so far.
+    The entry is returned to update the duration while its rows are fetched.
+    """
+    plan = [] if many else explain(con, sql, parameters)
+    entry = SlowQuery(
+        at=str(pendulum.now(tz=TZ)),
+        duration_ms=duration * 1000,
+        sql=" ".join(sql.split()),
+        parameters=parameter_shape(parameters, many),
+        plan=plan,
+        full_scans=full_scans(plan),
+    )
+    with _lock:
+        _entries.append(entry)
+
+    logger.warning(
+        "Slow query, %.1f ms so far%s: %s",
+        entry.duration_ms,
+        f", full scan of {', '.join(entry.full_scans)}" if entry.full_scans else "",
+        entry.sql,
+    )
+    return entry
+
+
+def get_entries(limit: Optional[int] = None) -> list[SlowQuery]:
+    """The latest entries, newest first"""
+    with _lock:
+        entries = list(reversed(_entries))
+    return entries[:limit] if limit is not None else entries
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _plans.clear()
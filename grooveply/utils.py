@@ -1,25 +1,87 @@
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Iterable, Optional
 
 import pendulum
 from fastui import AnyComponent
 from fastui import components as c
 from fastui.events import GoToEvent
+from pendulum import DateTime
 
 from .settings import TZ
 
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
 
-def format_date(date_str: str) -> str:
-    # 02 Mar 2024, Fri
-    date = pendulum.parse(date_str)
+# Average length of six calendar months in days
+HALF_YEAR = 365.2425 / 2
+# Dates this close to a boundary of the rules are left to pendulum, calendar
+# months and the local time of the dates make the fast arithmetic inexact there
+BOUNDARY_DAYS = 4
+CACHE_SIZE = 4096
+
+
+class DateFormatter:
+    """
+    Formats dates relative to a fixed `now` with the rules of `format_date`.
+
+    Dates are parsed with datetime.fromisoformat and compared as epochs,
+    pendulum is only used for the dates near the 7 days and 6 months
+    boundaries, where the output has to match its calendar arithmetic.
+    Not shared between requests, each one creates its own.
+    """
+
+    def __init__(self, now: Optional[DateTime] = None):
+        self.now = now if now is not None else pendulum.now(tz=TZ)
+        self._now_ts = self.now.timestamp()
+        self._cache: dict[str, str] = {}
+
+    def format(self, date_str: str) -> str:
+        result = self._cache.get(date_str)
+        if result is None:
+            if len(self._cache) >= CACHE_SIZE:
+                self._cache.clear()
+            result = self._cache[date_str] = self._format(date_str)
+        return result
+
+    def format_all(self, date_strs: Iterable[str]) -> list[str]:
+        return [self.format(date_str) for date_str in date_strs]
+
+    def _format(self, date_str: str) -> str:
+        try:
+            date = datetime.fromisoformat(date_str)
+        except ValueError:
+            return self._format_exact(date_str)
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+
+        days = abs(self._now_ts - date.timestamp()) / 86400
+        half_years = round(days / HALF_YEAR)
+        if abs(days - 7) < 1 or (half_years and abs(days - half_years * HALF_YEAR) < BOUNDARY_DAYS):
+            return self._format_exact(date_str)
 
-    if date.diff(pendulum.now(tz=TZ)).months >= 6:
-        fmt = "DD MMM Y"
-    elif date.diff(pendulum.now(tz=TZ)).days < 7:
-        fmt = "dddd"
-    else:
-        fmt = "DD MMM"
+        # The months part of the difference, without the years, is six or more
+        if int(days // HALF_YEAR) % 2:
+            return f"{date.day:02} {MONTHS[date.month - 1]} {date.year}"
+        if days < 7:
+            return WEEKDAYS[date.weekday()]
+        return f"{date.day:02} {MONTHS[date.month - 1]}"
 
-    return date.format(fmt)
+    def _format_exact(self, date_str: str) -> str:
+        date = pendulum.parse(date_str)
+
+        if date.diff(self.now).months >= 6:
+            fmt = "DD MMM Y"
+        elif date.diff(self.now).days < 7:
+            fmt = "dddd"
+        else:
+            fmt = "DD MMM"
+
+        return date.format(fmt)
+
+
+def format_date(date_str: str) -> str:
+    # 02 Mar 2024, Fri
+    return DateFormatter().format(date_str)
 
 
 def page(title, components: list[AnyComponent]) -> list[AnyComponent]:
@@ -59,6 +121,16 @@ def page(title, components: list[AnyComponent]) -> list[AnyComponent]:
                     on_click=GoToEvent(url="/goal/"),
                     active="startswith:/goal/",
                 ),
+                c.Link(
+                    components=[c.Text(text="Activity")],
+                    on_click=GoToEvent(url="/activity/"),
+                    active="startswith:/activity/",
+                ),
+                c.Link(
+                    components=[c.Text(text="Search")],
+                    on_click=GoToEvent(url="/search"),
+                    active="startswith:/search",
+                ),
             ],
         ),
         c.Page(components=components),
@@ -10,8 +10,8 @@ setuptools.setup(
     version="0.1.0",
     description="Simple Job Application Tracking App",
     package_dir={"grooveply": os.path.join(SCRIPT_DIR, "grooveply")},
-    entry_points={"console_scripts": ["grooveply = grooveply.main:main"]},
-    packages=setuptools.find_packages(),
+    entry_points={"console_scripts": ["grooveply = grooveply.cli:main"]},
+    packages=setuptools.find_packages(exclude=["benchmarks", "benchmarks.*"]),
     python_requires=">=3.10",
     install_requires=[
         "fastui==0.5.2",
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+# Settings are read on import, so they are set before grooveply is imported
+os.environ.setdefault(
+    "GROOVEPLY_DB", os.path.join(tempfile.mkdtemp(prefix="grooveply-tests-"), "grooveply.db")
+)
+os.environ.setdefault("GROOVEPLY_AUTOMATION_INTERVAL", "3600")
+
+import pytest  # noqa: E402
+
+from grooveply import cache, db  # noqa: E402
+from grooveply.migrations import apply_migrations  # noqa: E402
+
+
+@pytest.fixture
+def empty_db(tmp_path, monkeypatch):
+    """A new database file without any tables, used by every connection of the test"""
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "grooveply.db"))
+    db.close_connections()
+    for lookup in (cache.statuses, cache.employers, cache.locations, cache.job_boards):
+        lookup.clear()
+    yield
+    db.close_connections()
+
+
+@pytest.fixture
+def database(empty_db):
+    """A new database with the latest schema"""
+    apply_migrations()
+
+
+@pytest.fixture
+def client(database):
+    from fastapi.testclient import TestClient
+
+    from grooveply.main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,144 @@
+import pendulum
+
+from grooveply.apis.activity import ActivityAPI
+from grooveply.apis.application import (
+    ApplicationAPI,
+    ApplicationStatusAPI,
+    ApplicationUpdateAPI,
+)
+from grooveply.apis.automation import AutomationAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.apis.goal import GoalAPI
+from grooveply.auto import update_statuses
+from grooveply.db import get_connection, register_update
+from grooveply.settings import TZ
+
+
+def activity(day: str) -> tuple[int, int, int, int]:
+    [row] = ActivityAPI.get_calendar(day, day)
+    return row.applications, row.status_changes, row.user_updates, row.automation_updates
+
+
+def test_status_changes_are_counted_from_updates(database):
+    today = pendulum.today(tz=TZ).to_date_string()
+    app_id = ApplicationAPI.create(
+        EmployerAPI.create("Acme"), ApplicationStatusAPI.get_id("APPLIED"), None, None, "", ""
+    )
+    register_update(app_id, "Created", "user", 1)
+    ApplicationAPI.next_status(app_id)
+    assert activity(today) == (1, 1, 2, 0)
+
+    con = get_connection()
+    with con:
+        con.execute(
+            "UPDATE application_update SET created_at = '2010-07-01T20:30:00+00:00'"
+            " WHERE description LIKE 'Changed status %'"
+        )
+    assert activity(today) == (1, 0, 1, 0)
+    assert activity("2010-07-02") == (0, 1, 1, 0)
+
+    ApplicationAPI.delete(app_id)
+    with con:
+        con.execute("DELETE FROM application_update")
+    assert activity(today) == (0, 0, 0, 0)
+    assert activity("2010-07-02") == (0, 0, 0, 0)
+
+
+def test_goal_ending_today_is_in_progress(database):
+    today = pendulum.today(tz=TZ).to_date_string()
+    yesterday = pendulum.yesterday(tz=TZ).to_date_string()
+    GoalAPI.create(1, 1, "days", yesterday, today)
+    GoalAPI.create(1, 1, "days", yesterday, yesterday)
+
+    current, ended = GoalAPI.progress_all(include_expired=True)
+    assert current.period_start == today
+    assert ended.period_start is None
+    assert [period.start for period in GoalAPI.history(current.goal)][-1] == today
+    assert [period.start for period in GoalAPI.history(ended.goal)][-1] == yesterday
+
+
+def test_progress_all_matches_per_goal_counts(database):
+    now = pendulum.now(tz=TZ)
+    start_of_today = now.start_of("day")
+    employer_id = EmployerAPI.create("Acme")
+    created = [
+        now,
+        start_of_today,
+        # A minute before the local midnight, the same UTC day in TZ east of UTC
+        start_of_today.subtract(minutes=1).in_tz("UTC"),
+        now.subtract(days=3),
+        now.subtract(days=10),
+        now.subtract(days=40),
+        now.subtract(days=400),
+        now.subtract(years=5),
+    ]
+    con = get_connection()
+    with con:
+        for at in created:
+            con.execute(
+                "INSERT INTO application (employer_id, status_id, status_updated_at, created_at)"
+                " VALUES (?, 1, ?, ?)",
+                (employer_id, str(at), str(at)),
+            )
+
+    def days_ago(days: int) -> str:
+        return now.subtract(days=days).to_date_string()
+
+    for value, each, period, start, end in [
+        (1, 1, "days", days_ago(30), None),
+        (5, 7, "days", days_ago(100), None),
+        (5, 1, "months", days_ago(2 * 365), None),
+        (20, 1, "years", days_ago(3 * 365), None),
+        (1, 1, "days", now.add(days=1).to_date_string(), None),
+        (1, 1, "days", days_ago(30), days_ago(1)),
+    ]:
+        GoalAPI.create(value, each, period, start, end)
+
+    progress = GoalAPI.progress_all()
+    assert len(progress) == 5
+    for item in progress:
+        start = GoalAPI.latest_period_start(item.goal)
+        assert item.period_start == start.to_date_string()
+        # Applications created on a local day since the start of the current period
+        expected = sum(at.in_tz(TZ).date() >= start.date() for at in created)
+        assert item.done == expected
+        assert item.done == GoalAPI.history(item.goal)[-1].done
+
+    with_expired = GoalAPI.progress_all(include_expired=True)
+    assert [item.goal.id for item in with_expired[:5]] == [item.goal.id for item in progress]
+    [expired] = with_expired[5:]
+    assert expired.goal.end_date == days_ago(1)
+    assert expired.period_start is None and expired.done is None
+
+
+def test_progress_all_without_goals(database):
+    assert GoalAPI.progress_all() == []
+    GoalAPI.create(1, 1, "days", "2020-01-01", "2020-02-01")
+    assert GoalAPI.progress_all() == []
+    [expired] = GoalAPI.progress_all(include_expired=True)
+    assert expired.done is None
+
+
+def test_updates_are_written_in_tz(database):
+    status = ApplicationStatusAPI.get_id
+    app_id = ApplicationAPI.create(
+        EmployerAPI.create("Acme"), status("APPLIED"), None, None, "", ""
+    )
+    con = get_connection()
+    with con:
+        con.execute(
+            "UPDATE application SET status_updated_at = '2020-01-01T10:00:00+03:00'"
+            " WHERE id = ?",
+            (app_id,),
+        )
+    AutomationAPI.create(status("APPLIED"), status("STALE"), 30, "days")
+    register_update(app_id, "Note", "user", 1)
+    update_statuses()
+
+    offset = pendulum.now(tz=TZ).format("Z")
+    updates = ApplicationUpdateAPI.get_all(app_id)
+    assert [(upd.triggerer_type, upd.created_at[-6:]) for upd in updates] == [
+        ("user", offset),
+        ("automation", offset),
+    ]
+    assert ApplicationAPI.get(app_id).status_updated_at.endswith(offset)
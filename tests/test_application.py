@@ -0,0 +1,150 @@
+import base64
+import json
+import sqlite3
+
+import pytest
+
+from grooveply.apis.application import (
+    ApplicationAPI,
+    ApplicationStatusAPI,
+    ApplicationUpdateAPI,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+)
+from grooveply.apis.employer import EmployerAPI
+from grooveply.db import get_connection, register_update
+
+
+@pytest.fixture
+def applications(database) -> list[int]:
+    employer_id = EmployerAPI.create("Acme")
+    status_id = ApplicationStatusAPI.get_id("APPLIED")
+    return [
+        ApplicationAPI.create(employer_id, status_id, None, None, f"Job {i}", "")
+        for i in range(5)
+    ]
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_pages_cover_every_application(applications):
+    ids = []
+    after = None
+    while True:
+        page = ApplicationAPI.get_page(2, after=after)
+        ids.extend(app.id for app in page.items)
+        if page.next_cursor is None:
+            break
+        after = page.next_cursor
+    assert sorted(ids) == sorted(applications)
+    assert len(ids) == len(set(ids))
+
+
+MALFORMED_CURSORS = [
+    "zzz",
+    "!!!!",
+    raw_cursor("text"),
+    raw_cursor([1]),
+    raw_cursor([1, 2, 3]),
+    raw_cursor(["a", 1]),
+    raw_cursor({"a": 1, "b": 2}),
+    raw_cursor([None, 1]),
+    raw_cursor([2**63, 1]),
+    base64.urlsafe_b64encode(b"[Infinity, 1]").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+]
+
+
+@pytest.mark.parametrize("cursor", MALFORMED_CURSORS)
+@pytest.mark.parametrize("param", ["after", "before"])
+def test_malformed_cursor(client, applications, param, cursor):
+    response = client.get("/api/application/", params={param: cursor})
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.parametrize("cursor", MALFORMED_CURSORS)
+def test_malformed_cursor_in_the_api(cursor):
+    # Callers outside of the routers, such as the export or the benchmarks, get a ValueError
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+    assert issubclass(InvalidCursor, ValueError)
+
+
+def test_cursor_of_another_page(client, applications):
+    response = client.get("/api/application/", params={"after": encode_cursor(0, 0)})
+    assert response.status_code == 200
+
+
+def test_timeline_pages(applications):
+    app_id = applications[0]
+    for i in range(5):
+        register_update(app_id, f"Update {i}", "user", 1)
+
+    ids = []
+    after = None
+    while True:
+        page = ApplicationUpdateAPI.get_page(app_id, 2, after=after)
+        ids.extend(upd.id for upd in page.items)
+        if page.next_cursor is None:
+            break
+        after = page.next_cursor
+    assert ids == [upd.id for upd in reversed(ApplicationUpdateAPI.get_all(app_id))]
+
+
+@pytest.mark.parametrize("cursor", MALFORMED_CURSORS)
+def test_timeline_malformed_cursor(client, applications, cursor):
+    response = client.get(f"/api/application/{applications[0]}/timeline", params={"after": cursor})
+    assert response.status_code == 422
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_next_status(applications):
+    app_id = applications[0]
+    ApplicationAPI.next_status(app_id)
+
+    assert ApplicationAPI.get(app_id).status.name == "ACTIVE"
+    assert [upd.description for upd in ApplicationUpdateAPI.get_all(app_id)] == [
+        "Changed status APPLIED -> ACTIVE"
+    ]
+
+
+def test_next_status_is_atomic(applications):
+    app_id = applications[0]
+    con = get_connection()
+    con.execute(
+        "CREATE TEMP TRIGGER fail_status_change BEFORE UPDATE OF status_id ON main.application"
+        " BEGIN SELECT RAISE(ABORT, 'status change failed'); END"
+    )
+    try:
+        with pytest.raises(sqlite3.IntegrityError):
+            ApplicationAPI.next_status(app_id)
+    finally:
+        con.execute("DROP TRIGGER temp.fail_status_change")
+
+    assert ApplicationAPI.get(app_id).status.name == "APPLIED"
+    assert ApplicationUpdateAPI.get_all(app_id) == []
+
+
+def test_create_with_unknown_location(client, database):
+    response = client.post(
+        "/api/application/create",
+        data={"employer_name": "Acme", "app_status_name": "APPLIED", "location": "Atlantis"},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"]["form"][0]["loc"] == ["location"]
+    assert ApplicationAPI.get_all() == []
+    assert EmployerAPI.get_id("Acme") is None
+
+
+def test_create_with_new_location(client, database):
+    response = client.post(
+        "/api/application/create",
+        data={"employer_name": "Acme", "app_status_name": "APPLIED", "new_location": "Atlantis"},
+    )
+    assert response.status_code == 200
+    [app] = ApplicationAPI.get_all()
+    assert app.location_name == "Atlantis"
@@ -0,0 +1,57 @@
+import json
+
+import pendulum
+
+from benchmarks.data import STATUSES, generate, populate
+from grooveply.db import get_connection
+from grooveply.settings import TZ
+
+NOW = pendulum.datetime(2024, 6, 1, tz=TZ)
+
+
+def read(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_generate_is_deterministic(tmp_path):
+    first, second, other = (tmp_path / "first", tmp_path / "second", tmp_path / "other")
+    for directory in (first, second, other):
+        directory.mkdir()
+
+    paths = generate(str(first), 200, seed=1, now=NOW)
+    assert [read(path) for path in paths] == [
+        read(path) for path in generate(str(second), 200, seed=1, now=NOW)
+    ]
+    assert read(paths[0]) != read(generate(str(other), 200, seed=2, now=NOW)[0])
+
+
+def test_generated_rows(tmp_path):
+    apps_path, updates_path = generate(str(tmp_path), 200, seed=0, now=NOW)
+    applications = read(apps_path)
+    updates = read(updates_path)
+
+    assert [app["id"] for app in applications] == list(range(200))
+    assert {app["status"] for app in applications} <= set(STATUSES)
+    assert all(app["created_at"] <= str(NOW) for app in applications)
+    # Every application has its creation update, written in time order
+    created = [update for update in updates if update["description"] == "Created"]
+    assert [update["application_id"] for update in created] == list(range(200))
+    for app in applications:
+        times = [u["created_at"] for u in updates if u["application_id"] == app["id"]]
+        assert times == sorted(times)
+
+
+def test_populate(database, tmp_path):
+    _, updates_path = generate(str(tmp_path), 100, seed=0, now=NOW)
+    populate(100, seed=0, now=NOW)
+
+    cur = get_connection().cursor()
+    cur.execute("SELECT COUNT(*) FROM application")
+    assert cur.fetchone()[0] == 100
+    cur.execute("SELECT COUNT(*) FROM application_update")
+    assert cur.fetchone()[0] == len(read(updates_path))
+    cur.execute("SELECT COUNT(*) FROM automation")
+    assert cur.fetchone()[0] == 2
+    cur.execute("SELECT COUNT(*) FROM application_goal")
+    assert cur.fetchone()[0] == 3
@@ -0,0 +1,81 @@
+import sqlite3
+
+from grooveply import cache, db
+from grooveply.apis.application import ApplicationStatusAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.apis.location import LocationAPI
+from grooveply.db import get_connection
+
+
+def other_process() -> sqlite3.Connection:
+    """A connection of its own, as another worker would write with"""
+    return sqlite3.connect(db.DB_NAME)
+
+
+def test_names_created_elsewhere_are_found(database):
+    con = get_connection()
+    with con:
+        cur = con.execute(
+            "INSERT INTO location (name, created_at) VALUES ('Berlin', '2024-01-01') RETURNING id"
+        )
+        location_id = cur.fetchone()[0]
+
+    assert LocationAPI.get_id("Berlin") == location_id
+    assert cache.locations.get_name(location_id) == "Berlin"
+
+
+def test_rename_by_another_process(database):
+    employer_id = EmployerAPI.create("Acme Crop")
+    assert EmployerAPI.get_id("Acme Crop") == employer_id
+
+    con = other_process()
+    with con:
+        con.execute("UPDATE employer SET name = 'Acme Corp' WHERE id = ?", (employer_id,))
+    con.close()
+
+    assert EmployerAPI.get_id("Acme Crop") is None
+    assert EmployerAPI.get_id("Acme Corp") == employer_id
+    assert cache.employers.get_name(employer_id) == "Acme Corp"
+
+
+def test_delete_by_another_process(database):
+    location_id = LocationAPI.create("Atlantis")
+    assert LocationAPI.get_id("Atlantis") == location_id
+
+    con = other_process()
+    with con:
+        con.execute("DELETE FROM location WHERE id = ?", (location_id,))
+    con.close()
+
+    assert LocationAPI.get_id("Atlantis") is None
+    assert cache.locations.get_name(location_id) is None
+
+
+def test_counter_is_read_once_per_request(database, monkeypatch):
+    reads = []
+
+    def counter() -> int:
+        reads.append(1)
+        return db.data_change_counter()
+
+    monkeypatch.setattr(cache, "data_change_counter", counter)
+    token = cache.open_identity_map()
+    try:
+        for _ in range(3):
+            ApplicationStatusAPI.get_id("APPLIED")
+            ApplicationStatusAPI.get(1)
+    finally:
+        cache.close_identity_map(token)
+    assert len(reads) == 1
+
+    ApplicationStatusAPI.get_id("APPLIED")
+    ApplicationStatusAPI.get_id("APPLIED")
+    assert len(reads) == 3
+
+
+def test_create_of_an_existing_name(database):
+    employer_id = EmployerAPI.create("Acme")
+    cache.employers.clear()
+
+    assert EmployerAPI.create("Acme") == employer_id
+    assert EmployerAPI.get_id("Acme") == employer_id
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+from contextvars import ContextVar
+
+import pytest
+
+from grooveply import cache, db, metrics
+from grooveply.apis.application import ApplicationAPI, ApplicationStatusAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.apis.goal import GoalAPI
+from grooveply.db import connect, get_connection, register_update, run_db
+
+request_id: ContextVar[str] = ContextVar("request_id", default="none")
+
+
+def test_run_db_passes_arguments_and_errors():
+    def call(a, b, *, c):
+        return a + b + c
+
+    def fail():
+        raise KeyError("missing")
+
+    assert asyncio.run(run_db(call, 1, 2, c=3)) == 6
+    with pytest.raises(KeyError, match="missing"):
+        asyncio.run(run_db(fail))
+
+
+def test_run_db_sees_the_context_of_the_caller():
+    async def handler():
+        request_id.set("request 1")
+        token = cache.open_identity_map()
+        try:
+            seen = await run_db(request_id.get)
+            # The identity map is the same dict, rows put by the call are seen by the caller
+            await run_db(cache.identity_put, "application", 1, "row")
+            return seen, cache.identity_get("application", 1)
+        finally:
+            cache.close_identity_map(token)
+
+    assert asyncio.run(handler()) == ("request 1", "row")
+    assert request_id.get() == "none"
+
+
+def test_gathered_calls_run_on_their_own_threads_and_connections(database):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def call() -> tuple[int, int]:
+        # Both calls have to be running at once to get past the barrier
+        barrier.wait()
+        con = get_connection()
+        con.execute("SELECT COUNT(*) FROM application").fetchone()
+        return threading.get_ident(), id(con)
+
+    async def handler():
+        return await asyncio.gather(run_db(call), run_db(call))
+
+    (first_thread, first_con), (second_thread, second_con) = asyncio.run(handler())
+    assert first_thread != second_thread
+    assert first_con != second_con
+
+
+def test_gathered_calls_are_added_to_the_request(database):
+    async def handler():
+        stats, token = metrics.start_request()
+        try:
+            await asyncio.gather(run_db(GoalAPI.get_all), run_db(ApplicationAPI.get_all))
+        finally:
+            metrics.end_request(token)
+        return stats
+
+    stats = asyncio.run(handler())
+    assert stats.queries >= 2
+    assert stats.api_time > 0
+
+
+def test_main_page(client):
+    app_id = ApplicationAPI.create(
+        EmployerAPI.create("Acme"), ApplicationStatusAPI.get_id("APPLIED"), None, None, "", ""
+    )
+    register_update(app_id, "Sent the CV", "user", 1)
+    GoalAPI.create(10, 1, "months", "2024-01-01", None)
+
+    response = client.get("/api/")
+    assert response.status_code == 200
+    assert "Sent the CV" in response.text
+    assert '"goal":10' in response.text.replace(" ", "")
+
+
+PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size", "foreign_keys")
+
+
+def pragmas(con) -> tuple:
+    return tuple(con.execute(f"PRAGMA {name}").fetchone()[0] for name in PRAGMAS)
+
+
+def test_connection_reports_the_configured_pragmas(empty_db, monkeypatch):
+    con = connect()
+    # wal, normal, 5 s, 16 MiB, 256 MiB and foreign keys on by default
+    assert pragmas(con) == ("wal", 1, 5000, -16384, 256 * 1024 * 1024, 1)
+    con.close()
+
+    monkeypatch.setattr(db, "DB_JOURNAL_MODE", "truncate")
+    monkeypatch.setattr(db, "DB_SYNCHRONOUS", "full")
+    monkeypatch.setattr(db, "DB_BUSY_TIMEOUT", 100)
+    monkeypatch.setattr(db, "DB_CACHE_SIZE", 500)
+    monkeypatch.setattr(db, "DB_MMAP_SIZE", 0)
+    monkeypatch.setattr(db, "DB_FOREIGN_KEYS", False)
+    con = connect()
+    assert pragmas(con) == ("truncate", 2, 100, 500, 0, 0)
+    con.close()
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [
+        ("GROOVEPLY_DB_JOURNAL_MODE", "wal; DROP TABLE application"),
+        ("GROOVEPLY_DB_JOURNAL_MODE", "fast"),
+        ("GROOVEPLY_DB_SYNCHRONOUS", "1"),
+        ("GROOVEPLY_DB_SYNCHRONOUS", "sometimes"),
+    ],
+)
+def test_unknown_pragma_modes_are_rejected(name, value):
+    result = subprocess.run(
+        [sys.executable, "-c", "import grooveply.settings"],
+        env={**os.environ, name: value},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert f"{name} must be one of" in result.stderr
+
+
+def test_pragma_modes_are_case_insensitive():
+    code = (
+        "from grooveply import settings;"
+        " print(settings.DB_JOURNAL_MODE, settings.DB_SYNCHRONOUS)"
+    )
+    env = {**os.environ, "GROOVEPLY_DB_JOURNAL_MODE": "WAL", "GROOVEPLY_DB_SYNCHRONOUS": "Full"}
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == ["wal", "full"]
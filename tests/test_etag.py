@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+
+from grooveply import db
+from grooveply.apis.location import LocationAPI
+
+
+def test_not_modified(client):
+    response = client.get("/api/location/")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/location/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+    response = client.get("/api/location/", headers={"If-None-Match": f'W/"other", {etag}'})
+    assert response.status_code == 304
+
+
+def test_changed_after_a_write(client):
+    etag = client.get("/api/location/").headers["ETag"]
+    LocationAPI.create("Atlantis")
+
+    response = client.get("/api/location/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert "Atlantis" in response.text
+
+
+def test_other_pages_have_other_tags(client):
+    assert client.get("/api/location/").headers["ETag"] != client.get("/api/").headers["ETag"]
+
+
+def test_not_tagged(client):
+    assert "ETag" not in client.get("/api/_metrics").headers
+    assert "ETag" not in client.get("/api/admin/slow-queries").headers
+
+
+def test_same_tag_in_every_process(client):
+    LocationAPI.create("Atlantis")
+    etag = client.get("/api/location/").headers["ETag"]
+
+    db.close_connections()
+    assert client.get("/api/location/").headers["ETag"] == etag
+
+    # Another worker serving the same database
+    script = (
+        "from fastapi.testclient import TestClient\n"
+        "from grooveply.main import app\n"
+        "print(TestClient(app).get('/api/location/').headers['ETag'])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        env={**os.environ, "GROOVEPLY_DB": db.DB_NAME, "GROOVEPLY_SKIP_MIGRATIONS": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == etag
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+
+import pytest
+
+from grooveply.apis.application import ApplicationAPI, ApplicationStatusAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.db import get_connection, register_update
+
+
+@pytest.fixture
+def applications(database) -> list[int]:
+    employer_id = EmployerAPI.create("Acme")
+    status_id = ApplicationStatusAPI.get_id("APPLIED")
+    ids = [
+        ApplicationAPI.create(employer_id, status_id, None, None, f"Job {i}", "")
+        for i in range(3)
+    ]
+    con = get_connection()
+    with con:
+        con.execute(
+            "UPDATE application SET last_activity_ts = ?, last_activity_at = ? WHERE id = ?",
+            (1704067200000, "2024-01-01T03:00:00+03:00", ids[0]),
+        )
+    return ids
+
+
+def test_export_without_since(client, applications):
+    response = client.get("/api/export/applications.csv")
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["id"]) for row in rows] == applications
+
+
+@pytest.mark.parametrize("since", ["2024-06-01", "2024-06-01T00:00:00+03:00", "20240601"])
+def test_export_since(client, applications, since):
+    response = client.get("/api/export/applications.ndjson", params={"since": since})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == applications[1:]
+
+
+def test_export_updates_since(client, applications):
+    register_update(applications[0], "Old", "user", 1)
+    register_update(applications[1], "New", "user", 1)
+    con = get_connection()
+    with con:
+        con.execute(
+            "UPDATE application_update SET created_at = ? WHERE description = 'Old'",
+            ("2024-01-01T03:00:00+03:00",),
+        )
+
+    response = client.get("/api/export/updates.ndjson", params={"since": "2024-06-01"})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["description"] for row in rows] == ["New"]
+
+
+@pytest.mark.parametrize("since", ["bad", "", "2024-13-01", "P1D"])
+@pytest.mark.parametrize("name", ["applications", "updates"])
+def test_export_invalid_since(client, applications, name, since):
+    response = client.get(f"/api/export/{name}.ndjson", params={"since": since})
+    assert response.status_code == 422
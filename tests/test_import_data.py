@@ -0,0 +1,100 @@
+import pendulum
+import pytest
+
+from grooveply.db import get_connection
+from grooveply.scripts.import_data import import_data
+from grooveply.settings import TZ
+
+APPLICATIONS = """\
+id,employer,status,description,created_at
+1,Acme,APPLIED,First,2024-03-01T10:00:00+03:00
+2,Acme,WAITING,Unknown status,2024-03-01T10:00:00+03:00
+3,,APPLIED,No employer,2024-03-01T10:00:00+03:00
+4,Globex,ACTIVE,Bad date,yesterday
+5,Globex,ACTIVE,Second,
+1,Acme,APPLIED,Repeated id,2024-03-01T10:00:00+03:00
+"""
+
+UPDATES = """\
+{"application_id": 1, "description": "Created", "created_at": "2024-03-01T10:00:00+03:00"}
+{"application_id": 2, "description": "Of a skipped application"}
+not json
+{"application_id": 5, "description": "Created"}
+{"application_id": 5}
+"""
+
+
+@pytest.fixture
+def files(tmp_path) -> tuple[str, str]:
+    applications = tmp_path / "applications.csv"
+    applications.write_text(APPLICATIONS)
+    updates = tmp_path / "updates.ndjson"
+    updates.write_text(UPDATES)
+    return str(applications), str(updates)
+
+
+def table(sql: str) -> list[tuple]:
+    cur = get_connection().cursor()
+    cur.execute(sql)
+    return cur.fetchall()
+
+
+def test_invalid_rows_are_reported_and_skipped(database, files, capsys):
+    applications, updates = files
+    import_data(applications, updates, chunk_size=2)
+
+    assert table("SELECT import_id, description FROM application ORDER BY id") == [
+        ("1", "First"),
+        ("5", "Second"),
+    ]
+    assert table(
+        "SELECT app.import_id, au.description FROM application_update au"
+        " JOIN application_to_update atu ON atu.update_id = au.id"
+        " JOIN application app ON app.id = atu.application_id ORDER BY au.id"
+    ) == [("1", "Created"), ("5", "Created")]
+
+    err = capsys.readouterr().err
+    assert f"{applications}:3: unknown status 'WAITING', skipped" in err
+    assert f"{applications}:4: no employer, skipped" in err
+    assert f"{applications}:5: invalid created_at 'yesterday', skipped" in err
+    assert f"{applications}:7: id 1 is repeated, skipped" in err
+    assert f"{updates}:2: unknown application_id 2, skipped" in err
+    assert f"{updates}:3: invalid JSON" in err
+    assert f"{updates}:5: no description, skipped" in err
+
+
+def test_repeated_import_adds_only_new_rows(database, files, tmp_path):
+    applications, updates = files
+    import_data(applications, updates)
+    import_data(applications, updates)
+    assert table("SELECT COUNT(*) FROM application") == [(2,)]
+    assert table("SELECT COUNT(*) FROM application_update") == [(2,)]
+
+    with open(applications, "a") as f:
+        f.write("6,Initech,APPLIED,Third,2024-03-02T10:00:00+03:00\n")
+    with open(updates, "a") as f:
+        f.write('{"application_id": 6, "description": "Created"}\n')
+        f.write('{"application_id": 1, "description": "Interview"}\n')
+    import_data(applications, updates)
+
+    assert table("SELECT import_id FROM application ORDER BY id") == [("1",), ("5",), ("6",)]
+    assert table("SELECT description FROM application_update ORDER BY id") == [
+        ("Created",),
+        ("Created",),
+        ("Created",),
+        ("Interview",),
+    ]
+
+
+def test_default_times_are_in_tz(database, files):
+    applications, updates = files
+    import_data(applications, updates)
+
+    offset = pendulum.now(tz=TZ).format("Z")
+    for (created_at,) in table(
+        "SELECT created_at FROM application WHERE import_id = '5'"
+        " UNION ALL SELECT au.created_at FROM application_update au"
+        " JOIN application_to_update atu ON atu.update_id = au.id"
+        " JOIN application app ON app.id = atu.application_id WHERE app.import_id = '5'"
+    ):
+        assert created_at.endswith(offset)
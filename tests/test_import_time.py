@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+from benchmarks.import_time import ENTRY_POINTS, measure
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGETS = {name: (module, budget) for name, module, budget in ENTRY_POINTS}
+
+
+@pytest.mark.parametrize("name", ["cli", "server"])
+def test_import_time_budget(name, tmp_path):
+    module, budget = BUDGETS[name]
+    db_name = str(tmp_path / "import.db")
+    env = {**os.environ, "GROOVEPLY_DB": db_name}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+
+    # Best of 3 runs with python -X importtime, as benchmarks.import_time does
+    total, _ = measure(module, 3, env)
+
+    assert total <= budget, f"importing {module} took {total:.0f} ms, the budget is {budget} ms"
+    assert not os.path.exists(db_name), f"importing {module} created the database"
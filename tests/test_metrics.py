@@ -0,0 +1,107 @@
+import re
+
+from grooveply.apis.application import ApplicationAPI, ApplicationStatusAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.apis.location import LocationAPI
+from grooveply.metrics import Histogram
+
+SERVER_TIMING = re.compile(
+    r'app;dur=(?P<app>[\d.]+), api;dur=(?P<api>[\d.]+), sql;dur=(?P<sql>[\d.]+);'
+    r'desc="queries: (?P<queries>\d+)"'
+)
+
+
+def sample(text: str, name: str, **labels) -> float:
+    """Value of a sample in the Prometheus text format, 0 if there is none yet"""
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    for line in text.splitlines():
+        if line.startswith(f"{name}{{{rendered}}} "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0
+
+
+def request_count(client, route: str, method: str = "GET") -> float:
+    text = client.get("/api/_metrics").text
+    return sample(text, "grooveply_request_duration_seconds_count", method=method, route=route)
+
+
+def test_server_timing(client):
+    LocationAPI.create("Berlin")
+    response = client.get("/api/location/")
+
+    match = SERVER_TIMING.fullmatch(response.headers["Server-Timing"])
+    assert match is not None
+    app, api, sql = (float(match[key]) for key in ("app", "api", "sql"))
+    # The ETag check and the page query at least
+    assert int(match["queries"]) >= 2
+    assert 0 < sql <= app
+    assert 0 < api <= app
+
+
+def test_labels_are_route_templates(client):
+    employer_id = EmployerAPI.create("Acme")
+    status_id = ApplicationStatusAPI.get_id("APPLIED")
+    first, second = (
+        ApplicationAPI.create(employer_id, status_id, None, None, "", "") for _ in range(2)
+    )
+    route = "/api/application/{id}/details"
+    before = request_count(client, route)
+
+    assert client.get(f"/api/application/{first}/details").status_code == 200
+    assert client.get(f"/api/application/{second}/details").status_code == 200
+
+    text = client.get("/api/_metrics").text
+    count = sample(text, "grooveply_request_duration_seconds_count", method="GET", route=route)
+    assert count == before + 2
+    assert f'route="/api/application/{first}/details"' not in text
+
+
+def test_not_modified_is_labelled_with_its_route(client):
+    route = "/api/location/"
+    etag = client.get(route).headers["ETag"]
+    before = request_count(client, route)
+
+    response = client.get(route, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert "Server-Timing" in response.headers
+
+    assert request_count(client, route) == before + 1
+
+
+def test_metrics_endpoint(client):
+    client.get("/api/location/")
+    response = client.get("/api/_metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    assert "ETag" not in response.headers
+    text = response.text
+    for name in (
+        "grooveply_request_duration_seconds",
+        "grooveply_request_sql_duration_seconds",
+        "grooveply_request_sql_queries",
+        "grooveply_api_call_duration_seconds",
+    ):
+        assert f"# HELP {name} " in text
+        assert f"# TYPE {name} histogram" in text
+
+    count = sample(text, "grooveply_api_call_duration_seconds_count", method="LocationAPI.get_all")
+    assert count >= 1
+    labels = {"method": "LocationAPI.get_all", "le": "+Inf"}
+    assert sample(text, "grooveply_api_call_duration_seconds_bucket", **labels) == count
+
+
+def test_histogram_render():
+    histogram = Histogram("test_seconds", "Test", ("route",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(('/a "b"\n',), value)
+
+    assert histogram.render() == [
+        "# HELP test_seconds Test",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a \\"b\\"\\n",le="0.1"} 2',
+        'test_seconds_bucket{route="/a \\"b\\"\\n",le="1.0"} 3',
+        'test_seconds_bucket{route="/a \\"b\\"\\n",le="+Inf"} 4',
+        'test_seconds_sum{route="/a \\"b\\"\\n"} 2.65',
+        'test_seconds_count{route="/a \\"b\\"\\n"} 4',
+    ]
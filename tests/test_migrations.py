@@ -0,0 +1,213 @@
+from grooveply.db import get_connection, search_names
+from grooveply.migrations import (
+    MIGRATIONS,
+    OnlineMigration,
+    apply_migrations,
+    apply_next_migration,
+    backfill,
+    get_current_schema_version,
+    migrate_step,
+)
+
+LATEST = max(MIGRATIONS)
+
+
+def migrate_to(version: int):
+    con = get_connection()
+    while get_current_schema_version() < version:
+        applied = migrate_step(con, apply_next_migration)
+        if isinstance(MIGRATIONS[applied], OnlineMigration):
+            backfill(con, applied, MIGRATIONS[applied])
+
+
+def add_application_with_update(created_at: str) -> tuple[int, int]:
+    con = get_connection()
+    with con:
+        cur = con.cursor()
+        cur.execute(
+            "INSERT INTO employer (name, created_at) VALUES (?, ?) RETURNING id",
+            (f"Employer of {created_at}", created_at),
+        )
+        employer_id = cur.fetchone()[0]
+        cur.execute(
+            "INSERT INTO application (employer_id, status_id, status_updated_at, created_at)"
+            " VALUES (?, 1, ?, ?) RETURNING id",
+            (employer_id, created_at, created_at),
+        )
+        app_id = cur.fetchone()[0]
+        cur.execute(
+            "INSERT INTO application_update"
+            " (description, created_at, triggerer_type, triggerer_id)"
+            " VALUES ('Changed status from TO APPLY to APPLIED', ?, 'user', 0) RETURNING id",
+            (created_at,),
+        )
+        update_id = cur.fetchone()[0]
+        cur.execute(
+            "INSERT INTO application_to_update (application_id, update_id) VALUES (?, ?)",
+            (app_id, update_id),
+        )
+    return app_id, update_id
+
+
+def test_new_database(empty_db):
+    apply_migrations()
+    assert get_current_schema_version() == LATEST
+
+    # An up to date database is left as it is
+    apply_migrations()
+    assert get_current_schema_version() == LATEST
+
+
+def test_upgrade_keeps_data(empty_db):
+    migrate_to(8)
+    app_id, update_id = add_application_with_update("2024-03-01T10:00:00+03:00")
+
+    apply_migrations()
+    assert get_current_schema_version() == LATEST
+
+    cur = get_connection().cursor()
+    cur.execute(
+        "SELECT atu.update_created_ts, au.created_ts FROM application_to_update atu"
+        " JOIN application_update au ON au.id = atu.update_id WHERE atu.application_id = ?",
+        (app_id,),
+    )
+    link_ts, update_ts = cur.fetchone()
+    assert link_ts == update_ts == 1709276400000
+    cur.execute("SELECT COUNT(*) FROM schema_backfill")
+    assert cur.fetchone()[0] == 0
+    # Names of the existing rows are put in the trigram index
+    assert search_names("employer", "of 2024", 20) == ["Employer of 2024-03-01T10:00:00+03:00"]
+
+
+def test_interrupted_backfill_is_continued(empty_db):
+    migrate_to(8)
+    add_application_with_update("2024-03-01T10:00:00+03:00")
+
+    # Only the schema part of the online migration, as if the process stopped after it
+    con = get_connection()
+    assert migrate_step(con, apply_next_migration) == 9
+    assert get_current_schema_version() == 8
+
+    apply_migrations()
+    assert get_current_schema_version() == LATEST
+    cur = con.cursor()
+    cur.execute("SELECT COUNT(*) FROM application_to_update WHERE update_created_ts IS NULL")
+    assert cur.fetchone()[0] == 0
+
+
+def test_version_moved_from_schema_history(empty_db):
+    migrate_to(3)
+    con = get_connection()
+    with con:
+        con.execute("PRAGMA user_version = 0")
+        con.execute("CREATE TABLE schema_history (version INTEGER NOT NULL)")
+        con.execute("INSERT INTO schema_history VALUES (1), (2), (3)")
+
+    apply_migrations()
+    assert get_current_schema_version() == LATEST
+    cur = con.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'schema_history'")
+    assert cur.fetchone() is None
+
+
+def test_activity_backfill(empty_db):
+    migrate_to(10)
+    add_application_with_update("2024-03-01T10:00:00+03:00")
+    # Moscow was at +04:00 in the summer of 2010 and at +03:00 in the winter
+    add_application_with_update("2010-07-01T20:30:00+00:00")
+    add_application_with_update("2010-01-01T20:30:00+00:00")
+
+    apply_migrations()
+    cur = get_connection().cursor()
+    cur.execute("SELECT day, applications, status_changes, user_updates FROM daily_activity")
+    assert sorted(cur.fetchall()) == [
+        ("2010-01-01", 1, 1, 1),
+        ("2010-07-02", 1, 1, 1),
+        ("2024-03-01", 1, 1, 1),
+    ]
+
+
+def last_activity(app_id: int) -> tuple[str, int]:
+    cur = get_connection().cursor()
+    cur.execute(
+        "SELECT last_activity_at, last_activity_ts FROM application WHERE id = ?", (app_id,)
+    )
+    return cur.fetchone()
+
+
+def test_last_activity_backfill(empty_db):
+    migrate_to(3)
+    with_update, update_id = add_application_with_update("2024-03-01T10:00:00+03:00")
+    con = get_connection()
+    with con:
+        con.execute(
+            "UPDATE application_update SET created_at = '2024-03-05T12:00:00+03:00' WHERE id = ?",
+            (update_id,),
+        )
+        cur = con.execute(
+            "INSERT INTO application (employer_id, status_id, status_updated_at, created_at)"
+            " VALUES (1, 1, '2024-02-01T09:00:00+03:00', '2024-02-01T09:00:00+03:00')"
+            " RETURNING id"
+        )
+        without_update = cur.fetchone()[0]
+
+    apply_migrations()
+    assert last_activity(with_update) == ("2024-03-05T12:00:00+03:00", 1709629200000)
+    assert last_activity(without_update) == ("2024-02-01T09:00:00+03:00", 1706767200000)
+
+
+def add_update(app_id: int, created_at: str, created_ts: int) -> int:
+    con = get_connection()
+    with con:
+        cur = con.execute(
+            "INSERT INTO application_update"
+            " (description, created_at, created_ts, triggerer_type, triggerer_id)"
+            " VALUES ('Call', ?, ?, 'user', 0) RETURNING id",
+            (created_at, created_ts),
+        )
+        update_id = cur.fetchone()[0]
+        con.execute(
+            "INSERT INTO application_to_update (application_id, update_id) VALUES (?, ?)",
+            (app_id, update_id),
+        )
+    return update_id
+
+
+def test_last_activity_triggers(database):
+    con = get_connection()
+    with con:
+        cur = con.execute(
+            "INSERT INTO employer (name, created_at) VALUES ('Acme', '2024-02-20') RETURNING id"
+        )
+        employer_id = cur.fetchone()[0]
+        cur = con.execute(
+            "INSERT INTO application"
+            " (employer_id, status_id, status_updated_at, created_at, created_ts)"
+            " VALUES (?, 1, '2024-02-20T10:00:00+03:00', '2024-02-20T10:00:00+03:00',"
+            " 1708412400000) RETURNING id",
+            (employer_id,),
+        )
+        app_id = cur.fetchone()[0]
+    created = ("2024-02-20T10:00:00+03:00", 1708412400000)
+    assert last_activity(app_id) == created
+
+    first = add_update(app_id, "2024-03-01T10:00:00+03:00", 1709276400000)
+    second = add_update(app_id, "2024-03-10T10:00:00+00:00", 1710064800000)
+    assert last_activity(app_id) == ("2024-03-10T10:00:00+00:00", 1710064800000)
+
+    # Moving the latest update before the other one
+    with con:
+        con.execute(
+            "UPDATE application_update SET created_at = '2024-02-28T10:00:00+03:00',"
+            " created_ts = 1709103600000 WHERE id = ?",
+            (second,),
+        )
+    assert last_activity(app_id) == ("2024-03-01T10:00:00+03:00", 1709276400000)
+
+    with con:
+        con.execute("DELETE FROM application_to_update WHERE update_id = ?", (first,))
+    assert last_activity(app_id) == ("2024-02-28T10:00:00+03:00", 1709103600000)
+
+    with con:
+        con.execute("DELETE FROM application_update WHERE id = ?", (second,))
+    assert last_activity(app_id) == created
@@ -0,0 +1,91 @@
+import pytest
+from pydantic import BaseModel
+
+from grooveply.apis.application import ApplicationAPI, ApplicationStatusAPI, ApplicationUpdateAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.apis.goal import GoalAPI
+from grooveply.apis.job_board import JobBoardAPI
+from grooveply.apis.location import LocationAPI
+from grooveply.db import register_update
+from grooveply.models import Goal, from_row
+from grooveply.routers.application import ApplicationRow
+
+
+def assert_same_as_validated(built: BaseModel):
+    """A model built by from_row is equal to the one validated from the same data"""
+    validated = type(built).model_validate(built.model_dump())
+
+    assert built == validated
+    assert built.model_fields_set == validated.model_fields_set
+    assert built.model_dump_json() == validated.model_dump_json()
+    for name in built.model_fields:
+        assert type(getattr(built, name)) is type(getattr(validated, name)), name
+
+
+@pytest.fixture
+def applications(database) -> list[int]:
+    status_id = ApplicationStatusAPI.get_id("APPLIED")
+    full = ApplicationAPI.create(
+        EmployerAPI.create("Acme"),
+        status_id,
+        LocationAPI.create("Berlin"),
+        JobBoardAPI.create("Board", "https://board.example"),
+        "Backend developer",
+        "https://acme.example",
+    )
+    ApplicationAPI.update_notes(full, "Referred by Kate")
+    empty = ApplicationAPI.create(EmployerAPI.create("Globex"), status_id, None, None, "", "")
+    return [full, empty]
+
+
+def test_applications(applications):
+    items = ApplicationAPI.get_page(10).items
+    assert {app.id for app in items} == set(applications)
+
+    for app in items:
+        assert_same_as_validated(app)
+        assert_same_as_validated(ApplicationAPI.get(app.id))
+
+
+def test_application_rows(applications):
+    for app in ApplicationAPI.get_page(10).items:
+        fields = dict(
+            id=app.id,
+            status=app.status.name,
+            employer_id=app.employer.id,
+            employer=app.employer.name,
+            location=app.location_name,
+            job_board=app.job_board_name,
+            description=app.description,
+            created_at=app.created_at,
+        )
+        assert from_row(ApplicationRow, **fields) == ApplicationRow(**fields)
+        assert_same_as_validated(from_row(ApplicationRow, **fields))
+
+
+def test_updates(applications):
+    app_id = applications[0]
+    register_update(app_id, "Sent the CV", "user", 1)
+    ApplicationAPI.next_status(app_id)
+
+    updates = ApplicationUpdateAPI.get_all(app_id)
+    assert len(updates) == 2
+    for update in updates:
+        assert isinstance(update.triggerer_id, int)
+        assert_same_as_validated(update)
+
+
+def test_goals(database):
+    GoalAPI.create(10, 1, "months", "2024-01-01", None)
+    GoalAPI.create(3, 2, "days", "2024-01-01", "2024-06-30")
+
+    goals = GoalAPI.get_all()
+    assert len(goals) == 2
+    for goal in goals:
+        assert_same_as_validated(goal)
+        assert goal == Goal(**goal.model_dump())
+
+
+def test_every_field_is_required():
+    with pytest.raises(AssertionError, match="Goal"):
+        from_row(Goal, id=1, value=10)
@@ -0,0 +1,68 @@
+import inspect
+
+import pytest
+from fastapi import FastAPI
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute, APIRouter
+from fastapi.testclient import TestClient
+from fastui import FastUI
+from fastui import components as c
+
+from grooveply.routers import FastUIRoute, fastui_response_field
+
+# FastUIRoute replaces the response field after APIRoute.__init__ and rebuilds the handler,
+# these tests fail if a FastAPI upgrade changes the attributes it relies on
+
+
+def test_apiroute_internals():
+    assert "response_model" in inspect.signature(APIRoute.__init__).parameters
+    handler = inspect.getsource(APIRoute.get_route_handler)
+    assert "response_field=self.secure_cloned_response_field" in handler
+    assert "self.response_model_exclude_none" in handler
+
+
+def make_app(*components) -> FastAPI:
+    router = APIRouter(route_class=FastUIRoute)
+
+    @router.get("/page", response_model=FastUI, response_model_exclude_none=True)
+    def page():
+        return list(components)
+
+    @router.get("/plain")
+    def plain() -> dict:
+        return {"a": None}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return app
+
+
+def test_routes_share_the_response_field():
+    app = make_app()
+    routes = {route.path: route for route in app.routes if isinstance(route, APIRoute)}
+
+    assert type(routes["/api/page"]) is FastUIRoute
+    assert routes["/api/page"].response_model is FastUI
+    assert routes["/api/page"].response_field is fastui_response_field()
+    assert routes["/api/page"].secure_cloned_response_field is fastui_response_field()
+    assert routes["/api/plain"].response_field is not fastui_response_field()
+
+
+def test_shared_field_serializes_the_response():
+    with TestClient(make_app(c.Text(text="Hello"), c.Link(components=[]))) as client:
+        assert client.get("/api/page").json() == [
+            {"text": "Hello", "type": "Text"},
+            {"components": [], "type": "Link"},
+        ]
+        assert client.get("/api/plain").json() == {"a": None}
+        schema = client.get("/openapi.json").json()
+        page_response = schema["paths"]["/api/page"]["get"]["responses"]["200"]
+        assert page_response["content"]["application/json"]["schema"] == {
+            "$ref": "#/components/schemas/FastUI"
+        }
+
+
+def test_shared_field_validates_the_response():
+    with TestClient(make_app({"type": "NoSuchComponent"})) as client:
+        with pytest.raises(ResponseValidationError):
+            client.get("/api/page")
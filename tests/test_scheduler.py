@@ -0,0 +1,53 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from grooveply.scheduler import AutomationScheduler
+
+
+@pytest.mark.parametrize("interval", ["0", "-1", "nan"])
+def test_interval_must_be_positive(interval):
+    result = subprocess.run(
+        [sys.executable, "-c", "import grooveply.settings"],
+        env={**os.environ, "GROOVEPLY_AUTOMATION_INTERVAL": interval},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert "GROOVEPLY_AUTOMATION_INTERVAL must be a positive number" in result.stderr
+
+
+def test_lock_error_is_recorded(database, tmp_path):
+    scheduler = AutomationScheduler(0.01, str(tmp_path / "missing" / "grooveply.lock"))
+
+    async def run():
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        status = scheduler.status()
+        await scheduler.stop()
+        return status
+
+    status = asyncio.run(run())
+    assert status.running
+    assert not status.leader
+    assert "FileNotFoundError" in status.last_error
+    assert status.next_run_at is not None
+
+
+def test_leader_runs_automations(database, tmp_path):
+    scheduler = AutomationScheduler(60, str(tmp_path / "grooveply.lock"))
+
+    async def run():
+        scheduler.start()
+        await asyncio.sleep(0.2)
+        status = scheduler.status()
+        await scheduler.stop()
+        return status
+
+    status = asyncio.run(run())
+    assert status.leader
+    assert status.last_run_at is not None
+    assert status.last_error is None
@@ -0,0 +1,193 @@
+import pytest
+
+from grooveply import db
+from grooveply.apis.application import ApplicationAPI, ApplicationStatusAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.apis.location import LocationAPI
+from grooveply.apis.search import SearchAPI, match_query, snippet_markdown
+from grooveply.db import register_update
+
+
+def test_prefix_matches_come_first(database):
+    for name in ("Berlin", "Sberbank City", "bern", "Amsterdam"):
+        LocationAPI.create(name)
+
+    assert LocationAPI.search("ber", 20) == ["Berlin", "bern", "Sberbank City"]
+    assert LocationAPI.search("ber", 2) == ["Berlin", "bern"]
+
+
+def test_search_escapes_like_wildcards(database):
+    for name in ("100% Remote", "100 Remote", "a_b", "ab"):
+        EmployerAPI.create(name)
+
+    assert EmployerAPI.search("100%", 20) == ["100% Remote"]
+    assert EmployerAPI.search("a_", 20) == ["a_b"]
+
+
+def test_substring_matches_anywhere_in_the_table(database):
+    for i in range(200):
+        EmployerAPI.create(f"Company {i:03d}")
+    EmployerAPI.create("Zeta Acme")
+    EmployerAPI.create("Acme")
+
+    assert EmployerAPI.search("acme", 20) == ["Acme", "Zeta Acme"]
+    assert EmployerAPI.search("ny 19", 3) == ["Company 190", "Company 191", "Company 192"]
+
+
+def test_short_queries_match_the_start_only(database):
+    for name in ("Acme", "Big Acme"):
+        EmployerAPI.create(name)
+
+    assert EmployerAPI.search("ac", 20) == ["Acme"]
+
+
+def test_quotes_in_the_query(database):
+    EmployerAPI.create('The "Best" Company')
+
+    assert EmployerAPI.search('"best"', 20) == ['The "Best" Company']
+    assert EmployerAPI.search('est" OR "x', 20) == []
+
+
+def test_index_follows_renames_and_deletes(database):
+    location_id = LocationAPI.create("Nowhere City")
+    con = db.get_connection()
+    with con:
+        con.execute("UPDATE location SET name = 'Somewhere Town' WHERE id = ?", (location_id,))
+    assert LocationAPI.search("city", 20) == []
+    assert LocationAPI.search("town", 20) == ["Somewhere Town"]
+
+    with con:
+        con.execute("DELETE FROM location WHERE id = ?", (location_id,))
+    assert LocationAPI.search("town", 20) == []
+
+
+def create_application(employer: str, description: str) -> int:
+    employer_id = EmployerAPI.create(employer)
+    status_id = ApplicationStatusAPI.get_id("APPLIED")
+    return ApplicationAPI.create(employer_id, status_id, None, None, description, "")
+
+
+def found(q: str) -> list[tuple[int, int | None]]:
+    return [(r.application_id, r.update_id) for r in SearchAPI.search(q, 100)]
+
+
+@pytest.mark.parametrize(
+    "q, query",
+    [
+        ("python", '"python"*'),
+        ("senior python", '"senior" "python"*'),
+        ('say "hi"', '"say" """hi"""*'),
+        ("a OR b", '"a" "OR" "b"*'),
+        ("col:value -x", '"col:value" "-x"*'),
+        ("   ", ""),
+    ],
+)
+def test_match_query(q, query):
+    assert match_query(q) == query
+
+
+def test_syntax_in_the_input_is_matched_as_text(database):
+    app_id = create_application("Acme", "NEAR the office")
+
+    for q in ("NEAR", "near(", 'office"', '"the office"'):
+        assert found(q) == [(app_id, None)]
+    for q in ("AND", "*", "-", "col:x"):
+        assert found(q) == []
+
+
+def test_index_follows_applications(database):
+    app_id = create_application("Acme", "Backend developer")
+    assert found("backend") == [(app_id, None)]
+    assert found("acme") == [(app_id, None)]
+    # The last word is a prefix
+    assert found("back") == [(app_id, None)]
+
+    ApplicationAPI.update_notes(app_id, "Referred by Kate")
+    assert found("kate") == [(app_id, None)]
+
+    con = db.get_connection()
+    with con:
+        con.execute("UPDATE employer SET name = 'Globex' WHERE name = 'Acme'")
+    assert found("acme") == []
+    assert found("globex") == [(app_id, None)]
+
+    ApplicationAPI.delete(app_id)
+    assert found("backend") == found("kate") == found("globex") == []
+
+
+def test_index_follows_updates(database):
+    app_id = create_application("Acme", "")
+    update_id = register_update(app_id, "Interview scheduled", "user", 1)
+    assert found("interview") == [(app_id, update_id)]
+
+    con = db.get_connection()
+    with con:
+        con.execute(
+            "UPDATE application_update SET description = 'Offer received' WHERE id = ?",
+            (update_id,),
+        )
+    assert found("interview") == []
+    assert found("offer") == [(app_id, update_id)]
+
+    with con:
+        con.execute("DELETE FROM application_to_update WHERE update_id = ?", (update_id,))
+    assert found("offer") == []
+
+    other_id = register_update(app_id, "Offer accepted", "user", 1)
+    with con:
+        con.execute("DELETE FROM application_update WHERE id = ?", (other_id,))
+    assert found("offer") == []
+
+    register_update(app_id, "Offer declined", "user", 1)
+    ApplicationAPI.delete(app_id)
+    assert found("offer") == []
+
+
+def test_ranking(database):
+    few = create_application("Acme", "Python developer in a team working on many other things")
+    many = create_application("Globex", "Python, Python and more Python")
+
+    assert [app_id for app_id, _ in found("python")] == [many, few]
+
+
+def test_pagination(database):
+    ids = {create_application(f"Employer {i}", "Data engineer") for i in range(5)}
+
+    pages = [SearchAPI.search("engineer", 2, offset) for offset in (0, 2, 4)]
+    assert [len(results) for results in pages] == [2, 2, 1]
+    assert {r.application_id for results in pages for r in results} == ids
+
+
+def test_snippet_markdown():
+    snippet = "[link](http://x) \x02Acme\x03 # *b* ![i](u) <b>"
+
+    assert snippet_markdown(snippet) == (
+        "\\[link\\]\\(http\\:\\/\\/x\\) **Acme** \\# \\*b\\* \\!\\[i\\]\\(u\\) \\<b\\>"
+    )
+
+
+def test_snippet_of_user_text(database):
+    create_application("Acme", "# Title [click](http://evil.example) **loud**")
+
+    assert SearchAPI.search("click", 10)[0].snippet == (
+        "\\# Title \\[**click**\\]\\(http\\:\\/\\/evil\\.example\\) \\*\\*loud\\*\\*"
+    )
+
+
+def test_search_page(client, monkeypatch):
+    monkeypatch.setattr("grooveply.routers.search.SEARCH_PAGE_SIZE", 2)
+    for i in range(3):
+        create_application(f"Employer {i}", "Site reliability engineer")
+
+    response = client.get("/api/search", params={"q": "reliability"})
+    assert response.status_code == 200
+    body = response.json()[-1]["components"]
+    texts = [component.get("text", "") for component in body if component["type"] == "Markdown"]
+    assert texts == ["Site **reliability** engineer"] * 2
+    assert '"page":2' in response.text.replace(" ", "")
+
+    response = client.get("/api/search", params={"q": "reliability", "page": 2})
+    assert response.status_code == 200
+    assert '"page":1' in response.text.replace(" ", "")
+    assert "Nothing found" in client.get("/api/search", params={"q": "astronaut"}).text
+    assert client.get("/api/search", params={"page": 0}).status_code == 422
@@ -0,0 +1,68 @@
+import pytest
+
+from grooveply import db, slow_queries
+from grooveply.db import get_connection
+from grooveply.routers import admin
+
+
+@pytest.fixture
+def slow_log(database, monkeypatch):
+    """Logs every statement as slow"""
+    slow_queries.clear()
+    monkeypatch.setattr(db, "SLOW_QUERY_MS", 1e-9)
+    monkeypatch.setattr(admin, "SLOW_QUERY_MS", 1e-9)
+    yield
+    slow_queries.clear()
+
+
+def test_parameter_shape():
+    assert slow_queries.parameter_shape((1, "a", None, 1.5)) == "(int, str, NULL, float)"
+    assert slow_queries.parameter_shape({"id": 1, "name": b""}) == "{id: int, name: bytes}"
+    assert slow_queries.parameter_shape(None, many=True) == "executemany"
+
+
+def test_full_scans():
+    plan = [
+        "SCAN employer",
+        "SCAN app USING INDEX idx_application_status",
+        "SEARCH location USING INTEGER PRIMARY KEY (rowid=?)",
+        "SCAN CONSTANT ROW",
+    ]
+    assert slow_queries.full_scans(plan) == [
+        "employer",
+        "app USING INDEX idx_application_status",
+    ]
+
+
+def test_slow_statement_is_logged_with_its_plan(slow_log):
+    cur = get_connection().cursor()
+    cur.execute("SELECT id FROM employer\n    WHERE created_at = ?", ("2024-01-01",))
+    cur.fetchall()
+
+    entry = slow_queries.get_entries()[0]
+    assert entry.sql == "SELECT id FROM employer WHERE created_at = ?"
+    assert entry.parameters == "(str)"
+    assert entry.plan == ["SCAN employer"]
+    assert entry.full_scans == ["employer"]
+    assert entry.duration_ms > 0
+
+
+def test_statements_below_the_threshold_are_not_logged(database, monkeypatch):
+    slow_queries.clear()
+    monkeypatch.setattr(db, "SLOW_QUERY_MS", 60_000)
+    get_connection().cursor().execute("SELECT id FROM employer").fetchall()
+
+    assert slow_queries.get_entries() == []
+
+
+def test_admin_pages(client, slow_log):
+    get_connection().cursor().execute("SELECT id FROM employer").fetchall()
+
+    response = client.get("/api/admin/slow-queries/entries")
+    assert response.status_code == 200
+    assert any(entry["sql"] == "SELECT id FROM employer" for entry in response.json())
+    assert client.get("/api/admin/slow-queries").status_code == 200
+
+    assert client.post("/api/admin/slow-queries/clear").status_code == 200
+    entries = client.get("/api/admin/slow-queries/entries").json()
+    assert all(entry["sql"] != "SELECT id FROM employer" for entry in entries)
@@ -0,0 +1,93 @@
+import pendulum
+
+from grooveply.apis.application import ApplicationAPI, ApplicationStatusAPI
+from grooveply.apis.automation import AutomationAPI
+from grooveply.apis.employer import EmployerAPI
+from grooveply.auto import update_statuses
+from grooveply.db import get_connection, parse_time, register_update, timestamp_ms
+from grooveply.scripts.import_data import import_data
+
+TIME_COLUMNS = [
+    ("application", "created_at", "created_ts"),
+    ("application", "status_updated_at", "status_updated_ts"),
+    ("application", "last_activity_at", "last_activity_ts"),
+    ("application_update", "created_at", "created_ts"),
+]
+
+
+def check_timestamps() -> int:
+    """Checks every *_ts column against its text column, returns the number of checked rows"""
+    cur = get_connection().cursor()
+    checked = 0
+    for table, text_column, ts_column in TIME_COLUMNS:
+        cur.execute(f"SELECT id, {text_column}, {ts_column} FROM {table}")
+        for id, text, ts in cur.fetchall():
+            assert ts == timestamp_ms(parse_time(text)), (table, id, text_column, text)
+            checked += 1
+
+    cur.execute(
+        "SELECT atu.update_id, atu.update_created_ts, au.created_ts"
+        " FROM application_to_update atu"
+        " JOIN application_update au ON au.id = atu.update_id"
+    )
+    for update_id, update_created_ts, created_ts in cur.fetchall():
+        assert update_created_ts == created_ts, update_id
+        checked += 1
+    return checked
+
+
+def test_timestamps_of_new_rows(database):
+    applied = ApplicationStatusAPI.get_id("APPLIED")
+    stale = ApplicationStatusAPI.get_id("STALE")
+    employer_id = EmployerAPI.create("Acme")
+    first, second, third = (
+        ApplicationAPI.create(employer_id, applied, None, None, "", "") for _ in range(3)
+    )
+
+    # Times in offsets other than the one of TZ and with minutes in the offset,
+    # passed as strings the way the router does
+    for app_id, tz in ((first, "America/New_York"), (second, "Asia/Kolkata")):
+        ApplicationAPI.update(app_id, None, str(pendulum.datetime(2024, 3, 1, 10, tz=tz)), None)
+    register_update(first, "Sent the CV", "user", 1)
+    ApplicationAPI.next_status(third)
+
+    AutomationAPI.create(applied, stale, 1, "days")
+    assert sum(update_statuses().values()) == 2
+
+    # Updates linked without created_ts are filled by the triggers of migration 9
+    con = get_connection()
+    with con:
+        update_id = con.execute(
+            "INSERT INTO application_update"
+            " (description, created_at, created_ts, triggerer_type, triggerer_id)"
+            " VALUES ('Called', '2024-03-01T10:00:00-08:00', ?, 'user', 1) RETURNING id",
+            (timestamp_ms("2024-03-01T10:00:00-08:00"),),
+        ).fetchone()[0]
+        con.execute(
+            "INSERT INTO application_to_update (application_id, update_id) VALUES (?, ?)",
+            (third, update_id),
+        )
+
+    # 3 applications with 3 columns, 5 updates and their links
+    assert check_timestamps() == 3 * 3 + 5 + 5
+
+
+def test_timestamps_of_imported_rows(database, tmp_path):
+    applications = tmp_path / "applications.csv"
+    applications.write_text(
+        "id,employer,status,created_at,status_updated_at\n"
+        "1,Acme,APPLIED,2024-03-01T10:00:00-08:00,2024-03-02 09:30:00+05:30\n"
+        "2,Acme,APPLIED,2024-03-01T10:00:00Z,\n"
+        "3,Globex,APPLIED,2024-03-01T10:00:00,\n"
+        "4,Globex,APPLIED,,\n"
+    )
+    updates = tmp_path / "updates.ndjson"
+    updates.write_text(
+        '{"application_id": 1, "description": "Called", "created_at": "2024-03-03T10:00-08:00"}\n'
+        '{"application_id": 3, "description": "Called", "created_at": "2024-03-03T10:00"}\n'
+        '{"application_id": 4, "description": "Called"}\n'
+    )
+
+    import_data(str(applications), str(updates))
+
+    assert check_timestamps() == 4 * 3 + 3 + 3
@@ -0,0 +1,27 @@
+import random
+
+import pendulum
+import pytest
+
+from benchmarks.format_date import NOWS, generate, reference
+from grooveply.settings import TZ
+from grooveply.utils import DateFormatter, format_date
+
+
+@pytest.mark.parametrize("now", NOWS)
+def test_date_formatter_matches_pendulum(now):
+    now = pendulum.parse(now).in_tz(TZ)
+    dates = generate(now, 2000, random.Random(0))
+    assert DateFormatter(now).format_all(dates) == [reference(date, now) for date in dates]
+
+
+def test_date_formatter_cache():
+    now = pendulum.parse(NOWS[0]).in_tz(TZ)
+    formatter = DateFormatter(now)
+    dates = ["2024-03-01T10:00:00+03:00", "2023-01-01T10:00:00"] * 3
+    assert formatter.format_all(dates) == [reference(date, now) for date in dates]
+    assert formatter.format_all(dates)[0] == "Friday"
+
+
+def test_format_date_uses_current_time():
+    assert format_date(str(pendulum.now(tz=TZ))) == pendulum.now(tz=TZ).format("dddd")